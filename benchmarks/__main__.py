@@ -0,0 +1,260 @@
+"""Benchmarks of the analysis phases
+
+    python -m benchmarks run [<path>, ...]    # time the phases and append the run to the history
+    python -m benchmarks compare [BASE HEAD]  # compare two runs of the history, the last two by default
+    python -m benchmarks corpus <dir>         # generate a corpus with planted clones
+    python -m benchmarks stdlib [<path>, ...] # time `check` on the standard library, cold and warm
+"""
+
+import argparse
+import datetime
+import platform
+import subprocess
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+
+from benchmarks import corpus, history, stdlib
+from benchmarks.phases import Corpus, isolated_cache, phases
+from benchmarks.timing import measure
+from pyfactoring.utils.pyclones import CloneFinder
+
+
+# the idiom search recurses as deep as the trees, like in the analysis itself
+_RECURSION_LIMIT = 100_000
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="time the phases on the given files or directories")
+    run_parser.add_argument("paths", nargs="*", default=["test/samples"], help="[default: test/samples]")
+    run_parser.add_argument("--phase", nargs="*", metavar="<name>", help="phases to time [default: all]")
+    run_parser.add_argument("--warmup", type=int, default=1, metavar="<count>", help="[default: 1]")
+    run_parser.add_argument("--repeat", type=int, default=5, metavar="<count>", help="[default: 5]")
+    run_parser.add_argument("--label", help="name of the run to compare it by")
+    run_parser.add_argument("--history", type=Path, default=history.DEFAULT_HISTORY, metavar="<file>")
+
+    compare_parser = commands.add_parser(
+        "compare", help="flag the phases that got slower between two runs",
+    )
+    compare_parser.add_argument("base", nargs="?", default="-2", help="index or label [default: -2]")
+    compare_parser.add_argument("head", nargs="?", default="-1", help="index or label [default: -1]")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=history.DEFAULT_THRESHOLD,
+        metavar="<ratio>",
+        help=f"slowdown of the median that is a regression [default: {history.DEFAULT_THRESHOLD}]",
+    )
+    compare_parser.add_argument(
+        "--history", type=Path, default=history.DEFAULT_HISTORY, metavar="<file>",
+    )
+
+    corpus_parser = commands.add_parser("corpus", help="generate modules with planted clones")
+    corpus_parser.add_argument("directory", type=Path)
+    corpus_parser.add_argument(
+        "--modules", type=int, default=10, metavar="<count>", help="[default: 10]",
+    )
+    corpus_parser.add_argument(
+        "--fragments", type=int, default=10, metavar="<count>", help="per module [default: 10]",
+    )
+    corpus_parser.add_argument(
+        "--depth", type=int, default=2, metavar="<depth>", help="nesting of the fragments [default: 2]",
+    )
+    corpus_parser.add_argument(
+        "--density", type=float, default=0.3, metavar="<ratio>", help="planted fragments [default: 0.3]",
+    )
+    corpus_parser.add_argument(
+        "--type2", type=float, default=0.5, metavar="<ratio>", help="renamed groups [default: 0.5]",
+    )
+    corpus_parser.add_argument("--seed", type=int, default=0, metavar="<seed>", help="[default: 0]")
+    corpus_parser.add_argument(
+        "--verify", action="store_true", help="check that the analysis finds exactly the planted groups",
+    )
+
+    stdlib_parser = commands.add_parser(
+        "stdlib", help="time the check on the standard library with an empty and a filled cache",
+    )
+    stdlib_parser.add_argument("paths", nargs="*", help="[default: the Lib dir of this interpreter]")
+    stdlib_parser.add_argument(
+        "--scenario",
+        nargs="*",
+        choices=list(stdlib.SCENARIOS),
+        metavar="<name>",
+        help=f"{', '.join(stdlib.SCENARIOS)} [default: {', '.join(stdlib.DEFAULT_SCENARIOS)}]",
+    )
+    stdlib_parser.add_argument("--repeat", type=int, default=1, metavar="<count>", help="[default: 1]")
+    stdlib_parser.add_argument("--jobs", type=int, default=1, metavar="<count>", help="[default: 1]")
+    stdlib_parser.add_argument("--label", help="name of the run to compare it by")
+    stdlib_parser.add_argument("--history", type=Path, default=history.DEFAULT_HISTORY, metavar="<file>")
+
+    return parser
+
+
+def run(args: argparse.Namespace) -> int:
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), _RECURSION_LIMIT))
+
+    corpus = Corpus(args.paths)
+    print(f"Corpus: {len(corpus.paths)} files, {corpus.lines} lines")
+
+    results = {}
+    with isolated_cache():
+        all_phases = phases(corpus)
+        unknown = set(args.phase or []) - all_phases.keys()
+        if unknown:
+            print(f"Unknown phases: {', '.join(sorted(unknown))}, available: {', '.join(all_phases)}")
+            return 2
+
+        for name, phase in all_phases.items():
+            if args.phase and name not in args.phase:
+                continue
+            timing = measure(phase.run, phase.setup, warmup=args.warmup, repeat=args.repeat)
+            results[name] = timing.to_dict()
+            print(f"{name:<14} median {_ms(timing.median)}   p95 {_ms(timing.p95)}")
+
+    history.append(
+        {
+            **_environment(args.label),
+            "corpus": {"paths": args.paths, "files": len(corpus.paths), "lines": corpus.lines},
+            "warmup": args.warmup,
+            "repeat": args.repeat,
+            "phases": results,
+        },
+        args.history,
+    )
+    print(f"Saved to {args.history}")
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    records = history.load(args.history)
+    try:
+        base = history.find(records, args.base)
+        head = history.find(records, args.head)
+    except LookupError as e:
+        print(e)
+        return 2
+
+    regressions = 0
+    changes = history.compare(base, head)
+    width = max((len(change.phase) for change in changes), default=0)
+    for change in changes:
+        is_regression = change.is_regression(args.threshold)
+        regressions += is_regression
+        print(
+            f"{change.phase:<{width}} {_ms(change.base.median)} -> {_ms(change.head.median)}"
+            f"  {change.ratio:6.2f}x{'  REGRESSION' if is_regression else ''}",
+        )
+
+    print(f"Regressions: {regressions}")
+    return 1 if regressions else 0
+
+
+def run_stdlib(args: argparse.Namespace) -> int:
+    paths = args.paths or [str(stdlib.stdlib_path())]
+    try:
+        files, lines = stdlib.count_lines(paths)
+    except FileNotFoundError as e:
+        print(e)
+        return 2
+    print(f"Corpus: {files} files, {lines} lines")
+
+    results, phase_timings = {}, {}
+    for scenario in args.scenario or stdlib.DEFAULT_SCENARIOS:
+        try:
+            result = stdlib.run_scenario(paths, scenario, repeat=args.repeat, jobs=args.jobs)
+        except RuntimeError as e:
+            print(e)
+            return 1
+
+        results[scenario] = result.to_dict()
+        phase_timings[f"stdlib-{scenario}-cold"] = result.cold.to_dict()
+        phase_timings[f"stdlib-{scenario}-warm"] = result.warm.to_dict()
+        print(
+            f"{scenario:<14} cold {_ms(result.cold.median)} {lines / result.cold.median:10.0f} lines/s"
+            f"   warm {_ms(result.warm.median)}   peak RSS {_mib(result.peak_rss)}",
+        )
+
+    history.append(
+        {
+            **_environment(args.label),
+            "corpus": {"paths": paths, "files": files, "lines": lines},
+            "repeat": args.repeat,
+            "jobs": args.jobs,
+            "phases": phase_timings,
+            "stdlib": results,
+        },
+        args.history,
+    )
+    print(f"Saved to {args.history}")
+    return 0
+
+
+def generate_corpus(args: argparse.Namespace) -> int:
+    spec = corpus.CorpusSpec(
+        modules=args.modules,
+        fragments=args.fragments,
+        depth=args.depth,
+        clone_density=args.density,
+        type2_ratio=args.type2,
+        seed=args.seed,
+    )
+    groups = corpus.generate(args.directory, spec)
+    print(
+        f"Planted {len(groups)} groups, {sum(g.clone_type == 2 for g in groups)} of them Type-2,"
+        f" in {args.directory}",
+    )
+    if not args.verify:
+        return 0
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), _RECURSION_LIMIT))
+    paths = sorted(args.directory.glob("*.py"))
+    clones = CloneFinder(count=2, length=corpus.MAX_LENGTH).chained_find_all(paths)
+    verification = corpus.verify(args.directory, groups, clones)
+    for group in verification.missed:
+        print(f"Missed group {group.id} ({group.kind}, Type-{group.clone_type})")
+    for blocks in verification.unexpected:
+        print(f"Unexpected group: {', '.join(f'{b.path}:{b.lineno}' for b in blocks)}")
+
+    print("Exact" if verification.is_exact else "Mismatch")
+    return 0 if verification.is_exact else 1
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    commands = {"run": run, "compare": compare, "corpus": generate_corpus, "stdlib": run_stdlib}
+    return commands[args.command](args)
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:10.2f} ms"
+
+
+def _mib(size: int | None) -> str:
+    return "unknown" if size is None else f"{size / (1 << 20):.1f} MiB"
+
+
+def _environment(label: str | None) -> dict:
+    return {
+        "label": label,
+        "timestamp": datetime.datetime.now(datetime.UTC).isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+
+
+def _commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, check=True, text=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""Deterministic synthetic corpus with planted clones and their ground truth
+
+Every compound statement of the corpus starts with a stamp: an assignment whose chain
+of operators spells a number that is unique in the corpus. Operators take part in
+the templates, so two compound statements share a template only when they are copies
+of the same planted fragment. A Type-1 copy repeats the fragment, a Type-2 copy
+renames its variables and changes its constants.
+"""
+
+import dataclasses
+import itertools
+import json
+import os
+import random
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from pyfactoring.utils.pyclones import CloneFinder, CodeBlockClone
+
+
+GROUND_TRUTH = "ground_truth.json"
+
+_OPERATORS = ("+", "-", "*", "/", "//", "%", "<<", ">>", "|", "^", "&")
+_WORDS = (
+    "total", "value", "item", "count", "index", "result", "buffer", "record", "node", "entry",
+    "offset", "limit", "score", "weight", "label", "token", "chunk", "state", "delta", "level",
+)
+_PLACEHOLDER = re.compile(r"\$([vcs])(\d+)")
+
+# kinds that are only valid inside an async function
+_ASYNC_KINDS = ("AsyncFor", "AsyncWith")
+# a planted fragment spans more lines, so it is found with any `length` up to it
+MAX_LENGTH = 8
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    modules: int = 10
+    fragments: int = 10
+    depth: int = 2
+    clone_density: float = 0.3
+    max_copies: int = 3
+    type2_ratio: float = 0.5
+    seed: int = 0
+
+
+@dataclass(frozen=True)
+class PlantedBlock:
+    path: str
+    lineno: int
+    end_lineno: int
+
+
+@dataclass
+class PlantedGroup:
+    id: int
+    clone_type: int
+    kind: str
+    blocks: list[PlantedBlock] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class Verification:
+    """Planted groups the analysis missed and found groups that were not planted"""
+
+    missed: list[PlantedGroup]
+    unexpected: list[list[PlantedBlock]]
+
+    @property
+    def is_exact(self) -> bool:
+        return not self.missed and not self.unexpected
+
+
+class _Fragment:
+    """Lines of a fragment with `$v`, `$c` and `$s` placeholders for names and constants"""
+
+    def __init__(self, rng: random.Random, stamps: Iterator[int], kinds: tuple[str, ...]):
+        self.lines: list[str] = []
+        self.names = 0
+        self.consts = 0
+        self.strings = 0
+        self._rng = rng
+        self._stamps = stamps
+        self._kinds = kinds
+        # index and indent of the first stamp, the fragment is padded after it
+        self._first_stamp: tuple[int, str] | None = None
+
+    def name(self) -> str:
+        self.names += 1
+        return f"$v{self.names - 1}"
+
+    def const(self) -> str:
+        self.consts += 1
+        return f"$c{self.consts - 1}"
+
+    def string(self) -> str:
+        self.strings += 1
+        return f"$s{self.strings - 1}"
+
+    def compound(self, kind: str, indent: int, depth: int, names: list[str], *, in_class: bool = False):
+        pad = "    " * indent
+        names = list(names)
+        match kind:
+            case "FunctionDef" | "AsyncFunctionDef":
+                params = [self.name() for _ in range(self._rng.randint(1, 3))]
+                prefix = "async def" if kind == "AsyncFunctionDef" else "def"
+                args = ", ".join(["self", *params] if in_class else params)
+                self.lines.append(f"{pad}{prefix} {self.name()}({args}):")
+                result = self.body(indent + 1, depth, params, is_async=kind == "AsyncFunctionDef")
+                self.lines.append(f"{pad}    return {result}")
+            case "If":
+                self.lines.append(f"{pad}if {self._operand(names)} > {self.const()}:")
+                self.body(indent + 1, depth, names)
+                if self._rng.random() < 0.5:
+                    self.lines.append(f"{pad}else:")
+                    self.body(indent + 1, depth, names)
+            case "For" | "AsyncFor":
+                target = self.name()
+                loop = f"async for {target} in {self._operand(names)}" if kind == "AsyncFor" else (
+                    f"for {target} in range({self.const()})"
+                )
+                self.lines.append(f"{pad}{loop}:")
+                self.body(indent + 1, depth, [*names, target])
+            case "While":
+                counter = self._rng.choice(names) if names else self.name()
+                self.lines.append(f"{pad}while {counter} < {self.const()}:")
+                self.lines.append(f"{pad}    {counter} += {self.const()}")
+                self.body(indent + 1, depth, names)
+            case "With" | "AsyncWith":
+                target = self.name()
+                prefix = "async with" if kind == "AsyncWith" else "with"
+                self.lines.append(f"{pad}{prefix} open({self._operand(names)}) as {target}:")
+                self.body(indent + 1, depth, [*names, target])
+            case "Try" | "TryStar":
+                self.lines.append(f"{pad}try:")
+                self.body(indent + 1, depth, names)
+                if kind == "TryStar":
+                    self.lines.append(f"{pad}except* ValueError:")
+                    self.body(indent + 1, depth, names)
+                else:
+                    error = self.name()
+                    self.lines.append(f"{pad}except ValueError as {error}:")
+                    self.body(indent + 1, depth, [*names, error])
+            case "Match":
+                self._match(indent, depth, names)
+            case _:
+                raise ValueError(f"Unsupported kind of fragment: {kind}")
+
+    def body(self, indent: int, depth: int, names: list[str], *, is_async: bool = False) -> str:
+        """Writes a block that starts with a unique stamp
+
+        :return: name assigned by the stamp
+        """
+
+        pad = "    " * indent
+        names = list(names)
+        stamp = self._stamp(names)
+        if self._first_stamp is None:
+            self._first_stamp = (len(self.lines), pad)
+        self.lines.append(f"{pad}{stamp} = {self._stamp_value(names)}")
+        names.append(stamp)
+
+        for _ in range(self._rng.randint(1, 3)):
+            self.lines.append(pad + self._statement(names))
+
+        if depth > 0 and self._rng.random() < 0.7:
+            kinds = [k for k in self._kinds if is_async or k not in _ASYNC_KINDS]
+            self.compound(self._rng.choice(kinds), indent, depth - 1, names)
+        return stamp
+
+    def pad(self, length: int):
+        """Adds statements to the first block until the fragment has more lines than the length"""
+
+        index, pad = self._first_stamp
+        while len(self.lines) <= length:
+            self.lines.insert(index + 1, f"{pad}print({self.const()}, {self.string()})")
+
+    def _match(self, indent: int, depth: int, names: list[str]):
+        pad = "    " * indent
+        self.lines.append(f"{pad}match {self._operand(names)}:")
+        self.lines.append(f"{pad}    case {self.const()}:")
+        self.body(indent + 2, depth, names)
+        first, rest = self.name(), self.name()
+        self.lines.append(f"{pad}    case [{first}, *{rest}]:")
+        self.body(indent + 2, depth, [*names, first, rest])
+        self.lines.append(f"{pad}    case _:")
+        self.body(indent + 2, depth, names)
+
+    def _stamp(self, names: list[str]) -> str:
+        return self.name() if not names or self._rng.random() < 0.5 else self._rng.choice(names)
+
+    def _stamp_value(self, names: list[str]) -> str:
+        number = next(self._stamps)
+        digits = []
+        while True:
+            number, digit = divmod(number, len(_OPERATORS))
+            digits.append(digit)
+            if not number:
+                break
+
+        parts = [self._operand(names)]
+        for digit in reversed(digits):
+            parts.extend((_OPERATORS[digit], self._operand(names)))
+        return " ".join(parts)
+
+    def _statement(self, names: list[str]) -> str:
+        match self._rng.randrange(4):
+            case 0:
+                target, value = self.name(), f"[{self._operand(names)}, {self.const()}]"
+            case 1:
+                return f"{self._rng.choice(names)} += {self.const()}"
+            case 2:
+                return f"print({self._operand(names)}, {self.string()})"
+            case _:
+                target, value = self.name(), f"{{{self.string()}: {self._operand(names)}}}"
+        # the assigned name is only used by the later statements
+        names.append(target)
+        return f"{target} = {value}"
+
+    def _operand(self, names: list[str]) -> str:
+        return self._rng.choice(names) if names and self._rng.random() < 0.7 else self.const()
+
+
+def generate(directory: str | Path, spec: CorpusSpec = CorpusSpec()) -> list[PlantedGroup]:
+    """Writes the modules of the corpus along with the ground truth of its planted clones
+
+    :param directory: directory to write `module_<n>.py` files and `ground_truth.json` to
+    :param spec: shape of the corpus, the same spec always gives the same corpus
+    :return: planted groups
+    """
+
+    rng = random.Random(spec.seed)
+    stamps = itertools.count()
+    kinds = tuple(k for k in CloneFinder().allowed_nodes if k != "ClassDef")
+    top_kinds = tuple(k for k in kinds if k not in _ASYNC_KINDS)
+
+    slots = [(module, position) for module in range(spec.modules) for position in range(spec.fragments)]
+    rng.shuffle(slots)
+    planted = round(len(slots) * spec.clone_density)
+
+    groups: list[PlantedGroup] = []
+    units: dict[tuple[int, int], tuple[PlantedGroup | None, list[str]]] = {}
+    while planted - sum(len(g.blocks) for g in groups) >= 2:
+        left = planted - sum(len(g.blocks) for g in groups)
+        copies = rng.randint(2, max(2, min(spec.max_copies, left)))
+        kind = rng.choice(top_kinds)
+        in_class = kind in ("FunctionDef", "AsyncFunctionDef") and rng.random() < 0.3
+        fragment = _fragment(rng, stamps, kinds, kind, spec.depth, in_class=in_class)
+
+        group = PlantedGroup(len(groups), 2 if rng.random() < spec.type2_ratio else 1, kind)
+        original = _instantiate(fragment, rng, suffix=0)
+        for copy in range(copies):
+            # a Type-1 copy repeats the original, a Type-2 copy gets its own names and constants
+            is_renamed = copy > 0 and group.clone_type == 2
+            lines = _instantiate(fragment, rng, suffix=copy) if is_renamed else original
+            units[slots.pop()] = (group, _in_class(lines, next(stamps)) if in_class else lines)
+            group.blocks.append(PlantedBlock("", 0, 0))
+        groups.append(group)
+
+    for slot in slots:
+        kind = rng.choice(top_kinds)
+        fragment = _fragment(rng, stamps, kinds, kind, spec.depth)
+        units[slot] = (None, _instantiate(fragment, rng, suffix=0))
+
+    # the blocks are located once the modules are laid out
+    located = {group.id: [] for group in groups}
+    directory = Path(directory)
+    os.makedirs(directory, exist_ok=True)
+    for module in range(spec.modules):
+        path = f"module_{module:04}.py"
+        lines = [f'"""Generated module {module}"""', "", "import os", ""]
+        lines += [f"SETTING_{module} = {module}"]
+        for position in range(spec.fragments):
+            group, unit = units[(module, position)]
+            lines += ["", ""]
+            if group is not None:
+                # the class line of a method is not a part of the fragment
+                offset = 1 if unit[0].startswith("class ") else 0
+                lineno = len(lines) + 1 + offset
+                located[group.id].append(PlantedBlock(path, lineno, len(lines) + len(unit)))
+            lines.extend(unit)
+
+        with open(directory / path, "w", encoding="utf-8") as module_file:
+            module_file.write("\n".join(lines) + "\n")
+
+    for group in groups:
+        group.blocks = located[group.id]
+    with open(directory / GROUND_TRUTH, "w", encoding="utf-8") as truth_file:
+        json.dump(
+            {"spec": dataclasses.asdict(spec), "groups": [dataclasses.asdict(g) for g in groups]},
+            truth_file,
+            indent=2,
+        )
+    return groups
+
+
+def load_ground_truth(directory: str | Path) -> list[PlantedGroup]:
+    with open(Path(directory) / GROUND_TRUTH, "r", encoding="utf-8") as truth_file:
+        truth = json.load(truth_file)
+
+    return [
+        PlantedGroup(
+            group["id"], group["clone_type"], group["kind"],
+            [PlantedBlock(**block) for block in group["blocks"]],
+        )
+        for group in truth["groups"]
+    ]
+
+
+def verify(
+        directory: str | Path, groups: Iterable[PlantedGroup], clones: dict[str, list[CodeBlockClone]],
+) -> Verification:
+    """Matches the chained clones of the corpus against its planted groups
+
+    Every planted group must be found with exactly its blocks. Compound statements nested
+    in the copies of a fragment are found as groups of their own, so only the found groups
+    with a block outside every planted fragment are unexpected.
+    """
+
+    directory = Path(directory)
+    groups = list(groups)
+    found = {
+        frozenset(_planted_block(directory, block) for block in blocks)
+        for blocks in clones.values()
+    }
+
+    fragments: dict[str, list[PlantedBlock]] = {}
+    for group in groups:
+        for block in group.blocks:
+            fragments.setdefault(block.path, []).append(block)
+
+    def is_planted(block: PlantedBlock) -> bool:
+        return any(
+            outer.lineno <= block.lineno and block.end_lineno <= outer.end_lineno
+            for outer in fragments.get(block.path, [])
+        )
+
+    return Verification(
+        missed=[group for group in groups if frozenset(group.blocks) not in found],
+        unexpected=[
+            sorted(blocks, key=lambda b: (b.path, b.lineno))
+            for blocks in found
+            if not all(is_planted(block) for block in blocks)
+        ],
+    )
+
+
+def _fragment(
+        rng: random.Random,
+        stamps: Iterator[int],
+        kinds: tuple[str, ...],
+        kind: str,
+        depth: int,
+        *,
+        in_class: bool = False,
+) -> _Fragment:
+    fragment = _Fragment(rng, stamps, kinds)
+    fragment.compound(kind, 0, depth, [], in_class=in_class)
+    # a shallow fragment may come out too short to be found
+    fragment.pad(MAX_LENGTH)
+    return fragment
+
+
+def _instantiate(fragment: _Fragment, rng: random.Random, *, suffix: int) -> list[str]:
+    """Fills the placeholders with distinct constants and names that end with the suffix"""
+
+    words = rng.sample(_WORDS, len(_WORDS))
+    values = {
+        "v": [f"{words[i % len(words)]}_{i}_{suffix}" for i in range(fragment.names)],
+        # distinct constants keep the numbering of the template constants the same in every copy
+        "c": [str(c) for c in rng.sample(range(2, 10_000), fragment.consts)],
+        "s": [f'"{word}_{i}"' for i, word in enumerate(rng.choices(_WORDS, k=fragment.strings))],
+    }
+    return [_PLACEHOLDER.sub(lambda m: values[m[1]][int(m[2])], line) for line in fragment.lines]
+
+
+def _in_class(lines: list[str], stamp: int) -> list[str]:
+    return [f"class Holder{stamp}:", *("    " + line for line in lines)]
+
+
+def _planted_block(directory: Path, block: CodeBlockClone) -> PlantedBlock:
+    path = Path(block.file).relative_to(directory).as_posix()
+    return PlantedBlock(path, block.lineno, block.end_lineno)
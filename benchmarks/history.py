@@ -0,0 +1,76 @@
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from benchmarks.timing import Timing
+
+
+DEFAULT_HISTORY = Path(".benchmarks") / "history.json"
+
+# a phase regresses only when it is slower by both margins, so tiny phases do not flap
+DEFAULT_THRESHOLD = 0.10
+_MIN_DELTA = 0.001
+
+
+@dataclass(frozen=True)
+class Change:
+    phase: str
+    base: Timing
+    head: Timing
+
+    @property
+    def ratio(self) -> float:
+        return self.head.median / self.base.median if self.base.median else float("inf")
+
+    def is_regression(self, threshold: float = DEFAULT_THRESHOLD) -> bool:
+        return self.ratio > 1 + threshold and self.head.median - self.base.median > _MIN_DELTA
+
+
+def load(path: Path = DEFAULT_HISTORY) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+
+    with open(path, "r", encoding="utf-8") as history_file:
+        return json.load(history_file)
+
+
+def append(record: dict, path: Path = DEFAULT_HISTORY):
+    records = load(path)
+    records.append(record)
+
+    os.makedirs(path.parent, exist_ok=True)
+    # written aside and moved, so an interrupted run never truncates the history
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as history_file:
+        json.dump(records, history_file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def find(records: list[dict], ref: str) -> dict:
+    """Finds a run by its index in the history, negative indices count from the end, or by its label
+
+    :raise LookupError: there is no such run
+    """
+
+    try:
+        return records[int(ref)]
+    except ValueError:
+        pass
+    except IndexError as e:
+        raise LookupError(f"No run with the index {ref}, the history has {len(records)}") from e
+
+    for record in reversed(records):
+        if record.get("label") == ref:
+            return record
+    raise LookupError(f"No run with the label {ref!r}")
+
+
+def compare(base: dict, head: dict) -> list[Change]:
+    """Pairs the phases that both runs measured"""
+
+    return [
+        Change(phase, Timing.from_dict(base["phases"][phase]), Timing.from_dict(timing))
+        for phase, timing in head["phases"].items()
+        if phase in base["phases"]
+    ]
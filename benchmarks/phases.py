@@ -0,0 +1,135 @@
+import ast
+import contextlib
+import io
+import os
+import tempfile
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from pyfactoring.core import analysis, cache
+from pyfactoring.core.action_format import format_files
+from pyfactoring.settings import common_settings, pyclones_settings
+from pyfactoring.utils import extract
+from pyfactoring.utils.path import separate_filepaths
+from pyfactoring.utils.pyclones import CloneFinder
+from pyfactoring.utils.pyclones.hasher import hash_tree
+from pyfactoring.utils.pydioms import IdiomFinder, prefixtree
+
+
+@dataclass
+class Corpus:
+    """Files of a benchmark, with the results of the phases the later phases start from"""
+
+    roots: list[str]
+    paths: list[Path] = field(default_factory=list, init=False)
+    sources: list[str] = field(default_factory=list, init=False, repr=False)
+    modules: list[ast.Module] = field(default_factory=list, init=False, repr=False)
+
+    def __post_init__(self):
+        self.roots = [os.path.abspath(root) for root in self.roots]
+        for path in discover(self.roots):
+            try:
+                source = extract.file_source(path)
+                module = ast.parse(source)
+            except (SyntaxError, UnicodeDecodeError):
+                # the analysis skips such files as well
+                continue
+            self.paths.append(path)
+            self.sources.append(source)
+            self.modules.append(module)
+
+    @property
+    def lines(self) -> int:
+        return sum(source.count("\n") for source in self.sources)
+
+
+@dataclass(frozen=True)
+class Phase:
+    name: str
+    run: Callable[[Any], Any]
+    setup: Callable[[], Any] = lambda: None
+
+
+def discover(roots: list[str]) -> list[Path]:
+    single_paths, _ = separate_filepaths(roots, [], exclude=common_settings.exclude)
+    return single_paths
+
+
+def phases(corpus: Corpus) -> dict[str, Phase]:
+    """Builds the phases of the analysis, each of them starts from prepared inputs
+
+    Only the work of the phase itself is timed: parsing starts from the read sources,
+    templatizing from the colliding shapes, the idiom search from built trees.
+    The templatizing parses and hashes the sources again, the earlier phases tell these apart.
+    """
+
+    packed = analysis.clone_spans(corpus.paths)
+
+    def colliding_shapes() -> list[set[int]]:
+        finder = CloneFinder()
+        shapes = []
+        for path, source in zip(corpus.paths, corpus.sources):
+            buckets = finder.find_shapes(path, source)
+            shapes.append({h for h, count in buckets.items() if count >= pyclones_settings.count})
+        return shapes
+
+    def templatize(shapes: list[set[int]]):
+        finder = CloneFinder()
+        for path, source, path_shapes in zip(corpus.paths, corpus.sources, shapes):
+            finder.find_all(path, shapes=path_shapes, source=source)
+
+    def build_trees() -> list[prefixtree.PrefixTree]:
+        trees = []
+        for path, source in zip(corpus.paths, corpus.sources):
+            tree = prefixtree.PrefixTree()
+            tree.add_tree(path, source)
+            trees.append(tree)
+        return trees
+
+    def search_idioms(trees: list[prefixtree.PrefixTree]):
+        idiom_finder = IdiomFinder()
+        for tree in trees:
+            idiom_finder.find_all(tree)
+
+    def store_cache(_):
+        cache.clone_cache(dict(zip(corpus.paths, packed)))
+
+    def load_cache(_):
+        cache.clone_retrieve(corpus.paths)
+
+    def format_corpus(_):
+        # the files are formatted in memory, only the progress messages are dropped
+        with contextlib.redirect_stdout(io.StringIO()):
+            format_files(corpus.paths)
+
+    return {
+        phase.name: phase
+        for phase in (
+            Phase("discovery", lambda _: discover(corpus.roots)),
+            Phase("read", lambda _: [extract.file_source(path) for path in corpus.paths]),
+            Phase("parse", lambda _: [ast.parse(source) for source in corpus.sources]),
+            Phase("hash", lambda _: [hash_tree(module) for module in corpus.modules]),
+            Phase("templatize", templatize, setup=colliding_shapes),
+            Phase("cache-store", store_cache),
+            Phase("cache-load", load_cache, setup=lambda: store_cache(None)),
+            Phase("idiom-tree", lambda _: build_trees()),
+            Phase("idiom-search", search_idioms, setup=build_trees),
+            Phase("format", format_corpus),
+        )
+    }
+
+
+@contextlib.contextmanager
+def isolated_cache() -> Iterator[Path]:
+    """Runs in a temporary dir, so the caches of the benchmark never touch the project"""
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="pyfactoring-bench-") as tmp:
+        os.chdir(tmp)
+        try:
+            cache.create_dir()
+            yield Path(tmp)
+        finally:
+            os.chdir(cwd)
@@ -0,0 +1,161 @@
+"""Benchmark of `check` on the standard library of the running interpreter
+
+Every run of a scenario is a child process `python -m benchmarks.stdlib <check arguments>`
+in a temporary dir, so it starts with an empty cache, and its peak RSS is its own.
+The same check run again in that dir is the warm run.
+"""
+
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from benchmarks.phases import discover
+from benchmarks.timing import Timing
+from pyfactoring import settings
+from pyfactoring.arguments import parse_args
+from pyfactoring.core import cache
+from pyfactoring.core.action_check import action_check
+
+
+try:
+    import resource
+except ImportError:
+    # only on Unix, the peak RSS is not measured elsewhere
+    resource = None
+
+
+# arguments of the check without its paths, the idiom scenarios run the clone analysis as well
+SCENARIOS = {
+    "single": ["check"],
+    "chained": ["check", "--chain-all"],
+    "single+idioms": ["--pd-enable", "check"],
+    "chained+idioms": ["--pd-enable", "check", "--chain-all"],
+}
+# the chained idioms of the whole stdlib take tens of minutes and gigabytes, they are opt-in
+DEFAULT_SCENARIOS = ["single", "chained", "single+idioms"]
+# the third-party packages differ between installations
+EXCLUDE = ["site-packages", "dist-packages"]
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+@dataclass
+class ScenarioResult:
+    cold: Timing
+    warm: Timing
+    # the highest of the runs, in bytes, the workers are measured apart from the main process
+    peak_rss: int | None = None
+    workers_peak_rss: int | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "cold": self.cold.to_dict(),
+            "warm": self.warm.to_dict(),
+            "peak_rss": self.peak_rss,
+            "workers_peak_rss": self.workers_peak_rss,
+        }
+
+
+@dataclass(frozen=True)
+class _ChildRun:
+    seconds: float
+    peak_rss: int | None
+    workers_peak_rss: int | None
+
+
+def stdlib_path() -> Path:
+    return Path(sysconfig.get_path("stdlib"))
+
+
+def count_lines(roots: list[str]) -> tuple[int, int]:
+    """Counts the files and lines that `check` walks, excluding the third-party packages
+
+    :return: number of files and number of lines
+    """
+
+    paths = [path for path in discover(roots) if not any(part in EXCLUDE for part in path.parts)]
+    lines = 0
+    for path in paths:
+        with open(path, "rb") as source_file:
+            lines += source_file.read().count(b"\n")
+    return len(paths), lines
+
+
+def run_scenario(roots: list[str], scenario: str, *, repeat: int = 1, jobs: int = 1) -> ScenarioResult:
+    """Runs the cold and the warm check of a scenario, each time with a new cache"""
+
+    # the check runs in a temporary dir
+    roots = [os.path.abspath(root) for root in roots]
+    argv = [*SCENARIOS[scenario], *roots, "--exclude", *EXCLUDE, "--jobs", str(jobs)]
+    cold, warm, peaks, worker_peaks = [], [], [], []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix="pyfactoring-stdlib-") as tmp:
+            for runs in (cold, warm):
+                child_run = _run_child(argv, tmp)
+                runs.append(child_run.seconds)
+                peaks.append(child_run.peak_rss)
+                worker_peaks.append(child_run.workers_peak_rss)
+
+    return ScenarioResult(
+        Timing(tuple(cold)),
+        Timing(tuple(warm)),
+        max(peaks) if None not in peaks else None,
+        max(worker_peaks) if None not in worker_peaks else None,
+    )
+
+
+def _run_child(argv: list[str], cwd: str) -> _ChildRun:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (str(_REPO_ROOT), env.get("PYTHONPATH"))))
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.stdlib", *argv],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"The check failed with the code {result.returncode}:\n{result.stderr}")
+    return _ChildRun(**json.loads(result.stdout.splitlines()[-1]))
+
+
+def _peak_rss(*, of_children: bool = False) -> int | None:
+    if resource is None:
+        return None
+    # kilobytes on Linux, bytes on macOS
+    who = resource.RUSAGE_CHILDREN if of_children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _check(argv: Sequence[str]):
+    """Runs the check in this process and prints its time and peak RSS as the last line"""
+
+    settings.configure(parse_args(argv))
+    # the caches are what the warm run measures, whatever the config says
+    settings.common_settings.no_cache = False
+    cache.create_dir()
+
+    # the report is built and written as usual, only nobody reads it
+    start = time.perf_counter()
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        is_checked = action_check(color=False)
+    seconds = time.perf_counter() - start
+    if not is_checked:
+        sys.exit(f"The paths or the changes of the check could not be read: {' '.join(argv)}")
+
+    child_run = _ChildRun(seconds, _peak_rss(), _peak_rss(of_children=True))
+    print(json.dumps(asdict(child_run)))
+
+
+if __name__ == "__main__":
+    _check(sys.argv[1:])
@@ -0,0 +1,60 @@
+import math
+import statistics
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class Timing:
+    """Wall times of the measured runs of a phase, in seconds"""
+
+    runs: tuple[float, ...]
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.runs)
+
+    @property
+    def p95(self) -> float:
+        # nearest rank, so the value is always one of the runs
+        ordered = sorted(self.runs)
+        return ordered[math.ceil(0.95 * len(ordered)) - 1]
+
+    def to_dict(self) -> dict:
+        return {"median": self.median, "p95": self.p95, "runs": list(self.runs)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Timing":
+        return cls(tuple(data["runs"]))
+
+
+def measure(
+        run: Callable[[Any], Any],
+        setup: Callable[[], Any] = lambda: None,
+        *,
+        warmup: int = 1,
+        repeat: int = 5,
+) -> Timing:
+    """Times the runs of a function after the warmup runs
+
+    :param run: function to time, it takes the result of the setup
+    :param setup: untimed preparation of every run, for the state a run consumes
+    :param warmup: runs that are not recorded, they fill the caches of the interpreter
+    :param repeat: recorded runs
+    """
+
+    if repeat < 1:
+        raise ValueError(f"At least one run must be recorded: repeat={repeat}")
+
+    for _ in range(warmup):
+        run(setup())
+
+    runs = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        runs.append(time.perf_counter() - start)
+    return Timing(tuple(runs))
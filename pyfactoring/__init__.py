@@ -1,5 +1,35 @@
-from pyfactoring.utils import (
-    path, extract,
-    IdiomFinder, idiom, ast_inspect, ast_types, prefixtree,
-    CodeBlockClone, CloneFinder, Templater, Scope
-)
+import importlib
+
+
+# the subsystems are imported on first access, so importing the package itself is cheap
+_EXPORTS = {
+    "path": ("pyfactoring.utils.path", None),
+    "extract": ("pyfactoring.utils.extract", None),
+    "IdiomFinder": ("pyfactoring.utils.pydioms", "IdiomFinder"),
+    "idiom": ("pyfactoring.utils.pydioms.idiom", None),
+    "ast_inspect": ("pyfactoring.utils.pydioms.ast_inspect", None),
+    "ast_types": ("pyfactoring.utils.pydioms.ast_types", None),
+    "prefixtree": ("pyfactoring.utils.pydioms.prefixtree", None),
+    "CodeBlockClone": ("pyfactoring.utils.pyclones", "CodeBlockClone"),
+    "CloneFinder": ("pyfactoring.utils.pyclones", "CloneFinder"),
+    "Templater": ("pyfactoring.utils.pyclones", "Templater"),
+    "Scope": ("pyfactoring.utils.pyclones", "Scope"),
+    "action_check": ("pyfactoring.core.action_check", "action_check"),
+    "action_format": ("pyfactoring.core.action_format", "action_format"),
+    "cache": ("pyfactoring.core.cache", None),
+    "AnalysisSession": ("pyfactoring.core.analysis", "AnalysisSession"),
+    "common_settings": ("pyfactoring.settings", "common_settings"),
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_name, attribute = _EXPORTS[name]
+    module = importlib.import_module(module_name)
+    value = module if attribute is None else getattr(module, attribute)
+    globals()[name] = value
+    return value
@@ -1,5 +1,5 @@
 import argparse
-import os
+from collections.abc import Sequence
 
 
 class _SubcommandHelpFormatter(argparse.RawDescriptionHelpFormatter):
@@ -47,91 +47,153 @@ def _create_base_action_parser(subparser, action: str, is_default: bool = False)
         metavar="<dir/file name>,",
         help="excludes on the given files or directories",
     )
+    _action_parser.add_argument(
+        "--respect-gitignore",
+        action="store_true",
+        help="skips the files ignored by git, in a git work tree they are listed by git itself",
+    )
     _action_parser.add_argument(
         "--no-cache",
         action="store_true",
         help="disables caching for the command and forces it to be executed from scratch",
     )
+    _action_parser.add_argument(
+        "--jobs",
+        type=int,
+        metavar="<count>",
+        help="number of worker processes used for analysis [default: 1]",
+    )
+    _action_parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="displays the number of collected and skipped files",
+    )
 
     return _action_parser
 
 
-parser = argparse.ArgumentParser(
-    prog="pyfactoring",
-    description="Pyfactoring: A linter that will help you find and refactor copy-paste",
-    usage="%(prog)s [OPTIONS] <ACTION> [<path>, ...] [OPTIONS]",
-    formatter_class=_SubcommandHelpFormatter,
-)
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pyfactoring",
+        description="Pyfactoring: A linter that will help you find and refactor copy-paste",
+        usage="%(prog)s [OPTIONS] <ACTION> [<path>, ...] [OPTIONS]",
+        formatter_class=_SubcommandHelpFormatter,
+    )
+
+    # === ACTION === #
+    action_subparser = parser.add_subparsers(title="actions", dest="action")
+    check_parser = _create_base_action_parser(action_subparser, "check", True)
+    check_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keeps checking the changed files and prints only the changed clone groups",
+    )
+    check_parser.add_argument(
+        "--changed-since",
+        metavar="<rev>",
+        help="reports only the clone groups with a block on the lines changed since the git revision",
+    )
+    check_parser.add_argument(
+        "--output-format",
+        choices=["text", "jsonl", "sarif"],
+        metavar="<format>",
+        help="format of the report: text, jsonl or sarif [default: text]",
+    )
+    format_parser = _create_base_action_parser(action_subparser, "format")
+    format_parser.add_argument(
+        "--pack-consts",
+        action="store_true",
+        help="when generating a function, all constants are packed into '*consts'",
+    )
+    format_parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="prints the changes as unified diffs without writing them to the files",
+    )
+    action_subparser.add_parser(
+        name="restore",
+        prog="pyfactoring",
+        usage=f"%(prog)s restore",  # noqa
+        help="restore previous version of files",
+        formatter_class=_SubcommandHelpFormatter,
+    )
+    daemon_parser = action_subparser.add_parser(
+        name="daemon",
+        prog="pyfactoring",
+        usage=f"%(prog)s daemon [--stop]",  # noqa
+        help="keep the analysis warm in a background process, check becomes its client",
+        formatter_class=_SubcommandHelpFormatter,
+    )
+    daemon_parser.add_argument(
+        "--stop",
+        action="store_true",
+        help="stops the daemon listening in the current directory",
+    )
+    action_subparser.add_parser(
+        name="lsp",
+        prog="pyfactoring",
+        usage=f"%(prog)s lsp",  # noqa
+        help="run a language server on stdio that reports clones as diagnostics",
+        formatter_class=_SubcommandHelpFormatter,
+    )
 
-# === ACTION === #
-action_subparser = parser.add_subparsers(title="actions", dest="action")
-check_parser = _create_base_action_parser(action_subparser, "check", True)
-format_parser = _create_base_action_parser(action_subparser, "format")
-format_parser.add_argument(
-    "--pack-consts",
-    action="store_true",
-    help="when generating a function, all constants are packed into '*consts'",
-)
-restore_parser = action_subparser.add_parser(
-    name="restore",
-    prog="pyfactoring",
-    usage=f"%(prog)s restore",  # noqa
-    help="restore previous version of files",
-    formatter_class=_SubcommandHelpFormatter,
-)
+    # === SPECIFIC OPTIONS === #
+    pydioms_group = parser.add_argument_group("pydioms options")
+    pydioms_group.add_argument(
+        "--pd-enable",
+        action="store_true",
+        help="enables idiom analysis",
+    )
+    pydioms_group.add_argument(
+        "--pd-verbose",
+        action="store_true",
+        help="displays additional information",
+    )
+    pydioms_group.add_argument(
+        "--pd-count",
+        type=int,
+        metavar="<count>",
+        help="minimum number of trees considered an idiom [default: 5]",
+    )
+    pydioms_group.add_argument(
+        "--pd-length",
+        type=int,
+        metavar="<length>",
+        help="minimum length of each tree to be processed [default: 20]",
+    )
 
-# === SPECIFIC OPTIONS === #
-pydioms_group = parser.add_argument_group("pydioms options")
-pydioms_group.add_argument(
-    "--pd-enable",
-    action="store_true",
-    help="enables idiom analysis",
-)
-pydioms_group.add_argument(
-    "--pd-verbose",
-    action="store_true",
-    help="displays additional information",
-)
-pydioms_group.add_argument(
-    "--pd-count",
-    type=int,
-    metavar="<count>",
-    help="minimum number of trees considered an idiom [default: 5]",
-)
-pydioms_group.add_argument(
-    "--pd-length",
-    type=int,
-    metavar="<length>",
-    help="minimum length of each tree to be processed [default: 20]",
-)
+    pyclones_group = parser.add_argument_group("pyclones options")
+    pyclones_group.add_argument(
+        "--pc-verbose",
+        action="store_true",
+        help="displays additional information",
+    )
+    pyclones_group.add_argument(
+        "--template-view",
+        action="store_true",
+        help="display template for clone set",
+    )
+    pyclones_group.add_argument(
+        "--template-mode",
+        choices=["code", "tree"],
+        metavar="<mode>",
+        help="selecting the mode for saving templates [default: code]",
+    )
+    pyclones_group.add_argument(
+        "--pc-count",
+        type=int,
+        metavar="<count>",
+        help="minimum number of templates considered a clone [default: 2]",
+    )
+    pyclones_group.add_argument(
+        "--pc-length",
+        type=int,
+        metavar="<length>",
+        help="minimum code fragment length [default: 4]",
+    )
 
-pyclones_group = parser.add_argument_group("pyclones options")
-pyclones_group.add_argument(
-    "--template-view",
-    action="store_true",
-    help="display template for clone set",
-)
-pyclones_group.add_argument(
-    "--template-mode",
-    choices=["code", "tree"],
-    metavar="<mode>",
-    help="selecting the mode for saving templates [default: code]",
-)
-pyclones_group.add_argument(
-    "--pc-count",
-    type=int,
-    metavar="<count>",
-    help="minimum number of templates considered a clone [default: 2]",
-)
-pyclones_group.add_argument(
-    "--pc-length",
-    type=int,
-    metavar="<length>",
-    help="minimum code fragment length [default: 4]",
-)
+    return parser
 
 
-if os.environ.get("PYTEST") == "run":
-    args = None
-else:
-    args = parser.parse_args()
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    return build_parser().parse_args(argv)
@@ -1,3 +1,17 @@
-from pyfactoring.core.action_check import action_check
-from pyfactoring.core.action_format import action_format
-from pyfactoring.core.analysis import idiom_analysis, clone_analysis
+import importlib
+
+
+_EXPORTS = {
+    "AnalysisSession": "pyfactoring.core.analysis",
+    "idiom_analysis": "pyfactoring.core.analysis",
+    "clone_analysis": "pyfactoring.core.analysis",
+}
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
@@ -1,93 +1,169 @@
-import shutil
+import contextlib
+import os
+import sys
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import TextIO
 
 from colorama import Fore, Style
 
-from pyfactoring.core import analysis, cache
+from pyfactoring.core import analysis, cache, index, report
+from pyfactoring.exceptions import GitError
 from pyfactoring.settings import common_settings, pyclones_settings, pydioms_settings
-from pyfactoring.utils.path import separate_filepaths
-
-
-def _display_analysis(title: str, data: list | dict, *, is_idiom: bool = False):
-    if not data:
-        return
-
-    data_type = "idiom" if is_idiom else "clone"
-    terminal_size = shutil.get_terminal_size().columns
-    full_line = '-' * terminal_size
-
-    title = f" {title} "
-    print(Fore.CYAN, title.center(terminal_size, "="), Style.RESET_ALL, sep='')
-
-    def _print(_templates: dict):
-        nonlocal terminal_size, full_line, data_type
-
-        for template, blocks in _templates.items():
-            total_lines = 0
-
-            for block in blocks:
-                lines = block.end_lineno - block.lineno + 1
-                total_lines += lines
-                print(
-                    f"{block.link}: {data_type} found "
-                    f"[{Fore.MAGENTA}lines: {lines}{Style.RESET_ALL}]",
-                )
-
-            print(
-                f"{Fore.GREEN}Total {data_type}s: "
-                f"{Style.RESET_ALL}{len(blocks)}",
-            )
-            print(
-                f"{Fore.MAGENTA}Total lines: "
-                f"{Style.RESET_ALL}{total_lines}",
-            )
-
-            match data_type:
-                case "idiom":
-                    print(
-                        f"{Fore.CYAN}With idiom: "
-                        f"{Style.RESET_ALL}{template}",
-                    )
-                case "clone":
-                    if pyclones_settings.template_view:
-                        print(f"{Fore.CYAN}With template:{Style.RESET_ALL}")
-                        for i, line in enumerate(template.splitlines(), 1):
-                            print(f"{i:3}{'|':^4}{line}")
-            print(full_line)
-
-    if isinstance(data, list):
-        for data in data:
-            _print(data)
-    elif isinstance(data, dict):
-        _print(data)
-
-
-def action_check():
+from pyfactoring.utils import gitdiff
+from pyfactoring.utils.path import DirSnapshot, WalkStats, separate_filepaths
+from pyfactoring.utils.pyclones import CodeBlockClone
+
+
+def display_analysis(title: str, data: list | dict, *, is_idiom: bool = False):
+    with report.TextReport() as text_report:
+        text_report.section(title, data, is_idiom=is_idiom)
+
+
+def action_check(
+        session: analysis.AnalysisSession | None = None,
+        snapshot: DirSnapshot | None = None,
+        *,
+        color: bool | None = None,
+) -> bool:
+    """Finds and displays the clones and idioms of the configured paths
+
+    :param session: warm session to analyze the files with instead of the caches on disk
+    :param snapshot: in-memory dir snapshot to use instead of the one on disk
+    :param color: whether the text report is colored, by default only on a terminal
+    :return: False if the paths or the changes could not be read, the error is displayed then
+    """
+
+    if common_settings.output_format == "text":
+        return _check(session, snapshot, sys.stdout, color)
+
+    # the structured reports own stdout, every other message goes to stderr
+    stream = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        return _check(session, snapshot, stream, color)
+
+
+def _check(  # noqa: PLR0912
+        session: analysis.AnalysisSession | None,
+        snapshot: DirSnapshot | None,
+        stream: TextIO,
+        color: bool | None,
+) -> bool:
+    is_text = common_settings.output_format == "text"
     try:
+        stats = WalkStats()
+        persist_snapshot = snapshot is None and not common_settings.no_cache
+        if persist_snapshot:
+            snapshot = cache.snapshot_retrieve()
         single_paths, chained_paths = separate_filepaths(
-            common_settings.paths, common_settings.chain, exclude=common_settings.exclude,
+            common_settings.paths,
+            common_settings.chain,
+            exclude=common_settings.exclude,
+            stats=stats,
+            respect_gitignore=common_settings.respect_gitignore,
+            snapshot=snapshot,
         )
-
-        if common_settings.no_cache:
-            single_clones = analysis.clone_analysis(single_paths)
-        else:
-            single_clones, uncached_clones = cache.check_retrieve(single_paths)
-            single_clones.extend(analysis.clone_analysis(uncached_clones))
-            cache.check_cache(single_paths, single_clones)
-        _display_analysis("FINDING CLONES IN SINGLE FILES", single_clones)
-
-        chained_clones = analysis.clone_analysis(chained_paths, is_chained=True)
-        _display_analysis("FINDING CLONES IN CHAINED FILES", chained_clones)
-
-        if pydioms_settings.enable:
-            if common_settings.no_cache:
-                single_idioms = analysis.idiom_analysis(single_paths)
-            else:
-                single_idioms, uncached_idioms = cache.check_retrieve(single_paths, is_idiom=True)
-                single_idioms.extend(analysis.idiom_analysis(uncached_idioms))
-                cache.check_cache(single_paths, single_idioms, is_idiom=True)
-            _display_analysis("FINDING IDIOMS IN SINGLE FILES", single_idioms, is_idiom=True)
-
-            chained_idioms = analysis.idiom_analysis(chained_paths, is_chained=True)
-            _display_analysis("FINDING IDIOMS IN CHAINED FILES", chained_idioms, is_idiom=True)
+        if persist_snapshot:
+            cache.snapshot_cache(snapshot)
+        if common_settings.verbose:
+            print(stats, end="\n\n")
+
+        changes = None
+        if common_settings.changed_since is not None:
+            # only the changed files can have new clones within themselves
+            changes = gitdiff.changed_lines(common_settings.changed_since)
+            single_paths = [path for path in single_paths if _absolute(path) in changes]
+
+        with (
+            analysis.process_pool(common_settings.jobs, stdout_to_stderr=not is_text) as executor,
+            report.create_report(common_settings.output_format, stream, color=color) as output,
+        ):
+            single_clones = _single_clones(single_paths, session, executor)
+            output.section("FINDING CLONES IN SINGLE FILES", _changed_groups(single_clones, changes))
+
+            touching = None
+            if changes is not None:
+                touching = [path for path in chained_paths if _absolute(path) in changes]
+            chained_clones = _chained_clones(chained_paths, session, executor, touching)
+            output.section("FINDING CLONES IN CHAINED FILES", _changed_groups(chained_clones, changes))
+
+            if pydioms_settings.enable:
+                if session is not None:
+                    single_idioms = session.idioms(single_paths, executor=executor)
+                elif common_settings.no_cache:
+                    single_idioms = analysis.idiom_analysis(single_paths, executor=executor)
+                else:
+                    single_idioms, uncached_paths = cache.check_retrieve(single_paths, is_idiom=True)
+                    uncached_idioms = analysis.idiom_analysis(uncached_paths, executor=executor)
+                    cache.check_cache(uncached_paths, uncached_idioms, is_idiom=True)
+                    single_idioms.extend(uncached_idioms)
+                single_idioms = _changed_groups(single_idioms, changes)
+                output.section("FINDING IDIOMS IN SINGLE FILES", single_idioms, is_idiom=True)
+
+                if session is not None:
+                    chained_idioms = session.idioms(chained_paths, is_chained=True)
+                else:
+                    chained_idioms = analysis.idiom_analysis(chained_paths, is_chained=True)
+                chained_idioms = _changed_groups(chained_idioms, changes)
+                output.section("FINDING IDIOMS IN CHAINED FILES", chained_idioms, is_idiom=True)
     except FileNotFoundError as e:
         print(f"{Fore.RED}Invalid path to project file or directory:{Style.RESET_ALL} {e}")
+        return False
+    except GitError as e:
+        print(f"{Fore.RED}Changes cannot be read from git:{Style.RESET_ALL} {e.text}")
+        return False
+    return True
+
+
+def _single_clones(
+        paths: list[Path], session: analysis.AnalysisSession | None, executor: Executor | None,
+) -> list[dict[str, list[CodeBlockClone]]]:
+    if session is not None:
+        return session.clones(paths, executor=executor)
+    # with a count of 1 every block is reported, so the cached spans are not enough
+    if common_settings.no_cache or pyclones_settings.count == 1:
+        return analysis.clone_analysis(paths, executor=executor)
+
+    cached_spans, uncached_paths = cache.clone_retrieve(paths)
+    uncached_spans = dict(zip(uncached_paths, analysis.clone_spans(uncached_paths, executor=executor)))
+    cache.clone_cache(uncached_spans)
+    cached_spans.update(uncached_spans)
+    return analysis.filter_clones({path: cached_spans[path] for path in paths})
+
+
+def _chained_clones(
+        paths: list[Path],
+        session: analysis.AnalysisSession | None,
+        executor: Executor | None,
+        touching: list[Path] | None,
+) -> dict[str, list[CodeBlockClone]]:
+    if session is not None:
+        return session.clones(paths, is_chained=True, executor=executor)
+    if common_settings.no_cache:
+        return analysis.clone_analysis(paths, is_chained=True, executor=executor)
+    # the index only looks up the groups of the touched files
+    return index.chained_clone_analysis(paths, executor=executor, touching=touching)
+
+
+def _absolute(path: Path) -> Path:
+    return Path(os.path.abspath(path))
+
+
+def _changed_groups(
+        data: list | dict, changes: dict[Path, list[gitdiff.LineRange]] | None,
+) -> list | dict:
+    """Keeps the groups that have at least one block on the changed lines"""
+
+    if changes is None:
+        return data
+    if isinstance(data, list):
+        return [groups for file_groups in data if (groups := _changed_groups(file_groups, changes))]
+
+    return {
+        template: blocks
+        for template, blocks in data.items()
+        if any(
+            gitdiff.is_changed(changes.get(_absolute(block.file), []), block.lineno, block.end_lineno)
+            for block in blocks
+        )
+    }
@@ -1,65 +1,64 @@
+import contextlib
+import difflib
+import os
+import shutil
+import sys
+import tempfile
 from collections import defaultdict
+from concurrent.futures import Executor
 from pathlib import Path
+from typing import TextIO
 
 from colorama import Fore, Style
 
 from pyfactoring.core import analysis, cache
 from pyfactoring.core.templatedfunc import TemplatedFunc
 from pyfactoring.settings import common_settings
-from pyfactoring.utils.path import separate_filepaths
+from pyfactoring.utils.path import WalkStats, separate_filepaths
 from pyfactoring.utils.pyclones import CodeBlockClone
 
 
-def _read_sources(blocks: list[CodeBlockClone]) -> dict[Path, list[str]]:
-    sources: dict[Path, list[str]] = defaultdict(list)
+def _report(message: str, end: str = "\n"):
+    # the diff mode prints only the diffs
+    if not common_settings.diff:
+        print(message, end=end)
+
+
+def _read_sources(blocks: list[CodeBlockClone], buffers: dict[Path, list[str]]) -> dict[Path, list[str]]:
+    sources: dict[Path, list[str]] = {}
     for block in blocks:
-        if block.file not in sources:
+        if block.file in sources:
+            continue
+
+        if block.file in buffers:
+            sources[block.file] = buffers[block.file]
+        else:
             with open(block.file, "r", encoding="utf-8") as source_file:
                 sources[block.file] = source_file.readlines()
     return sources
 
 
-def _write_sources(sources: dict[Path, list[str]]):
-    for path, source in sources.items():
-        with open(path, "w", encoding="utf-8") as source_file:
-            source_file.writelines(source)
-
-
-def _insert_function_call(sources: dict[Path, list[str]], block: CodeBlockClone, func: TemplatedFunc):
-    shift = int(not func.in_func)
-    call = func.call(block)
-    line = sources[block.file][block.lineno - shift]
+def _flush_sources(buffers: dict[Path, list[str]]):
+    # each file is replaced at once, an interrupted run leaves it either old or formatted
+    for path, source in buffers.items():
+        fd, temp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        try:
+            with open(fd, "w", encoding="utf-8") as temp_file:
+                temp_file.writelines(source)
+            shutil.copymode(path, temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+def _replace_clone_with_call(source: list[str], block: CodeBlockClone, func: TemplatedFunc):
+    # the header of a cloned function stays in place, its body is replaced with the call
+    start = block.lineno - 1 + int(func.in_func)
+    line = source[start]
     indent = " " * (len(line) - len(line.lstrip()))
-    sources[block.file][block.lineno - shift] = f"{indent}{call}\n"
-    print(f"{block.file}:0: {Fore.GREEN}Formatted:{Style.RESET_ALL} clone replaced")
-
-
-def _remove_remaining_clone_parts(
-        sources: dict[Path, list[str]], blocks: list[CodeBlockClone], in_func: bool,
-) -> dict[Path, list[str]]:
-    shift = int(in_func)
-    ends: dict[Path, int] = defaultdict(int)
-    cleared_sources: dict[Path, list[str]] = defaultdict(list)
-
-    for block in blocks:
-        source = sources[block.file]
-        cleared_sources[block.file].extend(
-            source[ends[block.file]:block.lineno + shift],
-        )
-        ends[block.file] = block.end_lineno
-
-    for path, source in sources.items():
-        cleared_sources[path].extend(source[ends[path]:])
-
-    return cleared_sources
-
-
-def _replace_clones_with_calls(
-        sources: dict[Path, list[str]], blocks: list[CodeBlockClone], func: TemplatedFunc,
-) -> dict[Path, list[str]]:
-    for block in blocks:
-        _insert_function_call(sources, block, func)
-    return _remove_remaining_clone_parts(sources, blocks, func.in_func)
+    source[start:block.end_lineno] = [f"{indent}{func.call(block)}\n"]
+    _report(f"{block.file}:0: {Fore.GREEN}Formatted:{Style.RESET_ALL} clone replaced")
 
 
 def _find_lineno_after_class_name(name: str, lines: list[str]) -> int:
@@ -104,22 +103,22 @@ def _insert_func_def_or_import(
         )
         source = sources[block.file][:end_lineno]
 
-        print(f"{block.file}:{len(source)}: {Fore.GREEN}Formatted: {Style.RESET_ALL}", end='')
+        _report(f"{block.file}:{len(source)}: {Fore.GREEN}Formatted: {Style.RESET_ALL}", end='')
 
         if block.class_name:
             line = source[-1]
             indent = " " * (len(line) - len(line.lstrip()) + 4)
             definition = indent.join(func.definition.splitlines(keepends=True))
             source.append(f"{indent}{definition}\n\n")
-            print(f"define {func.name} in class {block.class_name}")
+            _report(f"define {func.name} in class {block.class_name}")
         elif block.file == main_file:
             if end_lineno > 0:
                 source.append("\n\n")
             source.append(f"{func.definition}\n\n")
-            print(f"define {func.name}")
+            _report(f"define {func.name}")
         else:
             source.append(f"{func.import_from(main_file)}\n")
-            print(f"import {func.name}")
+            _report(f"import {func.name}")
 
         source.extend(sources[block.file][end_lineno:])
         changed_sources[block.file] = source
@@ -127,41 +126,141 @@ def _insert_func_def_or_import(
     return changed_sources
 
 
-def _max_len_clone(clones: dict):
-    template = max(clones.keys(), key=len)
-    return template, clones[template]
+def _saved_lines(clone: tuple[str, list[CodeBlockClone]]) -> tuple[int, int]:
+    template, blocks = clone
+    cloned_lines = sum(block.end_lineno - block.lineno + 1 for block in blocks)
+    # each block becomes a call and the template becomes a definition with a header
+    return cloned_lines - len(blocks) - len(template.splitlines()) - 1, len(template)
+
+
+def _plan_batch(clones: dict[str, list[CodeBlockClone]]) -> list[tuple[str, list[CodeBlockClone]]]:
+    """Selects clones without overlapping blocks, the ones that save more lines go first
+
+    :param clones: blocks by template
+    :return: selected templates with their blocks, the main file block goes first
+    """
 
+    taken: dict[Path, list[CodeBlockClone]] = defaultdict(list)
+    plan: list[tuple[str, list[CodeBlockClone]]] = []
 
-def format_files(paths: list[Path], *, is_chained: bool = False):
-    clones_from_files = analysis.clone_analysis(paths, is_chained=is_chained)
+    for template, blocks in sorted(clones.items(), key=_saved_lines, reverse=True):
+        if any(
+            block.lineno <= other.end_lineno and other.lineno <= block.end_lineno
+            for block in blocks
+            for other in taken[block.file]
+        ):
+            continue
+
+        for block in blocks:
+            taken[block.file].append(block)
+        plan.append((template, blocks))
+
+    return plan
+
+
+def _apply_plan(
+        plan: list[tuple[str, list[CodeBlockClone]]], func_id: int, buffers: dict[Path, list[str]],
+) -> dict[Path, list[str]]:
+    sources = _read_sources([block for _, blocks in plan for block in blocks], buffers)
+    funcs: list[TemplatedFunc] = []
+    replacements: dict[Path, list[tuple[CodeBlockClone, TemplatedFunc]]] = defaultdict(list)
+
+    for idx, (template, blocks) in enumerate(plan, func_id):
+        func = TemplatedFunc.make(idx, blocks[0].file, template)
+        funcs.append(func)
+        for block in blocks:
+            replacements[block.file].append((block, func))
+
+    # replacing from the bottom of the file keeps the line numbers of the blocks above valid
+    for path, file_replacements in replacements.items():
+        for block, func in sorted(file_replacements, key=lambda r: r[0].lineno, reverse=True):
+            _replace_clone_with_call(sources[path], block, func)
+
+    for (_, blocks), func in zip(plan, funcs):
+        changed_sources = _insert_func_def_or_import(sources, blocks, func, blocks[0].file)
+        for path, source in changed_sources.items():
+            # definitions are inserted as multiline strings, the next insertions search by lines
+            sources[path] = "".join(source).splitlines(keepends=True)
+
+    buffers.update(sources)
+    return sources
+
+
+def _print_diffs(buffers: dict[Path, list[str]], stream: TextIO):
+    for path, source in buffers.items():
+        with open(path, "r", encoding="utf-8") as source_file:
+            original = source_file.readlines()
+        for line in difflib.unified_diff(original, source, str(path), str(path)):
+            stream.write(line)
+            # only the last line of a file can lack the newline, it is marked as git does
+            if not line.endswith("\n"):
+                stream.write("\n\\ No newline at end of file\n")
+
+
+def format_files(
+        paths: list[Path], *, is_chained: bool = False, executor: Executor | None = None,
+) -> dict[Path, list[str]]:
+    """Extracts clones of the files into functions without writing them to disk
+
+    :param paths: files to format
+    :param is_chained: search for clones across all the files
+    :param executor: pool to analyze the files in
+    :return: lines of the formatted files, only the changed files are included
+    """
+
+    buffers: dict[Path, list[str]] = {}
+    clone_index = analysis.CloneIndex(is_chained=is_chained, executor=executor)
+    clone_index.update(paths)
+    clones_from_files = clone_index.clones()
     paths_with_clones = analysis.paths_with_clones(clones_from_files, is_chained=is_chained)
 
     func_id = 0
     while clones_from_files:
-        if not is_chained:
-            clones_from_files = clones_from_files[0]
+        plan = (
+            _plan_batch(clones_from_files)
+            if is_chained else
+            [clone for clones in clones_from_files for clone in _plan_batch(clones)]
+        )
+        sources = _apply_plan(plan, func_id, buffers)
 
-        template, blocks = _max_len_clone(clones_from_files)
-        sources = _read_sources(blocks)
+        # only the rewritten files are analyzed again
+        clone_index.update(
+            paths_with_clones, changed={path: "".join(source) for path, source in sources.items()},
+        )
+        clones_from_files = clone_index.clones()
+        paths_with_clones = analysis.paths_with_clones(clones_from_files, is_chained=is_chained)
+        func_id += len(plan)
 
-        target: Path = blocks[0].file
-        func = TemplatedFunc.make(func_id, target, template)
+    return buffers
 
-        sources = _replace_clones_with_calls(sources, blocks, func)
-        sources = _insert_func_def_or_import(sources, blocks, func, target)
 
-        _write_sources(sources)
+def action_format():
+    if not common_settings.diff:
+        _format(sys.stdout)
+        return
 
-        clones_from_files = analysis.clone_analysis(paths_with_clones, is_chained=is_chained)
-        paths_with_clones = analysis.paths_with_clones(clones_from_files, is_chained=is_chained)
-        func_id += 1
+    # the diffs own stdout, every other message goes to stderr
+    stream = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        _format(stream)
 
 
-def action_format():
+def _format(stream: TextIO):
     try:
+        stats = WalkStats()
+        snapshot = None if common_settings.no_cache else cache.snapshot_retrieve()
         single_paths, chained_paths = separate_filepaths(
-            common_settings.paths, common_settings.chain, exclude=common_settings.exclude,
+            common_settings.paths,
+            common_settings.chain,
+            exclude=common_settings.exclude,
+            stats=stats,
+            respect_gitignore=common_settings.respect_gitignore,
+            snapshot=snapshot,
         )
+        if snapshot is not None and not common_settings.diff:
+            cache.snapshot_cache(snapshot)
+        if common_settings.verbose:
+            print(stats, end="\n\n")
 
         if not common_settings.no_cache:
             single_paths = cache.format_retrieve(single_paths)
@@ -171,16 +270,28 @@ def action_format():
             print(f"{Fore.RED}Nothing to format{Style.RESET_ALL}")
             return
 
-        cache.store(single_paths, chained_paths)
+        with analysis.process_pool(
+            common_settings.jobs, stdout_to_stderr=common_settings.diff,
+        ) as executor:
+            single_buffers = format_files(single_paths, executor=executor) if single_paths else {}
+            chained_buffers = (
+                format_files(chained_paths, is_chained=True, executor=executor)
+                if chained_paths else {}
+            )
+
+        if common_settings.diff:
+            _print_diffs(single_buffers | chained_buffers, stream)
+            return
 
-        if single_paths:
-            format_files(single_paths)
-            if not common_settings.no_cache:
-                cache.format_cache(single_paths)
+        # only the changed files are backed up before they are replaced
+        if single_buffers or chained_buffers:
+            cache.store(list(single_buffers), list(chained_buffers))
+            _flush_sources(single_buffers | chained_buffers)
 
-        if chained_paths:
-            format_files(chained_paths, is_chained=True)
-            if not common_settings.no_cache:
+        if not common_settings.no_cache:
+            if single_paths:
+                cache.format_cache(single_paths)
+            if chained_paths:
                 cache.format_cache(chained_paths, is_chained=True)
     except FileNotFoundError as e:
         print(f"{Fore.RED}Invalid path to project file or directory:{Style.RESET_ALL} {e}")
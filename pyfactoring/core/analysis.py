@@ -1,39 +1,387 @@
+import contextlib
+import dataclasses
+import functools
+import hashlib
+import os
 import sys
+import threading
+from collections import Counter
+from collections.abc import Callable, Collection, Iterator, Mapping
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
+from typing import Any
 
+from pyfactoring import settings
+from pyfactoring.settings import PyclonesSettings, PydiomsSettings, pyclones_settings
 from pyfactoring.utils.pyclones import CloneFinder, CodeBlockClone
+from pyfactoring.utils.pyclones.hasher import template_digest
 from pyfactoring.utils.pydioms import IdiomFinder, prefixtree
 from pyfactoring.utils.pydioms.idiom import CodeBlockIdiom, Idiom
 
 
+_IDIOM_RECURSION_LIMIT = 100_000
+# the lowest thresholds of the cached spans, so they fit any settings, except a count of 1:
+# it reports every block, so such checks analyze the files without the spans
+_MIN_LENGTH = 1
+_MIN_COUNT = 2
+
+# (lineno, end_lineno, colno, end_colno, class_name, vars, consts)
+Location = tuple[int, int, int, int, str | None, list[str], list[str]]
+# (templates by digest, blocks, (total candidates, templated candidates))
+PackedClones = tuple[dict[bytes, str], list[tuple[bytes, Location]], tuple[int, int]]
+
+# (mtime_ns, size, inode) of a file or the digest of its given source
+_SourceVersion = tuple[int, int, int] | bytes
+
+_NO_CLONES: PackedClones = ({}, [], (0, 0))
+
+_recursion_lock = threading.Lock()
+_recursion_users = 0
+_recursion_limit = sys.getrecursionlimit()
+
+
+@dataclasses.dataclass
+class CloneIndex:
+    """In-memory clones of a set of files that are re-analyzed only when they change
+
+    Packed clones of every file are kept between updates. In the chained mode the shapes
+    of every file are kept as well, so an unchanged file is templatized again only if
+    a changed file adds new colliding shapes to it. Changed files are analyzed from
+    their rewritten sources, which do not have to be written to disk.
+    """
+
+    is_chained: bool = False
+    executor: Executor | None = None
+    paths: list[Path] = dataclasses.field(default_factory=list, init=False)
+    _packed: dict[Path, PackedClones] = dataclasses.field(default_factory=dict, init=False)
+    _shapes: dict[Path, Counter[int]] = dataclasses.field(default_factory=dict, init=False)
+    _templatized: dict[Path, set[int]] = dataclasses.field(default_factory=dict, init=False)
+    _sources: dict[Path, str] = dataclasses.field(default_factory=dict, init=False)
+
+    def update(
+            self,
+            paths: list[Path],
+            changed: Mapping[Path, str] = None,
+            *,
+            is_cancelled: Callable[[], bool] | None = None,
+    ) -> bool:
+        """Restricts the index to the paths and re-analyzes the changed ones
+
+        :param paths: files that remain in the index
+        :param changed: sources of the files that were rewritten since the last update
+        :param is_cancelled: checked in the chained mode before the files are templatized
+        :return: False if the update was cancelled, the clones are then incomplete
+            until the next update
+        """
+
+        changed = changed or {}
+        self._sources.update(changed)
+        self.paths = list(paths)
+        kept = set(self.paths).difference(changed)
+        for cached in (self._packed, self._shapes, self._templatized):
+            for path in cached.keys() - kept:
+                del cached[path]
+
+        if self.is_chained:
+            return self._update_chained(is_cancelled)
+
+        outdated = [path for path in self.paths if path not in self._packed]
+        packed = _map(_find_clones, outdated, self.executor, self._sources_of(outdated))
+        self._packed.update(zip(outdated, packed))
+        return True
+
+    def clones(self) -> list[dict[str, list[CodeBlockClone]]] | dict[str, list[CodeBlockClone]]:
+        if self.is_chained:
+            return _merge_clones(
+                self.paths, [self._packed[path] for path in self.paths], pyclones_settings.count,
+            )
+
+        single = [_unpack_clones(path, *self._packed[path][:2]) for path in self.paths]
+        return [clones for clones in single if clones]
+
+    def _update_chained(self, is_cancelled: Callable[[], bool] | None) -> bool:
+        outdated = [path for path in self.paths if path not in self._shapes]
+        shapes = _map(_find_shapes, outdated, self.executor, self._sources_of(outdated))
+        self._shapes.update(zip(outdated, shapes))
+        if is_cancelled is not None and is_cancelled():
+            # the files to templatize are found from all shapes again by the next update
+            return False
+
+        buckets: Counter[int] = Counter()
+        for path in self.paths:
+            buckets.update(self._shapes[path])
+
+        tasks = []
+        for path in self.paths:
+            colliding = {h for h in self._shapes[path] if buckets[h] >= pyclones_settings.count}
+            if path in self._templatized and colliding <= self._templatized[path]:
+                continue
+
+            self._templatized[path] = colliding
+            if colliding:
+                tasks.append((path, colliding))
+            else:
+                self._packed[path] = _NO_CLONES
+
+        sources = self._sources_of([path for path, _ in tasks])
+        packed = _map(_find_colliding_clones, tasks, self.executor, sources)
+        self._packed.update((path, path_packed) for (path, _), path_packed in zip(tasks, packed))
+        return True
+
+    def _sources_of(self, paths: list[Path]) -> list[str | None]:
+        return [self._sources.get(path) for path in paths]
+
+
+@dataclasses.dataclass
+class AnalysisSession:
+    """Clone and idiom analysis with its own settings and caches
+
+    A session never reads the global settings, so sessions with different thresholds
+    can live in one process. The results of every file are kept until the file or its
+    given source changes. Caches are guarded by a lock, so a session can be shared
+    between threads and reused across calls.
+    """
+
+    pyclones: PyclonesSettings = dataclasses.field(default_factory=PyclonesSettings)
+    pydioms: PydiomsSettings = dataclasses.field(default_factory=PydiomsSettings)
+    _clones: dict[Path, tuple[_SourceVersion, PackedClones]] = dataclasses.field(
+        default_factory=dict, init=False, repr=False,
+    )
+    _shapes: dict[Path, tuple[_SourceVersion, Counter[int]]] = dataclasses.field(
+        default_factory=dict, init=False, repr=False,
+    )
+    _idioms: dict[Path, tuple[_SourceVersion, dict[Idiom, list[CodeBlockIdiom]]]] = dataclasses.field(
+        default_factory=dict, init=False, repr=False,
+    )
+    _chains: dict[str, tuple[tuple, Any]] = dataclasses.field(
+        default_factory=dict, init=False, repr=False,
+    )
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock, init=False, repr=False)
+
+    def clones(
+            self,
+            paths: list[Path],
+            *,
+            is_chained: bool = False,
+            sources: Mapping[Path, str] = None,
+            executor: Executor | None = None,
+    ) -> list[dict[str, list[CodeBlockClone]]] | dict[str, list[CodeBlockClone]]:
+        """Finds the clones of the files with the settings of the session
+
+        :param paths: files to analyze
+        :param is_chained: search for clones shared across the files
+        :param sources: sources to analyze instead of the contents of the files
+        :param executor: pool to analyze the files in
+        """
+
+        sources = sources or {}
+        if is_chained:
+            return self._last_chain(
+                "clones", paths, sources, lambda: self._chained_clones(paths, sources, executor),
+            )
+
+        find = functools.partial(_find_clones, config=self.pyclones)
+        packed = self._cached(self._clones, find, paths, sources, executor)
+        single = [
+            _unpack_clones(path, templates, blocks)
+            for path, (templates, blocks, _) in zip(paths, packed)
+        ]
+        return [clones for clones in single if clones]
+
+    def idioms(
+            self,
+            paths: list[Path],
+            *,
+            is_chained: bool = False,
+            sources: Mapping[Path, str] = None,
+            executor: Executor | None = None,
+    ) -> list[dict[Idiom, list[CodeBlockIdiom]]] | dict[Idiom, list[CodeBlockIdiom]]:
+        sources = sources or {}
+        if is_chained:
+            return self._last_chain(
+                "idioms", paths, sources, lambda: self._chained_idioms(paths, sources),
+            )
+
+        find = functools.partial(_find_idioms, config=self.pydioms)
+        single = self._cached(self._idioms, find, paths, sources, executor)
+        return [idioms for idioms in single if idioms]
+
+    def forget(self, paths: Collection[Path] = None):
+        """Drops the results of the files, so the session does not grow with every file it saw
+
+        :param paths: files to drop, by default the ones that no longer exist
+        """
+
+        with self._lock:
+            if paths is None:
+                cached_paths = self._clones.keys() | self._shapes.keys() | self._idioms.keys()
+                paths = [path for path in cached_paths if not os.path.exists(path)]
+            forgotten = set(paths)
+
+            for cached in (self._clones, self._shapes, self._idioms):
+                for path in forgotten.intersection(cached):
+                    del cached[path]
+            for kind, (key, _) in list(self._chains.items()):
+                if any(path in forgotten for path, _ in key):
+                    del self._chains[kind]
+
+    def _chained_clones(
+            self, paths: list[Path], sources: Mapping[Path, str], executor: Executor | None,
+    ) -> dict[str, list[CodeBlockClone]]:
+        find = functools.partial(_find_shapes, config=self.pyclones)
+        shapes = self._cached(self._shapes, find, paths, sources, executor)
+        buckets: Counter[int] = Counter()
+        for path_shapes in shapes:
+            buckets.update(path_shapes)
+
+        tasks = [
+            (path, {h for h in path_shapes if buckets[h] >= self.pyclones.count})
+            for path, path_shapes in zip(paths, shapes)
+        ]
+        tasks = [(path, colliding) for path, colliding in tasks if colliding]
+
+        find = functools.partial(_find_colliding_clones, config=self.pyclones)
+        packed = _map(find, tasks, executor, [sources.get(path) for path, _ in tasks])
+        return _merge_clones([path for path, _ in tasks], packed, self.pyclones.count)
+
+    def _chained_idioms(
+            self, paths: list[Path], sources: Mapping[Path, str],
+    ) -> dict[Idiom, list[CodeBlockIdiom]]:
+        with _deep_recursion():
+            tree = prefixtree.PrefixTree()
+            for path in paths:
+                tree.add_tree(path, sources.get(path))
+            return _idiom_finder(self.pydioms).find_all(tree)
+
+    def _last_chain(
+            self, kind: str, paths: list[Path], sources: Mapping[Path, str], analyze: Callable,
+    ) -> Any:
+        # a chain depends on all of its files, so only the result of the last one is kept
+        key = tuple((path, _source_version(path, sources.get(path))) for path in paths)
+        with self._lock:
+            last = self._chains.get(kind)
+        if last is not None and last[0] == key:
+            return last[1]
+
+        result = analyze()
+        with self._lock:
+            self._chains[kind] = (key, result)
+        return result
+
+    def _cached(
+            self,
+            cached: dict[Path, tuple[_SourceVersion, Any]],
+            func: Callable,
+            paths: list[Path],
+            sources: Mapping[Path, str],
+            executor: Executor | None,
+    ) -> list:
+        versions = {path: _source_version(path, sources.get(path)) for path in paths}
+        with self._lock:
+            results = {
+                path: entry[1]
+                for path in paths
+                if (entry := cached.get(path)) is not None and entry[0] == versions[path]
+            }
+
+        # files are analyzed outside the lock, at worst a file is analyzed by two threads
+        outdated = [path for path in paths if path not in results]
+        analyzed = _map(func, outdated, executor, [sources.get(path) for path in outdated])
+        results.update(zip(outdated, analyzed))
+        with self._lock:
+            cached.update((path, (versions[path], results[path])) for path in outdated)
+
+        return [results[path] for path in paths]
+
+
+@contextlib.contextmanager
+def process_pool(jobs: int, *, stdout_to_stderr: bool = False) -> Iterator[Executor | None]:
+    """Creates a pool of worker processes, none for a single job
+
+    :param stdout_to_stderr: whether the messages of the workers go to stderr, so that
+        stdout carries only the output of this process
+    """
+
+    if jobs <= 1:
+        yield None
+        return
+
+    # the settings are not parsed again in the workers, they get the ones of this process
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(settings.sections(), stdout_to_stderr),
+    ) as executor:
+        yield executor
+
+
 def clone_analysis(
-        paths: list[Path], *, is_chained: bool = False,
+        paths: list[Path], *, is_chained: bool = False, executor: Executor | None = None,
 ) -> list[dict[str, list[CodeBlockClone]]] | dict[str, list[CodeBlockClone]]:
-    finder = CloneFinder()
     if is_chained:
-        return finder.chained_find_all(paths)
-    single = [finder.find_all(path) for path in paths]
+        return _chained_clone_analysis(paths, executor)
+
+    packed = _map(_find_clones, paths, executor)
+    _report_candidates(
+        sum(total for _, _, (total, _) in packed),
+        sum(templated for _, _, (_, templated) in packed),
+    )
+
+    single = [
+        _unpack_clones(path, templates, blocks)
+        for path, (templates, blocks, _) in zip(paths, packed)
+    ]
     return [clones for clones in single if clones]
 
 
 def idiom_analysis(
-        paths: list[Path], *, is_chained: bool = False,
+        paths: list[Path], *, is_chained: bool = False, executor: Executor | None = None,
 ) -> list[dict[Idiom, list[CodeBlockIdiom]]] | dict[Idiom, list[CodeBlockIdiom]]:
-    recursion_limit = sys.getrecursionlimit()
-    sys.setrecursionlimit(sys.getrecursionlimit() * 100)
-
     if is_chained:
-        tree = prefixtree.PrefixTree()
-        for path in paths:
-            tree.add_tree(path)
-        idioms = IdiomFinder.find_all(tree)
-    else:
-        prefix_trees = prefixtree.make_prefix_trees(paths)
-        single = [IdiomFinder.find_all(tree) for tree in prefix_trees]
-        idioms = [idioms for idioms in single if idioms]
+        # a single prefix tree is shared by all chained files, so it is built in one process
+        with _deep_recursion():
+            tree = prefixtree.PrefixTree()
+            for path in paths:
+                tree.add_tree(path)
+            return IdiomFinder().find_all(tree)
+
+    single = _map(_find_idioms, paths, executor)
+    return [idioms for idioms in single if idioms]
+
+
+def clone_templates(paths: list[Path], *, executor: Executor | None = None) -> list[PackedClones]:
+    return _map(_find_all_clones, paths, executor)
+
 
-    sys.setrecursionlimit(recursion_limit)
-    return idioms
+def clone_spans(paths: list[Path], *, executor: Executor | None = None) -> list[PackedClones]:
+    """Finds the clones of each file regardless of the configured count and length
+
+    The result is filtered by `filter_clones` for any count of at least 2 and any length.
+
+    :param paths: files to analyze
+    :param executor: pool to analyze the files in
+    :return: packed clones of each file
+    """
+
+    return _map(_find_clone_spans, paths, executor)
+
+
+def filter_clones(packed: dict[Path, PackedClones]) -> list[dict[str, list[CodeBlockClone]]]:
+    single = [
+        _unpack_clones(path, templates, _filter_blocks(blocks))
+        for path, (templates, blocks, _) in packed.items()
+    ]
+    return [clones for clones in single if clones]
+
+
+def make_block(path: Path, location: Location) -> CodeBlockClone:
+    lineno, end_lineno, colno, end_colno, class_name, variables, consts = location
+    return CodeBlockClone(
+        path, lineno, end_lineno, colno, end_colno,
+        class_name=class_name,
+        vars=variables,
+        consts=consts,
+    )
 
 
 def paths_with_clones(
@@ -53,3 +401,204 @@ def paths_with_clones(
         for clone in clones
         for blocks in clone.values()
     })
+
+
+def _source_version(path: Path, source: str | None) -> _SourceVersion:
+    if source is not None:
+        return hashlib.blake2b(source.encode("utf-8", errors="surrogateescape"), digest_size=16).digest()
+
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _map(
+        func: Callable, paths: list, executor: Executor | None, sources: list[str | None] = None,
+) -> list:
+    iterables = (paths,) if sources is None else (paths, sources)
+    if executor is None or len(paths) < 2:
+        return list(map(func, *iterables))
+    return list(executor.map(func, *iterables, chunksize=max(1, len(paths) // 64)))
+
+
+@contextlib.contextmanager
+def _deep_recursion() -> Iterator[None]:
+    global _recursion_users, _recursion_limit  # noqa: PLW0603
+
+    # the limit is process-wide, it is restored only when no thread needs it anymore
+    with _recursion_lock:
+        if not _recursion_users:
+            _recursion_limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(max(_recursion_limit, _IDIOM_RECURSION_LIMIT))
+        _recursion_users += 1
+    try:
+        yield
+    finally:
+        with _recursion_lock:
+            _recursion_users -= 1
+            if not _recursion_users:
+                sys.setrecursionlimit(_recursion_limit)
+
+
+def _chained_clone_analysis(
+        paths: list[Path], executor: Executor | None,
+) -> dict[str, list[CodeBlockClone]]:
+    if executor is None or len(paths) < 2:
+        finder = CloneFinder()
+        clones = finder.chained_find_all(paths)
+        _report_candidates(finder.total_candidates, finder.templated_candidates)
+        return clones
+
+    # only the files with shapes shared across the chain are templatized
+    shapes = _map(_find_shapes, paths, executor)
+    buckets: Counter[int] = Counter()
+    for path_shapes in shapes:
+        buckets.update(path_shapes)
+
+    tasks = [
+        (path, {h for h in path_shapes if buckets[h] >= pyclones_settings.count})
+        for path, path_shapes in zip(paths, shapes)
+    ]
+    tasks = [(path, colliding) for path, colliding in tasks if colliding]
+
+    packed = _map(_find_colliding_clones, tasks, executor)
+    _report_candidates(
+        buckets.total(),
+        sum(templated for _, _, (_, templated) in packed),
+    )
+    return _merge_clones([path for path, _ in tasks], packed, pyclones_settings.count)
+
+
+def _init_worker(sections: dict[str, Any], stdout_to_stderr: bool):
+    settings.install(sections)
+    if stdout_to_stderr:
+        sys.stdout = sys.stderr
+
+
+def _report_candidates(total: int, templated: int):
+    if pyclones_settings.verbose:
+        print(f"Candidates: {total}")
+        print(f"Templated: {templated}")
+        print()
+
+
+def normalization(config: PyclonesSettings | None = None) -> tuple[str, tuple[str, ...]]:
+    """Settings of the clone finder of the analysis that its templates depend on
+
+    :param config: settings of a session, by default the global ones
+    :return: template mode and the nodes the clones are searched among
+    """
+
+    finder = _clone_finder(config)
+    return finder.template_mode, tuple(finder.allowed_nodes)
+
+
+def _clone_finder(config: PyclonesSettings | None) -> CloneFinder:
+    if config is None:
+        return CloneFinder()
+    return CloneFinder(count=config.count, length=config.length, template_mode=config.template_mode)
+
+
+def _find_shapes(path: Path, source: str = None, config: PyclonesSettings = None) -> Counter[int]:
+    return _clone_finder(config).find_shapes(path, source)
+
+
+def _find_colliding_clones(
+        task: tuple[Path, set[int]], source: str = None, config: PyclonesSettings = None,
+) -> PackedClones:
+    path, shapes = task
+    finder = _clone_finder(config)
+    return _pack_clones(finder, finder.find_all(path, count=1, shapes=shapes, source=source))
+
+
+def _find_all_clones(path: Path) -> PackedClones:
+    finder = CloneFinder()
+    return _pack_clones(finder, finder.find_all(path, count=1, length=_MIN_LENGTH))
+
+
+def _find_clone_spans(path: Path) -> PackedClones:
+    finder = CloneFinder()
+    return _pack_clones(finder, finder.find_all(path, count=_MIN_COUNT, length=_MIN_LENGTH))
+
+
+def _find_clones(path: Path, source: str = None, config: PyclonesSettings = None) -> PackedClones:
+    finder = _clone_finder(config)
+    return _pack_clones(finder, finder.find_all(path, source=source))
+
+
+def _pack_clones(finder: CloneFinder, clones: dict[str, list[CodeBlockClone]]) -> PackedClones:
+    templates: dict[bytes, str] = {}
+    blocks: list[tuple[bytes, Location]] = []
+    for template, template_blocks in clones.items():
+        digest = template_digest(template)
+        templates[digest] = template
+        blocks.extend(
+            (
+                digest,
+                (b.lineno, b.end_lineno, b.colno, b.end_colno, b.class_name, b.vars, b.consts),
+            )
+            for b in template_blocks
+        )
+
+    return templates, blocks, (finder.total_candidates, finder.templated_candidates)
+
+
+def _unpack_clones(
+        path: Path, templates: dict[bytes, str], blocks: list[tuple[bytes, Location]],
+) -> dict[str, list[CodeBlockClone]]:
+    clones: dict[str, list[CodeBlockClone]] = {}
+    for digest, location in blocks:
+        clones.setdefault(templates[digest], []).append(make_block(path, location))
+    return clones
+
+
+def _filter_blocks(blocks: list[tuple[bytes, Location]]) -> list[tuple[bytes, Location]]:
+    blocks = [
+        (digest, location)
+        for digest, location in blocks
+        if location[1] - location[0] >= pyclones_settings.length
+    ]
+    counts = Counter(digest for digest, _ in blocks)
+    return [
+        (digest, location)
+        for digest, location in blocks
+        if counts[digest] >= pyclones_settings.count
+    ]
+
+
+def _merge_clones(
+        paths: list[Path], packed: list[PackedClones], count: int,
+) -> dict[str, list[CodeBlockClone]]:
+    templates: dict[bytes, str] = {}
+    locations: dict[bytes, list[tuple[Path, Location]]] = {}
+
+    for path, (file_templates, blocks, _) in zip(paths, packed):
+        templates.update(file_templates)
+        for digest, location in blocks:
+            locations.setdefault(digest, []).append((path, location))
+
+    return {
+        templates[digest]: [make_block(path, location) for path, location in digest_locations]
+        for digest, digest_locations in locations.items()
+        if len(digest_locations) >= count
+    }
+
+
+def _idiom_finder(config: PydiomsSettings | None) -> IdiomFinder:
+    if config is None:
+        return IdiomFinder()
+    return IdiomFinder(config.length, config.verbose)
+
+
+def _find_idioms(
+        path: Path, source: str = None, config: PydiomsSettings = None,
+) -> dict[Idiom, list[CodeBlockIdiom]]:
+    with _deep_recursion():
+        tree = prefixtree.PrefixTree()
+        tree.add_tree(path, source)
+        idioms = _idiom_finder(config).find_all(tree)
+
+    # AST objects and prefix tree nodes are not sent back from the worker process
+    return {
+        idiom.compact(): [dataclasses.replace(block, ast_node=None) for block in blocks]
+        for idiom, blocks in idioms.items()
+    }
@@ -1,51 +1,104 @@
+import contextlib
 import hashlib
+import importlib.metadata
 import itertools
 import os
 import pickle
 import shutil
-from dataclasses import dataclass
+import sqlite3
+import zlib
+from collections.abc import Collection, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from time import time
+from typing import Any, NamedTuple
 
 from colorama import Fore, Style
 
+from pyfactoring.core import analysis
+from pyfactoring.core.analysis import PackedClones
+from pyfactoring.settings import pyclones_settings, pydioms_settings
+from pyfactoring.utils.path import DirSnapshot
 from pyfactoring.utils.pyclones import CodeBlockClone
 from pyfactoring.utils.pydioms.idiom import CodeBlockIdiom, Idiom
 
 
-_CACHE_DIR = Path("./.pyfactoring_cache")
+CACHE_DIR = Path("./.pyfactoring_cache")
 
+_CHECK_SCHEMA_VERSION = 3
+_CHUNK_SIZE = 1 << 16
+_LARGE_FILE_SIZE = 1 << 20
 
-@dataclass
-class FileCache:
-    path: Path
-    hash: bytes
-    data: bytes
+# the last stamp and hash of every file, a changed stamp replaces the entry of its path
+_file_hashes: dict[str, tuple["FileStamp", bytes]] = {}
 
-    def __post_init__(self):
-        if isinstance(self.path, str):
-            self.path = Path(self.path)
 
+class FileStamp(NamedTuple):
+    mtime_ns: int
+    size: int
+    ino: int
 
-def hash_file(path: Path) -> bytes:
+
+def stamp_file(path: Path) -> FileStamp:
+    stat = os.stat(path)
+    return FileStamp(stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+# format entries of previous versions were stored with md5 hashes and without stamps
+_LEGACY_STAMP = FileStamp(-1, -1, -1)
+
+
+def hash_file(path: Path, stamp: FileStamp | None = None) -> bytes:
+    if stamp is None:
+        stamp = stamp_file(path)
+    cached = _file_hashes.get(str(path))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    filehash = _digest(path, hashlib.blake2b(digest_size=16))
+    _file_hashes[str(path)] = (stamp, filehash)
+    return filehash
+
+
+def _legacy_hash_file(path: Path) -> bytes:
+    return _digest(path, hashlib.md5())
+
+
+def _digest(path: Path, source_hash) -> bytes:
     with open(path, "rb") as source_file:
-        source_hash = hashlib.md5()
-        while chunk := source_file.read(8192):
+        while chunk := source_file.read(_CHUNK_SIZE):
             source_hash.update(chunk)
     return source_hash.digest()
 
 
+def hash_files(paths: Collection[Path]) -> dict[Path, bytes]:
+    large_paths = [path for path in paths if stamp_file(path).size >= _LARGE_FILE_SIZE]
+    if len(large_paths) > 1:
+        # hashlib releases the GIL on large buffers, so big files are hashed concurrently
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(hash_file, large_paths))
+    return {path: hash_file(path) for path in paths}
+
+
+def is_modified(path: Path, stamp: FileStamp | None, filehash: bytes | None) -> bool:
+    if stamp is not None and stamp_file(path) == stamp:
+        return False
+    if stamp == _LEGACY_STAMP:
+        return _legacy_hash_file(path) != filehash
+    return hash_file(path) != filehash
+
+
 def format_cache(paths: list[Path], *, is_chained: bool = False):
     suffix = "chained" if is_chained else "single"
-    cache_path = _CACHE_DIR / f".format.{suffix}"
-    caches: dict[Path, bytes] = {}
+    cache_path = CACHE_DIR / f".format.{suffix}"
+    caches: dict[Path, tuple[FileStamp, bytes]] = {}
 
     if os.path.exists(cache_path):
         with open(cache_path, "rb") as cache_file:
             caches = pickle.load(cache_file)
 
-    for path in paths:
-        caches[path] = hash_file(path)
+    for path, filehash in hash_files(paths).items():
+        caches[path] = (stamp_file(path), filehash)
 
     with open(cache_path, "wb") as cache_file:
         pickle.dump(caches, cache_file)
@@ -53,61 +106,87 @@ def format_cache(paths: list[Path], *, is_chained: bool = False):
 
 def format_retrieve(paths: list[Path], *, is_chained: bool = False) -> list[Path]:
     suffix = "chained" if is_chained else "single"
-    cache_path = _CACHE_DIR / f".format.{suffix}"
+    cache_path = CACHE_DIR / f".format.{suffix}"
 
     if not os.path.exists(cache_path):
         return paths
 
     with open(cache_path, "rb") as cache_file:
-        caches: dict[Path, bytes] = pickle.load(cache_file)
+        caches: dict[Path, tuple[FileStamp, bytes] | bytes] = pickle.load(cache_file)
+
+    def is_formatted(path: Path) -> bool:
+        cached = caches.get(path)
+        if cached is None:
+            return False
+        # previous versions stored only the hash of the file
+        stamp, filehash = cached if isinstance(cached, tuple) else (_LEGACY_STAMP, cached)
+        return not is_modified(path, stamp, filehash)
 
     if is_chained:
         for path in paths:
-            if hash_file(path) != caches.get(path):
+            if not is_formatted(path):
                 return paths
         return []
     else:
         return [
             path
             for path in paths
-            if hash_file(path) != caches.get(path)
+            if not is_formatted(path)
         ]
 
 
+def snapshot_retrieve() -> DirSnapshot:
+    cache_path = CACHE_DIR / ".walk"
+    try:
+        with open(cache_path, "rb") as cache_file:
+            snapshot = pickle.load(cache_file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return DirSnapshot()
+    return snapshot if isinstance(snapshot, DirSnapshot) else DirSnapshot()
+
+
+def snapshot_cache(snapshot: DirSnapshot):
+    if not snapshot.changed:
+        return
+
+    with open(CACHE_DIR / ".walk", "wb") as cache_file:
+        pickle.dump(snapshot, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def settings_fingerprint(kind: str = "spans") -> str:
+    """Identifies the settings that the cached results of the kind depend on
+
+    :param kind: "spans" for unfiltered clones, "clones" or "idioms" for filtered ones
+    :return: fingerprint that changes along with any of these settings
+    """
+
+    normalization = analysis.normalization()
+    match kind:
+        case "idioms":
+            parts = (pydioms_settings.count, pydioms_settings.length)
+        case "clones":
+            parts = (*normalization, pyclones_settings.count, pyclones_settings.length)
+        case _:
+            parts = normalization
+
+    fingerprint = repr((_version(), *parts)).encode("utf-8")
+    return hashlib.blake2b(fingerprint, digest_size=16).hexdigest()
+
+
 def check_cache(
     paths: list[Path],
     clones: list[dict[str, list[CodeBlockClone]]],
     *,
     is_idiom: bool = False,
 ):
-    suffix = "idioms" if is_idiom else "clones"
-    cache_path = _CACHE_DIR / f".check.{suffix}"
-    caches_dumps = {}
-
-    if os.path.exists(cache_path):
-        with open(cache_path, "rb") as cache_file:
-            caches = pickle.load(cache_file)
-        caches_dumps = {cache.path: (cache.hash, cache.data) for cache in caches}
+    path_clones: dict[Path, dict] = {path: {} for path in paths}
 
     for clone in clones:
         for _, blocks in clone.items():
-            filepath = blocks[0].file
-            filehash = hash_file(filepath)
-            if filehash != caches_dumps.get(filepath):
-                caches_dumps[filepath] = (filehash, clone)
+            path_clones[blocks[0].file] = clone
             break
 
-    for path in paths:
-        if path not in caches_dumps:
-            caches_dumps[path] = (hash_file(path), {})
-
-    caches = [
-        FileCache(path, filehash, data)
-        for path, (filehash, data) in caches_dumps.items()
-    ]
-
-    with open(cache_path, "wb") as cache_file:
-        pickle.dump(caches, cache_file)
+    _check_write("idioms" if is_idiom else "clones", path_clones)
 
 
 def check_retrieve(
@@ -115,36 +194,130 @@ def check_retrieve(
     *,
     is_idiom: bool = False,
 ) -> tuple[list[dict[str | Idiom, list[CodeBlockClone | CodeBlockIdiom]]], list[Path]]:
-    suffix = "idioms" if is_idiom else "clones"
-    cache_path = _CACHE_DIR / f".check.{suffix}"
+    cached, uncached_paths = _check_read("idioms" if is_idiom else "clones", paths)
+    return [clone for clone in cached.values() if clone], uncached_paths
 
-    if not os.path.exists(cache_path):
-        return [], paths
 
-    with open(cache_path, "rb") as cache_file:
-        caches: list[FileCache] = pickle.load(cache_file)
+def clone_cache(packed: dict[Path, PackedClones]):
+    _check_write("spans", packed)
+
+
+def clone_retrieve(paths: list[Path]) -> tuple[dict[Path, PackedClones], list[Path]]:
+    return _check_read("spans", paths)
+
+
+def _check_write(kind: str, data: dict[Path, Any]):
+    rows = [
+        (kind, str(path), *stamp_file(path), filehash, _dumps(data[path]))
+        for path, filehash in hash_files(data).items()
+    ]
 
-    caches_dumps = {cache.path: (cache.hash, cache.data) for cache in caches}
-    cached_clones = []
+    with _check_store(kind) as connection, connection:
+        connection.executemany("INSERT OR REPLACE INTO checks VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def _check_read(kind: str, paths: list[Path]) -> tuple[dict[Path, Any], list[Path]]:
+    cached = {}
     uncached_paths = []
+    restamped = []
+
+    with _check_store(kind) as connection:
+        for path in paths:
+            row = connection.execute(
+                "SELECT mtime_ns, size, ino, hash, data FROM checks WHERE kind = ? AND path = ?",
+                (kind, str(path)),
+            ).fetchone()
+
+            if row is None:
+                uncached_paths.append(path)
+                continue
+
+            stamp, filehash = FileStamp(*row[:3]), row[3]
+            if is_modified(path, stamp, filehash):
+                uncached_paths.append(path)
+                continue
+
+            if stamp != stamp_file(path):
+                restamped.append((*stamp_file(path), kind, str(path)))
+
+            cached[path] = _loads(row[4])
 
-    for path in paths:
-        if path in caches_dumps and hash_file(path) == caches_dumps[path][0]:
-            clone: dict[str, list[CodeBlockClone]] = caches_dumps[path][1]
-            cached_clones.append(clone)
-        else:
-            uncached_paths.append(path)
+        if restamped:
+            with connection:
+                connection.executemany(
+                    "UPDATE checks SET mtime_ns = ?, size = ?, ino = ? WHERE kind = ? AND path = ?",
+                    restamped,
+                )
 
-    return cached_clones, uncached_paths
+    return cached, uncached_paths
+
+
+@contextlib.contextmanager
+def _check_store(kind: str) -> Iterator[sqlite3.Connection]:
+    connection = sqlite3.connect(CACHE_DIR / "check.db")
+    try:
+        if connection.execute("PRAGMA user_version").fetchone()[0] != _CHECK_SCHEMA_VERSION:
+            connection.execute("DROP TABLE IF EXISTS checks")
+            connection.execute("DROP TABLE IF EXISTS meta")
+            connection.execute(f"PRAGMA user_version = {_CHECK_SCHEMA_VERSION}")
+
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS checks ("
+            "kind TEXT NOT NULL, path TEXT NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, ino INTEGER NOT NULL, "
+            "hash BLOB NOT NULL, data BLOB NOT NULL, "
+            "PRIMARY KEY (kind, path))",
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (kind TEXT PRIMARY KEY, fingerprint TEXT NOT NULL)",
+        )
+        _check_fingerprint(connection, kind)
+        _drop_check_pickles()
+        yield connection
+    finally:
+        connection.close()
+
+
+def _check_fingerprint(connection: sqlite3.Connection, kind: str):
+    fingerprint = settings_fingerprint(kind)
+    row = connection.execute("SELECT fingerprint FROM meta WHERE kind = ?", (kind,)).fetchone()
+    if row is not None and row[0] == fingerprint:
+        return
+
+    with connection:
+        connection.execute("DELETE FROM checks WHERE kind = ?", (kind,))
+        connection.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (kind, fingerprint))
+
+
+def _version() -> str:
+    try:
+        return importlib.metadata.version("pyfactoring")
+    except importlib.metadata.PackageNotFoundError:
+        return "dev"
+
+
+def _drop_check_pickles():
+    # caches of previous versions were filtered under unknown settings, they are analyzed again
+    for kind in ("clones", "idioms"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(CACHE_DIR / f".check.{kind}")
+
+
+def _dumps(data) -> bytes:
+    return zlib.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+def _loads(payload: bytes):
+    return pickle.loads(zlib.decompress(payload))
 
 
 def store(single_paths: list[Path], chained_paths: list[Path]):
-    head_path = _CACHE_DIR / "head"
+    head_path = CACHE_DIR / "head"
     paths_path = head_path / ".paths"
-    recovery_path = _CACHE_DIR / "RECOVERY"
+    recovery_path = CACHE_DIR / "RECOVERY"
 
     if os.path.exists(head_path):
-        recovery_dir = _CACHE_DIR / hex(int(time()))
+        recovery_dir = CACHE_DIR / hex(int(time()))
         os.rename(head_path, recovery_dir)
 
         with open(recovery_path, "r") as recovery_file:
@@ -170,9 +343,9 @@ def store(single_paths: list[Path], chained_paths: list[Path]):
 
 
 def restore():
-    head_path = _CACHE_DIR / "head"
+    head_path = CACHE_DIR / "head"
     paths_path = head_path / ".paths"
-    recovery_path = _CACHE_DIR / "RECOVERY"
+    recovery_path = CACHE_DIR / "RECOVERY"
 
     with open(recovery_path, "r") as recovery_file:
         recoveries = [line.rstrip() for line in recovery_file.readlines()]
@@ -192,7 +365,7 @@ def restore():
         print(f"{Fore.RED}Nothing to restore{Style.RESET_ALL}")
 
     if recoveries:
-        os.rename(_CACHE_DIR / recoveries[0], _CACHE_DIR / "head")
+        os.rename(CACHE_DIR / recoveries[0], CACHE_DIR / "head")
         recoveries[0] = "head"
 
     with open(recovery_path, "w") as recovery_file:
@@ -201,18 +374,15 @@ def restore():
 
 
 def create_dir():
-    os.makedirs(_CACHE_DIR, exist_ok=True)
+    os.makedirs(CACHE_DIR, exist_ok=True)
 
-    gitignore_path = _CACHE_DIR / ".gitignore"
+    gitignore_path = CACHE_DIR / ".gitignore"
     if not os.path.exists(gitignore_path):
         with open(gitignore_path, "w") as gitignore:
             gitignore.write("# Automatically created by pyfactoring.\n")
             gitignore.write("*")
 
-    recovery_path = _CACHE_DIR / "RECOVERY"
+    recovery_path = CACHE_DIR / "RECOVERY"
     if not os.path.exists(recovery_path):
         with open(recovery_path, "w"):
             pass
-
-
-create_dir()
@@ -0,0 +1,63 @@
+import json
+import os
+import socket
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+
+
+# the cache dir is not taken from `cache`, the client must stay as light as the CLI entry point
+SOCKET_PATH = Path("./.pyfactoring_cache") / "daemon.sock"
+
+_CONNECT_TIMEOUT = 0.5
+
+
+def is_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def request(message: dict, path: Path = SOCKET_PATH) -> dict | None:
+    """Sends a request to the daemon listening on the socket
+
+    :param message: request with a `command` and its fields
+    :param path: socket of the daemon
+    :return: response of the daemon, None if no daemon is running
+    """
+
+    if not is_supported() or not os.path.exists(path):
+        return None
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(_CONNECT_TIMEOUT)
+        try:
+            connection.connect(str(path))
+        except OSError:
+            return None
+
+        # the analysis itself may take a while, only the connection is timed out
+        connection.settimeout(None)
+        with connection.makefile("rwb") as stream:
+            send(stream, message)
+            return receive(stream)
+
+
+def request_check(argv: Sequence[str], path: Path = SOCKET_PATH) -> tuple[str, str] | None:
+    """Sends a check to the daemon
+
+    :return: stdout and stderr of the check, None if no daemon is running
+    """
+
+    # the output is printed by the client, so it is colored only for the terminal of the client
+    message = {"command": "check", "argv": list(argv), "color": sys.stdout.isatty()}
+    response = request(message, path)
+    return None if response is None else (response["output"], response.get("errors", ""))
+
+
+def send(stream, message: dict):
+    stream.write(json.dumps(message).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def receive(stream) -> dict | None:
+    line = stream.readline()
+    return json.loads(line) if line else None
@@ -0,0 +1,153 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import traceback
+from pathlib import Path
+
+from colorama import Fore, Style
+from pydantic import ValidationError
+
+from pyfactoring import settings
+from pyfactoring.arguments import parse_args
+from pyfactoring.core import client
+from pyfactoring.core.action_check import action_check
+from pyfactoring.core.analysis import AnalysisSession
+from pyfactoring.exceptions import DaemonError, OptionsConflictError
+from pyfactoring.utils.path import DirSnapshot
+
+
+class Daemon:
+    """Answers check requests with the analysis state kept warm between them
+
+    An analysis session is kept for every set of settings, along with the dir snapshot,
+    so a repeated check only walks the changed dirs and analyzes the changed files.
+    """
+
+    def __init__(self):
+        self.running = True
+        self.snapshot = DirSnapshot()
+        self._sessions: dict[tuple[str, str], AnalysisSession] = {}
+
+    def handle(self, message: dict) -> dict:
+        match message.get("command"):
+            case "ping":
+                return {"output": ""}
+            case "stop":
+                self.running = False
+                return {"output": "Daemon stopped\n"}
+            case "check":
+                output, errors = self._check(message.get("argv", []), color=message.get("color", False))
+                return {"output": output, "errors": errors}
+            case command:
+                return {"output": f"Unknown daemon command: {command}\n"}
+
+    def _check(self, argv: list[str], *, color: bool) -> tuple[str, str]:
+        """Runs the check in this process
+
+        :return: stdout and stderr of the check, the client prints them to its own ones
+        """
+
+        output, errors = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(errors):
+            try:
+                settings.build(parse_args(argv))
+                action_check(self._session(), self.snapshot, color=color)
+            except (ValidationError, OptionsConflictError) as e:
+                print(e)
+            except SystemExit:
+                # argparse has already printed the usage error or the help
+                pass
+            except Exception:  # noqa: BLE001
+                # a failed request must not stop the daemon
+                traceback.print_exc()
+
+        # the results of deleted files would otherwise stay in the sessions for good
+        for session in self._sessions.values():
+            session.forget()
+        return output.getvalue(), errors.getvalue()
+
+    def _session(self) -> AnalysisSession:
+        sections = settings.sections()
+        pyclones = sections["pyclones"].model_copy()
+        pydioms = sections["pydioms"].model_copy()
+
+        key = (pyclones.model_dump_json(), pydioms.model_dump_json())
+        if key not in self._sessions:
+            self._sessions[key] = AnalysisSession(pyclones, pydioms)
+        return self._sessions[key]
+
+
+def action_daemon(*, stop: bool = False):
+    if stop:
+        response = client.request({"command": "stop"})
+        if response is None:
+            print("No daemon is running")
+        else:
+            print(response["output"], end="")
+        return
+
+    try:
+        serve()
+    except DaemonError as e:
+        print(f"{Fore.RED}Daemon is not started:{Style.RESET_ALL} {e.text}")
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(path: Path = client.SOCKET_PATH):
+    """Answers the requests sent to the socket until a `stop` request
+
+    Requests and responses are single JSON lines.
+    """
+
+    if not client.is_supported():
+        raise DaemonError("The daemon needs Unix sockets, which this platform does not support")
+
+    daemon = Daemon()
+    with _listen(path) as server:
+        print(f"Listening on {path}")
+        while daemon.running:
+            connection, _ = server.accept()
+            try:
+                with connection, connection.makefile("rwb") as stream:
+                    _answer(daemon, stream)
+            except OSError:
+                # the client has gone before the response, e.g. an interrupted check
+                continue
+
+
+def _answer(daemon: Daemon, stream):
+    try:
+        message = client.receive(stream)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        client.send(stream, {"output": "", "errors": f"Invalid request: {e}\n"})
+        return
+
+    if message is None:
+        return
+    if not isinstance(message, dict):
+        client.send(stream, {"output": "", "errors": "Invalid request: not a JSON object\n"})
+        return
+    client.send(stream, daemon.handle(message))
+
+
+@contextlib.contextmanager
+def _listen(path: Path):
+    if client.request({"command": "ping"}, path) is not None:
+        raise DaemonError(f"A daemon is already listening on {path}")
+
+    os.makedirs(path.parent, exist_ok=True)
+    with contextlib.suppress(FileNotFoundError):
+        # a socket left by a daemon that was killed
+        os.remove(path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(path))
+        server.listen()
+        try:
+            yield server
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
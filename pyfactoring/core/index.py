@@ -0,0 +1,230 @@
+import json
+import os
+import sqlite3
+from collections.abc import Collection
+from concurrent.futures import Executor
+from pathlib import Path
+
+from pyfactoring.core import analysis, cache
+from pyfactoring.settings import pyclones_settings
+from pyfactoring.utils.pyclones import CodeBlockClone
+
+
+_INDEX_PATH = cache.CACHE_DIR / "index.db"
+_SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    hash BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS templates (
+    digest BLOB PRIMARY KEY,
+    template TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    digest BLOB NOT NULL,
+    path TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    lineno INTEGER NOT NULL,
+    end_lineno INTEGER NOT NULL,
+    colno INTEGER NOT NULL,
+    end_colno INTEGER NOT NULL,
+    class_name TEXT,
+    operands TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blocks_by_digest ON blocks (digest);
+CREATE INDEX IF NOT EXISTS blocks_by_path ON blocks (path);
+"""
+
+
+class TemplateIndex:
+    """Inverted index from template digests to the blocks of every indexed file
+
+    Each file is indexed with its unfiltered templates, so any set of indexed files
+    can be queried as a chain with any count and length. The manifest keeps the hash
+    of every file, a changed file only has its own blocks replaced, and the files that
+    no longer exist are dropped on every update.
+    """
+
+    def __init__(self, path: Path = _INDEX_PATH):
+        self._connection = sqlite3.connect(path)
+        self._check_schema()
+        self._connection.executescript(_SCHEMA)
+        self._check_settings()
+
+    def __enter__(self) -> "TemplateIndex":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def update(self, paths: Collection[Path], *, executor: Executor | None = None) -> list[Path]:
+        manifest = {
+            path: (cache.FileStamp(mtime_ns, size, ino), filehash)
+            for path, mtime_ns, size, ino, filehash in self._connection.execute("SELECT * FROM files")
+        }
+
+        # deleted and renamed files would otherwise stay in the index for good
+        missing = [path for path in manifest if not os.path.exists(path)]
+        if missing:
+            self.remove(missing)
+
+        changed = []
+        restamped = []
+        stamps: dict[Path, cache.FileStamp] = {}
+        hashes: dict[Path, bytes] = {}
+        for path in paths:
+            stamp, filehash = manifest.get(str(path), (None, None))
+            stamps[path] = cache.stamp_file(path)
+            if stamps[path] == stamp:
+                continue
+
+            hashes[path] = cache.hash_file(path, stamps[path])
+            if hashes[path] != filehash:
+                changed.append(path)
+            else:
+                restamped.append((*stamps[path], str(path)))
+
+        if restamped:
+            with self._connection:
+                self._connection.executemany(
+                    "UPDATE files SET mtime_ns = ?, size = ?, ino = ? WHERE path = ?", restamped,
+                )
+        if not changed:
+            return []
+
+        packed = analysis.clone_templates(changed, executor=executor)
+
+        with self._connection:
+            for path, (templates, blocks, _) in zip(changed, packed):
+                self._remove(path)
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO templates VALUES (?, ?)", templates.items(),
+                )
+                self._connection.executemany(
+                    "INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (digest, str(path), position, *location[:5], json.dumps(location[5:]))
+                        for position, (digest, location) in enumerate(blocks)
+                    ),
+                )
+                self._connection.execute(
+                    "INSERT INTO files VALUES (?, ?, ?, ?, ?)",
+                    (str(path), *stamps[path], hashes[path]),
+                )
+
+        return changed
+
+    def remove(self, paths: Collection[Path]):
+        with self._connection:
+            for path in paths:
+                self._remove(path)
+
+    def clones(
+            self, paths: Collection[Path], *, touching: Collection[Path] | None = None,
+    ) -> dict[str, list[CodeBlockClone]]:
+        """Queries the indexed files as a chain
+
+        :param paths: indexed files of the chain
+        :param touching: files of the chain that every returned clone must have a block in
+        """
+
+        chain = {str(path): path for path in paths}
+        touched = chain.keys() if touching is None else {str(path) for path in touching}
+
+        with self._connection:
+            self._connection.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS chain "
+                "(path TEXT PRIMARY KEY, ordinal INTEGER, touched INTEGER)",
+            )
+            self._connection.execute("DELETE FROM chain")
+            self._connection.executemany(
+                "INSERT INTO chain VALUES (?, ?, ?)",
+                ((path, ordinal, path in touched) for ordinal, path in enumerate(chain)),
+            )
+
+        rows = self._connection.execute(
+            """
+            SELECT t.template, b.path, b.lineno, b.end_lineno, b.colno, b.end_colno,
+                   b.class_name, b.operands
+            FROM blocks b
+            JOIN chain c ON c.path = b.path
+            JOIN templates t ON t.digest = b.digest
+            WHERE b.end_lineno - b.lineno >= :length AND b.digest IN (
+                SELECT b2.digest
+                FROM blocks b2
+                JOIN chain c2 ON c2.path = b2.path
+                WHERE b2.end_lineno - b2.lineno >= :length
+                GROUP BY b2.digest
+                HAVING COUNT(*) >= :count AND MAX(c2.touched)
+            )
+            ORDER BY c.ordinal, b.position
+            """,
+            {"length": pyclones_settings.length, "count": pyclones_settings.count},
+        )
+
+        clones: dict[str, list[CodeBlockClone]] = {}
+        for template, path, *location, operands in rows:
+            variables, consts = json.loads(operands)
+            block = analysis.make_block(chain[path], (*location, variables, consts))
+            clones.setdefault(template, []).append(block)
+        return clones
+
+    def _remove(self, path: Path):
+        digests = self._connection.execute(
+            "SELECT DISTINCT digest FROM blocks WHERE path = ?", (str(path),),
+        ).fetchall()
+        self._connection.execute("DELETE FROM blocks WHERE path = ?", (str(path),))
+        self._connection.execute("DELETE FROM files WHERE path = ?", (str(path),))
+        self._connection.executemany(
+            "DELETE FROM templates WHERE digest = ? "
+            "AND NOT EXISTS (SELECT 1 FROM blocks WHERE blocks.digest = templates.digest)",
+            digests,
+        )
+
+    def _check_schema(self):
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] == _SCHEMA_VERSION:
+            return
+
+        with self._connection:
+            for table in ("meta", "files", "templates", "blocks"):
+                self._connection.execute(f"DROP TABLE IF EXISTS {table}")
+            self._connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def _check_settings(self):
+        # the indexed templates depend on the normalization, any change invalidates them
+        settings = cache.settings_fingerprint()
+        row = self._connection.execute("SELECT value FROM meta WHERE key = 'settings'").fetchone()
+        if row is not None and row[0] == settings:
+            return
+
+        with self._connection:
+            self._connection.execute("DELETE FROM blocks")
+            self._connection.execute("DELETE FROM templates")
+            self._connection.execute("DELETE FROM files")
+            self._connection.execute("INSERT OR REPLACE INTO meta VALUES ('settings', ?)", (settings,))
+
+
+def chained_clone_analysis(
+        paths: list[Path],
+        *,
+        executor: Executor | None = None,
+        touching: Collection[Path] | None = None,
+) -> dict[str, list[CodeBlockClone]]:
+    if not paths or touching is not None and not touching:
+        return {}
+
+    with TemplateIndex() as index:
+        index.update(paths, executor=executor)
+        return index.clones(paths, touching=touching)
@@ -0,0 +1,278 @@
+import ast
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict
+from pathlib import Path
+from typing import BinaryIO
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from pyfactoring.core.analysis import CloneIndex
+from pyfactoring.settings import common_settings
+from pyfactoring.utils.extract import file_source
+from pyfactoring.utils.path import collect_filepaths
+from pyfactoring.utils.pyclones import CodeBlockClone
+
+
+# edits that come within the delay are analyzed together
+_DEBOUNCE_DELAY = 0.15
+
+_TEXT_DOCUMENT_SYNC_FULL = 1
+_SEVERITY_INFORMATION = 3
+_METHOD_NOT_FOUND = -32601
+
+
+def read_message(reader: BinaryIO) -> dict | None:
+    """Reads a JSON-RPC message framed by the `Content-Length` header
+
+    :return: message, None at the end of the stream
+    """
+
+    headers = {}
+    while True:
+        line = reader.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.decode("ascii").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    return json.loads(reader.read(int(headers["content-length"])))
+
+
+def write_message(writer: BinaryIO, message: dict):
+    body = json.dumps(message).encode("utf-8")
+    writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+    writer.flush()
+
+
+def uri_to_path(uri: str) -> Path:
+    # the path is unquoted by url2pathname itself
+    return Path(url2pathname(urlparse(uri).path))
+
+
+class LanguageServer:
+    """Publishes the clone groups of the open buffers as diagnostics
+
+    All files of the workspace are analyzed as a single chain by a warm clone index.
+    An edited buffer is analyzed from its unsaved contents, so only the buffer itself
+    is templatized again, along with the files that share its new shapes. Edits are
+    analyzed in a background thread: edits that arrive during an analysis cancel it
+    before the templatizing, or at least the publishing of its outdated diagnostics,
+    and are analyzed together next.
+    """
+
+    def __init__(self, reader: BinaryIO, writer: BinaryIO):
+        self._reader = reader
+        self._writer = writer
+        self._write_lock = threading.Lock()
+
+        self._condition = threading.Condition()
+        self._running = True
+        self._dirty = False
+        self._generation = 0
+        self._paths: list[Path] = []
+        self._buffers: dict[Path, str] = {}
+        # sources to analyze next, None means the contents of the file on disk
+        self._pending: dict[Path, str | None] = {}
+        # paths the index has got a source of
+        self._analyzed: set[Path] = set()
+
+        self._index = CloneIndex(is_chained=True)
+
+    def serve(self):
+        worker = threading.Thread(target=self._analyze_changes, daemon=True)
+        worker.start()
+        try:
+            while self._running and (message := read_message(self._reader)) is not None:
+                self._dispatch(message)
+        finally:
+            with self._condition:
+                self._running = False
+                self._condition.notify()
+            worker.join()
+
+    def _dispatch(self, message: dict):
+        method = message.get("method")
+        params = message.get("params") or {}
+        match method:
+            case "initialize":
+                self._respond(message, self._initialize(params))
+            case "shutdown":
+                self._respond(message, None)
+            case "exit":
+                self._running = False
+            case "textDocument/didOpen":
+                document = params["textDocument"]
+                self._update(uri_to_path(document["uri"]), document["text"], is_open=True)
+            case "textDocument/didChange":
+                # the whole text is synchronized, the last change holds it
+                text = params["contentChanges"][-1]["text"]
+                self._update(uri_to_path(params["textDocument"]["uri"]), text, is_open=True)
+            case "textDocument/didClose":
+                path = uri_to_path(params["textDocument"]["uri"])
+                self._update(path, None, is_open=False)
+                self._publish({}, [path])
+            case _ if "id" in message:
+                self._respond(message, error={"code": _METHOD_NOT_FOUND, "message": f"{method}"})
+
+    def _initialize(self, params: dict) -> dict:
+        root_uri = params.get("rootUri")
+        if root_uri is None and params.get("workspaceFolders"):
+            root_uri = params["workspaceFolders"][0]["uri"]
+
+        if root_uri is not None:
+            paths = collect_filepaths(
+                str(uri_to_path(root_uri)),
+                exclude=common_settings.exclude,
+                respect_gitignore=common_settings.respect_gitignore,
+            )
+            with self._condition:
+                self._paths = paths
+                self._dirty = True
+                self._condition.notify()
+
+        sync = {"openClose": True, "change": _TEXT_DOCUMENT_SYNC_FULL}
+        return {"capabilities": {"textDocumentSync": sync}, "serverInfo": {"name": "pyfactoring"}}
+
+    def _update(self, path: Path, text: str | None, *, is_open: bool):
+        with self._condition:
+            if is_open:
+                self._buffers[path] = text
+                if path not in self._paths:
+                    self._paths.append(path)
+            else:
+                self._buffers.pop(path, None)
+                if path in self._paths and not os.path.isfile(path):
+                    self._paths.remove(path)
+
+            self._pending[path] = text
+            self._generation += 1
+            self._dirty = True
+            self._condition.notify()
+
+    def _analyze_changes(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._dirty or not self._running)
+                if not self._running:
+                    return
+
+            time.sleep(_DEBOUNCE_DELAY)
+            with self._condition:
+                pending, self._pending = self._pending, {}
+                self._dirty = False
+                generation = self._generation
+                paths = list(self._paths)
+
+            try:
+                clones = self._analyze(pending, paths, generation)
+            except Exception:  # noqa: BLE001
+                # a failed analysis must not stop the server, the next edit is analyzed again
+                traceback.print_exc(file=sys.stderr)
+                continue
+
+            with self._condition:
+                if clones is None or generation != self._generation:
+                    continue
+                open_paths = list(self._buffers)
+            self._publish(clones, open_paths)
+
+    def _analyze(
+            self, pending: dict[Path, str | None], paths: list[Path], generation: int,
+    ) -> dict[str, list[CodeBlockClone]] | None:
+        """Analyzes the pending sources
+
+        :return: clones, None when newer edits cancelled the analysis
+        """
+
+        changed = {}
+        for path, text in pending.items():
+            source = text
+            if source is None:
+                source = file_source(path) if os.path.isfile(path) else ""
+            if _parses(source):
+                changed[path] = source
+            elif path not in self._analyzed and not os.path.isfile(path):
+                # a new buffer that has never parsed has nothing to keep and nothing on disk
+                changed[path] = ""
+            # otherwise the last analyzed version of the buffer is kept while it does not parse
+        self._analyzed.update(changed)
+        self._analyzed.intersection_update(paths)
+
+        is_done = self._index.update(paths, changed, is_cancelled=lambda: generation != self._generation)
+        return self._index.clones() if is_done else None
+
+    def _publish(self, clones: dict[str, list[CodeBlockClone]], open_paths: list[Path]):
+        diagnostics = defaultdict(list)
+        for blocks in clones.values():
+            for block in blocks:
+                if block.file in open_paths:
+                    diagnostics[block.file].append(_diagnostic(block, blocks))
+
+        for path in open_paths:
+            self._notify(
+                "textDocument/publishDiagnostics",
+                {"uri": path.as_uri(), "diagnostics": diagnostics.get(path, [])},
+            )
+
+    def _respond(self, request: dict, result=None, *, error: dict = None):
+        response = {"jsonrpc": "2.0", "id": request["id"]}
+        if error is None:
+            response["result"] = result
+        else:
+            response["error"] = error
+        self._send(response)
+
+    def _notify(self, method: str, params: dict):
+        self._send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def _send(self, message: dict):
+        with self._write_lock:
+            write_message(self._writer, message)
+
+
+def action_lsp():
+    reader, writer = sys.stdin.buffer, sys.stdout.buffer
+    # stdout carries the protocol, everything printed by the analysis goes to stderr
+    sys.stdout = sys.stderr
+    LanguageServer(reader, writer).serve()
+
+
+def _parses(source: str) -> bool:
+    try:
+        ast.parse(source)
+    except (SyntaxError, ValueError):
+        return False
+    return True
+
+
+def _range(block: CodeBlockClone) -> dict:
+    return {
+        "start": {"line": block.lineno - 1, "character": block.colno},
+        "end": {"line": block.end_lineno - 1, "character": block.end_colno},
+    }
+
+
+def _diagnostic(block: CodeBlockClone, blocks: list[CodeBlockClone]) -> dict:
+    lines = block.end_lineno - block.lineno + 1
+    return {
+        "range": _range(block),
+        "severity": _SEVERITY_INFORMATION,
+        "source": "pyfactoring",
+        "message": f"clone found [lines: {lines}], {len(blocks)} clones in the group",
+        "relatedInformation": [
+            {
+                "location": {"uri": other.file.as_uri(), "range": _range(other)},
+                "message": "clone",
+            }
+            for other in blocks
+            if other is not block
+        ],
+    }
@@ -0,0 +1,227 @@
+import json
+import shutil
+import sys
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TextIO
+
+from colorama import Fore, Style
+
+from pyfactoring.settings import pyclones_settings
+
+
+_FLUSH_SIZE = 1 << 16
+
+_SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+_INFORMATION_URI = "https://github.com/Kiriruso/pyfactoring"
+_RULES = {
+    "clone": "Code fragments that are copies of each other up to names and constants",
+    "idiom": "Code fragments that share a common syntactic structure",
+}
+
+
+class Report(ABC):
+    """Writes the found groups to a stream, every line of the output goes through one buffer
+
+    The buffer is written out when it grows large and after every section.
+    """
+
+    def __init__(self, stream: TextIO | None = None):
+        self.stream = sys.stdout if stream is None else stream
+        self._chunks: list[str] = []
+        self._size = 0
+
+    def __enter__(self) -> "Report":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def section(self, title: str, data: list | dict, *, is_idiom: bool = False):
+        """Reports the groups found by one analysis
+
+        :param title: title of the analysis
+        :param data: groups of every single file or groups of the chained files
+        :param is_idiom: whether the groups are idioms instead of clones
+        """
+
+        kind = "idiom" if is_idiom else "clone"
+        is_chained = isinstance(data, dict)
+        for groups in [data] if is_chained else data:
+            for template, blocks in groups.items():
+                self._group(kind, template, blocks, is_chained=is_chained)
+        self.flush()
+
+    def close(self):
+        self.flush()
+
+    def flush(self):
+        if self._chunks:
+            self.stream.write("".join(self._chunks))
+            self._chunks.clear()
+            self._size = 0
+        self.stream.flush()
+
+    @abstractmethod
+    def _group(self, kind: str, template, blocks: list, *, is_chained: bool):
+        pass
+
+    def _write(self, text: str):
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= _FLUSH_SIZE:
+            self.flush()
+
+
+class TextReport(Report):
+    """Human-readable report, colored only when it is written to a terminal"""
+
+    def __init__(self, stream: TextIO | None = None, *, color: bool | None = None):
+        super().__init__(stream)
+        if color is None:
+            color = _is_terminal(self.stream)
+
+        self._cyan, self._green, self._magenta, self._reset = (
+            (Fore.CYAN, Fore.GREEN, Fore.MAGENTA, Style.RESET_ALL) if color else ("", "", "", "")
+        )
+        self._columns = shutil.get_terminal_size().columns
+
+    def section(self, title: str, data: list | dict, *, is_idiom: bool = False):
+        if not data:
+            return
+
+        title = f" {title} "
+        self._write(f"{self._cyan}{title.center(self._columns, '=')}{self._reset}\n")
+        super().section(title, data, is_idiom=is_idiom)
+
+    def _group(self, kind: str, template, blocks: list, *, is_chained: bool):
+        total_lines = 0
+        lines = []
+        for block in blocks:
+            block_lines = block.end_lineno - block.lineno + 1
+            total_lines += block_lines
+            lines.append(
+                f"{block.link}: {kind} found [{self._magenta}lines: {block_lines}{self._reset}]",
+            )
+
+        lines.append(f"{self._green}Total {kind}s: {self._reset}{len(blocks)}")
+        lines.append(f"{self._magenta}Total lines: {self._reset}{total_lines}")
+
+        if kind == "idiom":
+            lines.append(f"{self._cyan}With idiom: {self._reset}{template}")
+        elif pyclones_settings.template_view:
+            lines.append(f"{self._cyan}With template:{self._reset}")
+            lines.extend(f"{i:3}{'|':^4}{line}" for i, line in enumerate(template.splitlines(), 1))
+
+        lines.append("-" * self._columns)
+        self._write("\n".join(lines) + "\n")
+
+
+class JsonLinesReport(Report):
+    """Streams a JSON object for every group, one per line"""
+
+    def _group(self, kind: str, template, blocks: list, *, is_chained: bool):
+        record = {
+            "kind": kind,
+            "chained": is_chained,
+            "template": str(template),
+            "total_lines": sum(block.end_lineno - block.lineno + 1 for block in blocks),
+            "blocks": [
+                {
+                    "file": str(block.file),
+                    "lineno": block.lineno,
+                    "end_lineno": block.end_lineno,
+                    "colno": block.colno,
+                    "end_colno": block.end_colno,
+                }
+                for block in blocks
+            ],
+        }
+        self._write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class SarifReport(Report):
+    """SARIF 2.1.0 log with a result for every block, the other blocks of its group are related"""
+
+    def __init__(self, stream: TextIO | None = None):
+        super().__init__(stream)
+        self._results: list[dict] = []
+
+    def close(self):
+        log = {
+            "$schema": _SARIF_SCHEMA,
+            "version": "2.1.0",
+            "runs": [
+                {
+                    "tool": {
+                        "driver": {
+                            "name": "pyfactoring",
+                            "informationUri": _INFORMATION_URI,
+                            "rules": [
+                                {"id": rule, "shortDescription": {"text": text}}
+                                for rule, text in _RULES.items()
+                            ],
+                        },
+                    },
+                    "results": self._results,
+                },
+            ],
+        }
+        self._write(json.dumps(log, ensure_ascii=False, indent=2) + "\n")
+        super().close()
+
+    def _group(self, kind: str, template, blocks: list, *, is_chained: bool):
+        locations = [_sarif_location(block) for block in blocks]
+        for i, block in enumerate(blocks):
+            lines = block.end_lineno - block.lineno + 1
+            message = f"{kind} found [lines: {lines}], {len(blocks)} {kind}s in the group"
+            self._results.append({
+                "ruleId": kind,
+                "level": "note",
+                "message": {"text": message},
+                "locations": [locations[i]],
+                "relatedLocations": [
+                    {"id": j, **location} for j, location in enumerate(locations) if j != i
+                ],
+            })
+
+
+def create_report(
+        output_format: str = "text", stream: TextIO | None = None, *, color: bool | None = None,
+) -> Report:
+    """Creates the report of the format
+
+    :param output_format: "text", "jsonl" or "sarif"
+    :param stream: stream to write to, stdout by default
+    :param color: whether the text is colored, by default only when the stream is a terminal
+    """
+
+    match output_format:
+        case "jsonl":
+            return JsonLinesReport(stream)
+        case "sarif":
+            return SarifReport(stream)
+        case _:
+            return TextReport(stream, color=color)
+
+
+def _is_terminal(stream: TextIO) -> bool:
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _sarif_location(block) -> dict:
+    path = Path(block.file)
+    return {
+        "physicalLocation": {
+            "artifactLocation": {"uri": path.as_uri() if path.is_absolute() else path.as_posix()},
+            "region": {
+                "startLine": block.lineno,
+                "startColumn": block.colno + 1,
+                "endLine": block.end_lineno,
+                "endColumn": block.end_colno + 1,
+            },
+        },
+    }
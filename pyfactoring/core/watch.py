@@ -0,0 +1,117 @@
+import time
+from pathlib import Path
+
+from colorama import Fore, Style
+
+from pyfactoring import settings
+from pyfactoring.core import cache
+from pyfactoring.core.action_check import display_analysis
+from pyfactoring.core.analysis import AnalysisSession
+from pyfactoring.settings import common_settings, pydioms_settings
+from pyfactoring.utils.path import DirSnapshot, separate_filepaths
+
+
+_POLL_INTERVAL = 0.5
+
+# (title, template or the description of an idiom, files of the blocks), the lines are left out,
+# so a group that only moved within its files is not printed again
+_GroupKey = tuple[str, str, tuple[str, ...]]
+
+
+class Watcher:
+    """Checks the configured paths again whenever their files change
+
+    Files are polled by their stamps. Only the changed files are analyzed again by
+    the session, and only the groups with a new template or new files are printed.
+    """
+
+    def __init__(self):
+        sections = settings.sections()
+        self.session = AnalysisSession(
+            sections["pyclones"].model_copy(), sections["pydioms"].model_copy(),
+        )
+        self.snapshot = DirSnapshot()
+        self._stamps: dict[Path, cache.FileStamp] = {}
+        self._groups: dict[_GroupKey, tuple[str, list]] = {}
+
+    def poll(self) -> bool:
+        """Checks the files once if any of them changed since the last poll
+
+        :return: whether the files were checked
+        """
+
+        single_paths, chained_paths = separate_filepaths(
+            common_settings.paths,
+            common_settings.chain,
+            exclude=common_settings.exclude,
+            respect_gitignore=common_settings.respect_gitignore,
+            snapshot=self.snapshot,
+        )
+
+        try:
+            stamps = {path: cache.stamp_file(path) for path in (*single_paths, *chained_paths)}
+        except FileNotFoundError:
+            # a file was removed while it was collected, it is collected again on the next poll
+            return False
+        if stamps == self._stamps:
+            return False
+
+        changed = [path for path, stamp in stamps.items() if self._stamps.get(path) != stamp]
+        removed = self._stamps.keys() - stamps.keys()
+        if self._stamps:
+            print(f"{Fore.YELLOW}Changed files:{Style.RESET_ALL} {len(changed) + len(removed)}")
+        self._stamps = stamps
+        self.session.forget(removed)
+
+        groups = self._analyze(single_paths, chained_paths)
+        self._display_changes(groups)
+        self._groups = groups
+        return True
+
+    def _analyze(self, single_paths: list[Path], chained_paths: list[Path]) -> dict[_GroupKey, tuple]:
+        session = self.session
+        results = [
+            ("FINDING CLONES IN SINGLE FILES", session.clones(single_paths)),
+            ("FINDING CLONES IN CHAINED FILES", [session.clones(chained_paths, is_chained=True)]),
+        ]
+        if pydioms_settings.enable:
+            results.append(("FINDING IDIOMS IN SINGLE FILES", session.idioms(single_paths)))
+            results.append(
+                ("FINDING IDIOMS IN CHAINED FILES", [session.idioms(chained_paths, is_chained=True)]),
+            )
+
+        groups = {}
+        for title, all_groups in results:
+            is_idiom = "IDIOMS" in title
+            for file_groups in all_groups:
+                for template, blocks in file_groups.items():
+                    files = tuple(sorted({str(block.file) for block in blocks}))
+                    groups[(title, repr(template) if is_idiom else template, files)] = (template, blocks)
+        return groups
+
+    def _display_changes(self, groups: dict[_GroupKey, tuple]):
+        added: dict[str, list[dict]] = {}
+        for key, (template, blocks) in groups.items():
+            if key not in self._groups:
+                added.setdefault(key[0], []).append({template: blocks})
+
+        for title, title_groups in added.items():
+            display_analysis(title, title_groups, is_idiom="IDIOMS" in title)
+
+        resolved = len(self._groups.keys() - groups.keys())
+        if resolved:
+            print(f"{Fore.GREEN}Resolved groups:{Style.RESET_ALL} {resolved}\n")
+
+
+def action_watch():
+    watcher = Watcher()
+    try:
+        while True:
+            try:
+                watcher.poll()
+            except FileNotFoundError as e:
+                print(f"{Fore.RED}Invalid path to project file or directory:{Style.RESET_ALL} {e}")
+                return
+            time.sleep(_POLL_INTERVAL)
+    except KeyboardInterrupt:
+        pass
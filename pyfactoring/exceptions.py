@@ -17,3 +17,13 @@ class UndefinedModeError(PyfactoringException):
 @dataclass(frozen=True)
 class OptionsConflictError(PyfactoringException):
     """The command line parameters passed are incompatible with each other"""
+
+
+@dataclass(frozen=True)
+class DaemonError(PyfactoringException):
+    """The daemon cannot be started or reached"""
+
+
+@dataclass(frozen=True)
+class GitError(PyfactoringException):
+    """The git repository or the revision cannot be read"""
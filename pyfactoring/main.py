@@ -1,15 +1,53 @@
-from pyfactoring.core import action_check, action_format, cache
-from pyfactoring.settings import common_settings
+import sys
+from collections.abc import Sequence
 
+from pyfactoring.arguments import parse_args
 
-def main():
-    match common_settings.action:
+
+def main(argv: Sequence[str] | None = None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # the subsystems are imported only after the arguments are parsed, so `--help` stays fast
+    args = parse_args(argv)
+
+    if args.action in (None, "check") and not (
+            getattr(args, "no_cache", False) or getattr(args, "watch", False)
+    ):
+        from pyfactoring.core import client  # noqa: PLC0415
+
+        # a running daemon answers from its warm state, nothing else has to be loaded
+        response = client.request_check(argv)
+        if response is not None:
+            output, errors = response
+            print(errors, end="", file=sys.stderr)
+            print(output, end="")
+            return
+
+    from pyfactoring import settings  # noqa: PLC0415
+    from pyfactoring.core import cache  # noqa: PLC0415
+
+    settings.configure(args)
+    # the diffs of the format leave the disk as it is
+    if not (settings.common_settings.action == "format" and settings.common_settings.diff):
+        cache.create_dir()
+
+    match settings.common_settings.action:
+        case "check" if settings.common_settings.watch:
+            from pyfactoring.core.watch import action_watch  # noqa: PLC0415
+            action_watch()
         case "check":
+            from pyfactoring.core.action_check import action_check  # noqa: PLC0415
             action_check()
         case "format":
+            from pyfactoring.core.action_format import action_format  # noqa: PLC0415
             action_format()
         case "restore":
             cache.restore()
+        case "daemon":
+            from pyfactoring.core import daemon  # noqa: PLC0415
+            daemon.action_daemon(stop=args.stop)
+        case "lsp":
+            from pyfactoring.core.lsp import action_lsp  # noqa: PLC0415
+            action_lsp()
 
 
 if __name__ == '__main__':
@@ -1,25 +1,31 @@
+import argparse
 import os
 import sys
 import tomllib
-from typing import Annotated, Any, Literal
+from typing import Annotated, Any, Literal, cast
 
 from pydantic import Field, ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from pyfactoring.arguments import args
 from pyfactoring.exceptions import OptionsConflictError
 
 
 class CommonSettings(BaseSettings):
-    action: Annotated[Literal["check", "format", "restore"], Field(default="check")]
+    action: Annotated[Literal["check", "format", "restore", "daemon", "lsp"], Field(default="check")]
     paths: Annotated[list[str], Field(default=["."])]
 
     pack_consts: Annotated[bool, Field(default=False)]
     diff: Annotated[bool, Field(default=False)]
+    watch: Annotated[bool, Field(default=False)]
+    changed_since: Annotated[str | None, Field(default=None)]
+    output_format: Annotated[Literal["text", "jsonl", "sarif"], Field(default="text")]
     no_cache: Annotated[bool, Field(default=False)]
     exclude: Annotated[list[str], Field(default_factory=list)]
     chain: Annotated[list[str], Field(default_factory=list)]
     chain_all: Annotated[bool, Field(default=False)]
+    respect_gitignore: Annotated[bool, Field(default=False)]
+    jobs: Annotated[int, Field(ge=1, default=1)]
+    verbose: Annotated[bool, Field(default=False)]
 
     def model_post_init(self, __context: Any) -> None:
         if self.chain_all and self.chain:
@@ -43,6 +49,7 @@ class PydiomsSettings(BaseSettings):
 
 
 class PyclonesSettings(BaseSettings):
+    verbose: Annotated[bool, Field(default=False)]
     count: Annotated[int, Field(ge=1, default=2)]
     length: Annotated[int, Field(ge=1, default=5)]
     template_mode: Annotated[Literal["code", "tree"], Field(default="code")]
@@ -70,20 +77,37 @@ def _load_config():
     }
 
 
-def _assign_arguments(config: dict):  # noqa: PLR0912
+def _assign_check_arguments(common: dict, args: argparse.Namespace):
+    if args.watch:
+        common["watch"] = args.watch
+
+    if args.changed_since is not None:
+        common["changed_since"] = args.changed_since
+
+    if args.output_format is not None:
+        common["output_format"] = args.output_format
+
+
+def _assign_arguments(config: dict, args: argparse.Namespace | None):  # noqa: PLR0912
     if not args:
         return
 
     if args.action:
         config["common"]["action"] = args.action
 
-        if args.action == "restore":
+        if args.action in ("restore", "daemon", "lsp"):
             return
 
+        if args.action == "check":
+            _assign_check_arguments(config["common"], args)
+
         if args.action == "format":
             if args.pack_consts:
                 config["common"]["pack_consts"] = args.pack_consts
 
+            if args.diff:
+                config["common"]["diff"] = args.diff
+
         if args.no_cache:
             config["common"]["no_cache"] = args.no_cache
 
@@ -106,6 +130,15 @@ def _assign_arguments(config: dict):  # noqa: PLR0912
         if args.exclude:
             config["common"]["exclude"] = args.exclude
 
+        if args.respect_gitignore:
+            config["common"]["respect_gitignore"] = args.respect_gitignore
+
+        if args.jobs is not None:
+            config["common"]["jobs"] = args.jobs
+
+        if args.verbose:
+            config["common"]["verbose"] = args.verbose
+
     if args.pd_enable:
         config["pydioms"]["enable"] = args.pd_enable
 
@@ -118,6 +151,9 @@ def _assign_arguments(config: dict):  # noqa: PLR0912
         if args.pd_length is not None:
             config["pydioms"]["length"] = args.pd_length
 
+    if args.pc_verbose:
+        config["pyclones"]["verbose"] = args.pc_verbose
+
     if args.template_mode:
         config["pyclones"]["template_mode"] = args.template_mode
 
@@ -131,14 +167,75 @@ def _assign_arguments(config: dict):  # noqa: PLR0912
         config["pyclones"]["length"] = args.pc_length
 
 
-_config = _load_config()
+# settings are built once, by `configure` or from the config file on the first access
+_sections: dict[str, BaseSettings] = {}
+
+
+class _LazySettings:
+    """Forwards attribute access to a settings section, building the sections on first use"""
+
+    __slots__ = ("_section",)
+
+    def __init__(self, section: str):
+        object.__setattr__(self, "_section", section)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(_get_section(self._section), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(_get_section(self._section), name, value)
+
+    def __repr__(self) -> str:
+        return repr(_get_section(self._section))
+
+
+def configure(args: argparse.Namespace | None = None):
+    """Builds the settings like `build`, but reports invalid settings and exits"""
+
+    try:
+        build(args)
+    except (ValidationError, OptionsConflictError) as e:
+        print(e)
+        sys.exit()
+
+
+def sections() -> dict[str, BaseSettings]:
+    """Returns the built settings, to be installed into a worker process"""
+
+    return {name: _get_section(name) for name in ("common", "pydioms", "pyclones")}
+
+
+def install(built: dict[str, BaseSettings]):
+    _sections.clear()
+    _sections.update(built)
+
+
+def build(args: argparse.Namespace | None = None):
+    """Builds the settings from the config file and the command line arguments
+
+    :raises ValidationError: a setting has an invalid value
+    :raises OptionsConflictError: incompatible options are passed
+    """
+
+    config = _load_config()
+    config.setdefault("common", {})
+    config.setdefault("pydioms", {})
+    config.setdefault("pyclones", {})
+    _assign_arguments(config, args)
+
+    install({
+        "common": CommonSettings(**config["common"]),
+        "pydioms": PydiomsSettings(**config["pydioms"]),
+        "pyclones": PyclonesSettings(**config["pyclones"]),
+    })
+
+
+def _get_section(name: str) -> BaseSettings:
+    if not _sections:
+        build()
+    return _sections[name]
 
-try:
-    _assign_arguments(_config)
 
-    common_settings: CommonSettings = CommonSettings(**_config.get("common"))
-    pydioms_settings: PydiomsSettings = PydiomsSettings(**_config.get("pydioms"))
-    pyclones_settings: PyclonesSettings = PyclonesSettings(**_config.get("pyclones"))
-except (ValidationError, OptionsConflictError) as e:
-    print(e)
-    sys.exit()
+common_settings = cast(CommonSettings, _LazySettings("common"))
+pydioms_settings = cast(PydiomsSettings, _LazySettings("pydioms"))
+pyclones_settings = cast(PyclonesSettings, _LazySettings("pyclones"))
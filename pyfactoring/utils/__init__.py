@@ -1,4 +1,30 @@
-from pyfactoring.utils import path
-from pyfactoring.utils.extract import module, file_source
-from pyfactoring.utils.pydioms import prefixtree, idiom, ast_types, ast_inspect, IdiomFinder
-from pyfactoring.utils.pyclones import CodeBlockClone, CloneFinder, Templater, Scope
+import importlib
+
+
+_EXPORTS = {
+    "path": ("pyfactoring.utils.path", None),
+    "module": ("pyfactoring.utils.extract", "module"),
+    "file_source": ("pyfactoring.utils.extract", "file_source"),
+    "prefixtree": ("pyfactoring.utils.pydioms.prefixtree", None),
+    "idiom": ("pyfactoring.utils.pydioms.idiom", None),
+    "ast_types": ("pyfactoring.utils.pydioms.ast_types", None),
+    "ast_inspect": ("pyfactoring.utils.pydioms.ast_inspect", None),
+    "IdiomFinder": ("pyfactoring.utils.pydioms", "IdiomFinder"),
+    "CodeBlockClone": ("pyfactoring.utils.pyclones", "CodeBlockClone"),
+    "CloneFinder": ("pyfactoring.utils.pyclones", "CloneFinder"),
+    "Templater": ("pyfactoring.utils.pyclones", "Templater"),
+    "Scope": ("pyfactoring.utils.pyclones", "Scope"),
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_name, attribute = _EXPORTS[name]
+    module = importlib.import_module(module_name)
+    value = module if attribute is None else getattr(module, attribute)
+    globals()[name] = value
+    return value
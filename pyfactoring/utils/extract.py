@@ -13,8 +13,11 @@ def file_source(filepath: Path) -> str:
     return src
 
 
-def stmt_source(stmt: ast.AST) -> str:
-    match pyclones_settings.template_mode:
+def stmt_source(stmt: ast.AST, mode: str = None) -> str:
+    if mode is None:
+        mode = pyclones_settings.template_mode
+
+    match mode:
         case "code":
             return ast.unparse(stmt)
         case "tree":
@@ -22,13 +25,13 @@ def stmt_source(stmt: ast.AST) -> str:
         case _:
             raise UndefinedModeError(
                 f"Template extraction mode is not specified or is incorrect: "
-                f"{pyclones_settings.template_mode}",
+                f"{mode}",
             )
 
 
-def module(filepath: Path) -> ast.Module:
+def module(filepath: Path, source: str = None) -> ast.Module:
     try:
-        return ast.parse(file_source(filepath))
-    except (SyntaxError, AttributeError):
+        return ast.parse(file_source(filepath) if source is None else source)
+    except (SyntaxError, AttributeError, UnicodeDecodeError):
         print(f"{filepath}:0: {Fore.RED}The file with the error was skipped{Style.RESET_ALL}")
         return ast.parse("# Nothing")
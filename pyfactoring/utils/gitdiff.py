@@ -0,0 +1,79 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from pyfactoring.exceptions import GitError
+
+
+_GIT_TIMEOUT = 30
+_HUNK = re.compile(rb"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+# (first line, last line) of the changed lines, a deletion between the lines `n` and `n + 1`
+# is kept as (n + 1, n), so it only overlaps the blocks that contain both of them
+LineRange = tuple[int, int]
+
+
+def changed_lines(rev: str, dirpath: str = ".") -> dict[Path, list[LineRange]]:
+    """Lists the lines of the Python files under the directory that differ from the revision
+
+    The work tree is compared, so staged and unstaged changes are both listed.
+    Untracked files that are not ignored are changed as a whole.
+
+    :param rev: revision to compare the work tree with
+    :param dirpath: directory inside a git work tree
+    :return: changed line ranges by the absolute paths of the changed files
+    """
+
+    # both listings compare the same files in the same order, deleted files have no lines to check
+    compared = ("--no-renames", "--diff-filter=d", "--relative", rev, "--", "*.py")
+    names = _git(dirpath, "diff", "--name-only", "-z", *compared)
+    diff = _git(dirpath, "diff", "-U0", "--no-color", "--no-ext-diff", *compared)
+    untracked = _git(dirpath, "ls-files", "-o", "--exclude-standard", "-z", "--", "*.py")
+
+    # the names are not quoted with -z, unlike the ones in the headers of the diff
+    paths = iter(_path(dirpath, name) for name in _names(names))
+    changes: dict[Path, list[LineRange]] = {}
+    ranges = None
+    for line in diff.splitlines():
+        if line.startswith(b"diff "):
+            ranges = changes.setdefault(next(paths), [])
+        elif ranges is not None and (hunk := _HUNK.match(line)):
+            start = int(hunk[1])
+            count = 1 if hunk[2] is None else int(hunk[2])
+            ranges.append((start, start + count - 1) if count else (start + 1, start))
+
+    for name in _names(untracked):
+        changes[_path(dirpath, name)] = [(1, sys.maxsize)]
+
+    return changes
+
+
+def is_changed(ranges: list[LineRange], lineno: int, end_lineno: int) -> bool:
+    return any(start <= end_lineno and end >= lineno for start, end in ranges)
+
+
+def _names(output: bytes) -> list[str]:
+    return [name for name in output.decode("utf-8", errors="surrogateescape").split("\0") if name]
+
+
+def _path(dirpath: str, name: str) -> Path:
+    return Path(os.path.abspath(os.path.join(dirpath, name)))
+
+
+def _git(dirpath: str, *args: str) -> bytes:
+    try:
+        result = subprocess.run(
+            ["git", "-C", dirpath, "-c", "core.quotePath=false", *args],
+            capture_output=True,
+            check=True,
+            timeout=_GIT_TIMEOUT,
+        )
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode("utf-8", errors="replace").strip().splitlines()
+        raise GitError(message[0] if message else f"git {args[0]} failed") from e
+    except (OSError, subprocess.SubprocessError) as e:
+        raise GitError(f"git is unavailable: {e}") from e
+
+    return result.stdout
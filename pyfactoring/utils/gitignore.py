@@ -0,0 +1,175 @@
+import os
+import re
+import subprocess
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+
+_GIT_TIMEOUT = 30
+
+
+def glob_to_regex(glob: str, sep: str = "/") -> str:
+    """Translates a glob into a regex body that does not cross separators with `*` and `?`
+
+    :param glob: glob with `*`, `?`, `**` and `[...]`
+    :param sep: path separator
+    :return: regex that matches the whole glob, without anchors
+    """
+
+    escaped_sep = re.escape(sep)
+    pattern = []
+    i = 0
+    while i < len(glob):
+        char = glob[i]
+        if glob.startswith(f"**{sep}", i):
+            pattern.append(f"(?:.*{escaped_sep})?")
+            i += 3
+            continue
+        if glob.startswith("**", i):
+            pattern.append(".*")
+            i += 2
+            continue
+
+        if char == "*":
+            pattern.append(f"[^{escaped_sep}]*")
+        elif char == "?":
+            pattern.append(f"[^{escaped_sep}]")
+        elif char == "[" and (end := glob.find("]", i + 2)) != -1:
+            chars = glob[i + 1:end].replace("\\", "\\\\")
+            if chars.startswith("!"):
+                chars = f"^{chars[1:]}"
+            elif chars.startswith("^"):
+                chars = f"\\{chars}"
+            pattern.append(f"[{chars}]")
+            i = end + 1
+            continue
+        else:
+            pattern.append(re.escape(char))
+        i += 1
+
+    return "".join(pattern)
+
+
+@dataclass(frozen=True)
+class _Rule:
+    regex: re.Pattern
+    negated: bool
+    dir_only: bool
+
+
+class IgnoreRules:
+    """Rules of a single ignore file, matched against the paths under its directory"""
+
+    def __init__(self, base: str, lines: Iterable[str]):
+        self.base = os.path.abspath(base)
+        self._rules = [rule for line in lines if (rule := _parse_rule(line)) is not None]
+
+    @classmethod
+    def from_dir(cls, dirpath: str) -> "IgnoreRules | None":
+        return cls.from_file(dirpath, os.path.join(dirpath, ".gitignore"))
+
+    @classmethod
+    def from_file(cls, base: str, path: str) -> "IgnoreRules | None":
+        try:
+            with open(path, "r", encoding="utf-8", errors="surrogateescape") as ignore_file:
+                rules = cls(base, ignore_file.read().splitlines())
+        except OSError:
+            return None
+        return rules if rules._rules else None
+
+    def match(self, path: str, is_dir: bool) -> bool | None:
+        """Finds the last rule that matches the path
+
+        :param path: absolute path under the base directory
+        :param is_dir: the path leads to a directory
+        :return: whether the path is ignored, None if no rule matches it
+        """
+
+        relative = path[len(self.base) + 1:]
+        if os.sep != "/":
+            relative = relative.replace(os.sep, "/")
+
+        for rule in reversed(self._rules):
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(relative):
+                return not rule.negated
+        return None
+
+
+def parent_rules(dirpath: str) -> tuple[IgnoreRules, ...]:
+    """Loads the ignore rules that apply to the directory, from the work tree root down to it
+
+    Outside a git work tree only the rules of the directory itself are loaded.
+    """
+
+    start = os.path.abspath(dirpath)
+    dirs = [start]
+    current = start
+    while not os.path.exists(os.path.join(current, ".git")):
+        parent = os.path.dirname(current)
+        if parent == current:
+            dirs = [start]
+            break
+        current = parent
+        dirs.append(current)
+
+    rules = [IgnoreRules.from_dir(path) for path in reversed(dirs)]
+    if os.path.isdir(os.path.join(current, ".git")):
+        rules.insert(0, IgnoreRules.from_file(current, os.path.join(current, ".git", "info", "exclude")))
+    return tuple(rule for rule in rules if rule is not None)
+
+
+def is_ignored(rules: Sequence[IgnoreRules], path: str, is_dir: bool) -> bool:
+    # rules of the deeper directories take precedence
+    path = os.path.abspath(path)
+    for dir_rules in reversed(rules):
+        ignored = dir_rules.match(path, is_dir)
+        if ignored is not None:
+            return ignored
+    return False
+
+
+def git_files(dirpath: str) -> list[str] | None:
+    """Lists the files of the git work tree under the directory that are not ignored
+
+    Tracked and untracked files are taken from the git index, so nothing is walked.
+
+    :param dirpath: directory inside a git work tree
+    :return: paths relative to the directory, None if git or the work tree is unavailable
+    """
+
+    try:
+        result = subprocess.run(
+            ["git", "-C", dirpath, "ls-files", "-co", "--exclude-standard", "-z", "--", "."],
+            capture_output=True,
+            check=True,
+            timeout=_GIT_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+    files = result.stdout.decode("utf-8", errors="surrogateescape").split("\0")
+    return [os.path.normpath(file) for file in files if file]
+
+
+def _parse_rule(line: str) -> _Rule | None:
+    if not line.strip() or line.startswith("#"):
+        return None
+
+    # trailing spaces are ignored unless they are escaped
+    pattern = line.rstrip(" ") if not line.endswith("\\ ") else line
+    negated = pattern.startswith("!")
+    if negated or pattern.startswith(("\\!", "\\#")):
+        pattern = pattern[1:]
+
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+
+    # a slash anywhere but at the end anchors the pattern to the ignore file directory
+    anchored = "/" in pattern
+    body = glob_to_regex(pattern.lstrip("/"))
+    prefix = "" if anchored else "(?:.*/)?"
+    return _Rule(re.compile(f"{prefix}{body}$"), negated, dir_only)
@@ -2,9 +2,13 @@ import os
 import os.path
 import re
 import sys
+import time
 from collections.abc import Collection
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from pyfactoring.utils import gitignore
+
 
 def _get_venv_name() -> str:
     python_dir = os.path.dirname(sys.executable)
@@ -12,8 +16,11 @@ def _get_venv_name() -> str:
     return venv_name
 
 
+# a dir with the name of the venv of the interpreter is pruned only when it is a venv itself
+_VENV_NAME = _get_venv_name()
+_VENV_CONFIG = "pyvenv.cfg"
+
 _DEFAULT_EXCLUDE = (
-    _get_venv_name(),
     "venv",
     ".venv",
     "build",
@@ -22,6 +29,7 @@ _DEFAULT_EXCLUDE = (
     "__pypackages__",
     "dist",
     "site-packages",
+    "node_modules",
     ".pyfactoring_cache",
     ".pytest_cache",
     ".mypy_cache",
@@ -33,60 +41,248 @@ _DEFAULT_EXCLUDE = (
 )
 
 
-def collect_filepaths(path: str, *, exclude: Collection[str] = None) -> list[Path]:
+_GLOB_CHARS = frozenset("*?[")
+_RACY_MTIME_NS = 2_000_000_000
+
+# (name, is dir) of the subdirs and python files in the order of the dir listing,
+# symlinked subdirs are listed as well, though only the ones given at the top level are walked
+_Listing = list[tuple[str, bool]]
+
+
+class PathMatcher:
+    """Matches paths against exclude or chain rules compiled into a single regex
+
+    A plain rule matches any path that contains it. A rule with glob characters
+    matches whole path components: `*` and `?` do not cross separators, `**` does.
+    """
+
+    def __init__(self, rules: Collection[str]):
+        patterns = [_rule_pattern(str(Path(rule))) for rule in rules]
+        self._regex = re.compile("|".join(patterns)) if patterns else None
+
+    def match(self, path: str | Path) -> bool:
+        return self._regex is not None and self._regex.search(str(path)) is not None
+
+
+@dataclass
+class WalkStats:
+    found: int = 0
+    skipped: int = 0
+
+    def __str__(self) -> str:
+        return f"Files: {self.found}\nSkipped: {self.skipped}"
+
+
+@dataclass
+class DirSnapshot:
+    """Listings of the walked dirs, a dir is listed again only when its mtime changes
+
+    Adding, removing or renaming an entry changes the mtime of its dir, so a listing
+    with the same mtime is still valid. Dirs modified right before they are listed
+    are not kept, their mtime may not change on the next modification.
+    """
+
+    dirs: dict[str, tuple[int, _Listing]] = field(default_factory=dict)
+    changed: bool = field(default=False, compare=False)
+
+    def list_dir(self, dirpath: str) -> _Listing:
+        key = os.path.abspath(dirpath)
+        mtime_ns = os.stat(dirpath).st_mtime_ns
+        snapshot = self.dirs.get(key)
+        if snapshot is not None and snapshot[0] == mtime_ns:
+            return snapshot[1]
+
+        listing = _scan_dir(dirpath)
+        if mtime_ns < time.time_ns() - _RACY_MTIME_NS:
+            self.dirs[key] = (mtime_ns, listing)
+            self.changed = True
+        return listing
+
+
+def collect_filepaths(
+        path: str,
+        *,
+        exclude: Collection[str] = None,
+        stats: WalkStats = None,
+        respect_gitignore: bool = False,
+        snapshot: DirSnapshot = None,
+) -> list[Path]:
     if exclude is None:
         exclude = []
+    if stats is None:
+        stats = WalkStats()
 
+    walker = _Walker(PathMatcher(exclude), stats, respect_gitignore, snapshot)
     if os.path.isfile(path) and path.endswith(".py"):
-        return [Path(path)]
-    if os.path.isdir(path):
-        return _collect_from_dir(path, exclude)
-    if os.path.isfile(path) and path.endswith(".txt"):
-        return _collect_from_file(path, exclude)
+        filepaths = [Path(path)]
+    elif os.path.isdir(path):
+        filepaths = walker.collect_dir(path)
+    elif os.path.isfile(path) and path.endswith(".txt"):
+        filepaths = _collect_from_file(path, walker)
+    else:
+        raise FileNotFoundError(f"Path does not lead to any dirs or file[.txt | .py]: '{path}'")
 
-    raise FileNotFoundError(f"Path does not lead to any dirs or file[.txt | .py]: '{path}'")
+    stats.found += len(filepaths)
+    return filepaths
 
 
 def separate_filepaths(
-        paths: list[Path], chain: list[str], *, exclude: Collection[str] = None,
+        paths: list[Path],
+        chain: list[str],
+        *,
+        exclude: Collection[str] = None,
+        stats: WalkStats = None,
+        respect_gitignore: bool = False,
+        snapshot: DirSnapshot = None,
 ) -> tuple[list[Path], list[Path]]:
     single = []
     chained = []
+    chain_matcher = PathMatcher(chain)
 
     for path in paths:
-        filepaths = collect_filepaths(path, exclude=exclude)
-        chained.extend(
-            filepath
-            for filepath in filepaths
-            # checking that the path is chained
-            if any(map(lambda ch: str(Path(ch)) in str(filepath), chain))
+        filepaths = collect_filepaths(
+            path,
+            exclude=exclude,
+            stats=stats,
+            respect_gitignore=respect_gitignore,
+            snapshot=snapshot,
         )
-        single.extend(filepath for filepath in filepaths if filepath not in chained)
+        for filepath in filepaths:
+            if chain_matcher.match(filepath):
+                chained.append(filepath)
+            else:
+                single.append(filepath)
 
     return single, chained
 
 
-def _collect_from_dir(dirpath: str, exclude: Collection[str]) -> list[Path]:
-    files_or_dirs = [
-        os.path.join(dirpath, fd)
-        for fd in os.listdir(dirpath)
-        if fd not in _DEFAULT_EXCLUDE and not fd.startswith(".")
-    ]
+_Rules = tuple[gitignore.IgnoreRules, ...] | None
+
+
+@dataclass
+class _Walker:
+    matcher: PathMatcher
+    stats: WalkStats
+    respect_gitignore: bool = False
+    snapshot: DirSnapshot | None = None
 
-    filepaths: list[Path] = []
-    for file_or_dir in files_or_dirs:
-        if os.path.isfile(file_or_dir) and file_or_dir.endswith(".py"):
-            filepaths.append(Path(file_or_dir))
-            continue
+    def collect_dir(self, dirpath: str) -> list[Path]:
+        filepaths: list[Path] = []
+        if not self.respect_gitignore:
+            self._walk(dirpath, None, filepaths)
+            return filepaths
 
-        for current_path, dirs, files in os.walk(file_or_dir):
-            current_filepaths = [Path(current_path) / file for file in files if file.endswith(".py")]
-            filepaths.extend(current_filepaths)
+        files = gitignore.git_files(dirpath)
+        if files is None:
+            self._walk(dirpath, gitignore.parent_rules(dirpath), filepaths)
+        else:
+            self._filter_files(dirpath, files, filepaths)
+        return filepaths
 
-    return _filter_filepaths(filepaths, exclude)
+    def _walk(self, dirpath: str, rules: _Rules, filepaths: list[Path]):
+        # top-level entries keep their order, the files of nested dirs go before their subdirs
+        for name, is_dir in self._list_dir(dirpath):
+            path = os.path.join(dirpath, name)
+            if is_dir:
+                self._walk_dirs([(path, rules)], filepaths)
+            else:
+                self._collect_file(name, path, rules, filepaths)
+
+    def _walk_dirs(self, stack: list[tuple[str, _Rules]], filepaths: list[Path]):
+        while stack:
+            dirpath, rules = stack.pop()
+            if self._is_excluded(os.path.basename(dirpath), dirpath, rules, is_dir=True):
+                # excluded dirs are pruned before their entries are listed
+                self.stats.skipped += 1
+                continue
 
+            if rules is not None and (dir_rules := gitignore.IgnoreRules.from_dir(dirpath)):
+                rules = (*rules, dir_rules)
 
-def _collect_from_file(filepath: str, exclude: Collection[str]) -> list[Path]:
+            subdirs = []
+            for name, is_dir in self._list_dir(dirpath):
+                path = os.path.join(dirpath, name)
+                if is_dir:
+                    if not os.path.islink(path):
+                        subdirs.append((path, rules))
+                else:
+                    self._collect_file(name, path, rules, filepaths)
+            stack.extend(reversed(subdirs))
+
+    def _filter_files(self, dirpath: str, files: list[str], filepaths: list[Path]):
+        for file in files:
+            if not file.endswith(".py"):
+                continue
+
+            path = os.path.join(dirpath, file)
+            parts = file.split(os.sep)
+            if (
+                any(_is_excluded_name(part) for part in parts)
+                or any(
+                    _is_venv(os.path.join(dirpath, *parts[:i + 1]))
+                    for i, part in enumerate(parts[:-1])
+                    if part == _VENV_NAME
+                )
+                or self.matcher.match(Path(path))
+                or not os.path.isfile(path)
+            ):
+                self.stats.skipped += 1
+                continue
+
+            filepaths.append(Path(path))
+
+    def _collect_file(self, name: str, path: str, rules: _Rules, filepaths: list[Path]):
+        if self._is_excluded(name, path, rules, is_dir=False):
+            self.stats.skipped += 1
+            return
+
+        filepaths.append(Path(path))
+
+    def _list_dir(self, dirpath: str) -> _Listing:
+        if self.snapshot is None:
+            return _scan_dir(dirpath)
+        return self.snapshot.list_dir(dirpath)
+
+    def _is_excluded(self, name: str, path: str, rules: _Rules, *, is_dir: bool) -> bool:
+        if _is_excluded_name(name) or (is_dir and _is_venv(path)):
+            return True
+        if rules is not None and gitignore.is_ignored(rules, path, is_dir):
+            return True
+        # a dir that matches a rule contains only paths that match it as well
+        return self.matcher.match(Path(path))
+
+
+def _scan_dir(dirpath: str) -> _Listing:
+    listing = []
+    with os.scandir(dirpath) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                listing.append((entry.name, True))
+            elif entry.name.endswith(".py") and entry.is_file():
+                listing.append((entry.name, False))
+    return listing
+
+
+def _is_excluded_name(name: str) -> bool:
+    return name in _DEFAULT_EXCLUDE or name.startswith(".")
+
+
+def _is_venv(dirpath: str) -> bool:
+    return (
+        os.path.basename(dirpath) == _VENV_NAME
+        and os.path.isfile(os.path.join(dirpath, _VENV_CONFIG))
+    )
+
+
+def _rule_pattern(rule: str) -> str:
+    if _GLOB_CHARS.isdisjoint(rule):
+        return re.escape(rule)
+
+    sep = re.escape(os.sep)
+    return f"(?:^|{sep}){gitignore.glob_to_regex(rule, os.sep)}(?:{sep}|$)"
+
+
+def _collect_from_file(filepath: str, walker: _Walker) -> list[Path]:
     filepaths = []
     relative_path = Path(filepath).parent
     with open(filepath, "r") as f:
@@ -96,17 +292,8 @@ def _collect_from_file(filepath: str, exclude: Collection[str]) -> list[Path]:
 
             path = line.rstrip()
             if os.path.isdir(path):
-                filepaths.extend(_collect_from_dir(path, exclude))
+                filepaths.extend(walker.collect_dir(path))
             elif path.endswith(".py"):
                 filepaths.append(relative_path / path)
 
-    return _filter_filepaths(filepaths, exclude)
-
-
-def _filter_filepaths(filepaths: Collection[Path], exclude: Collection[str]) -> list[Path]:
-    patterns = [re.escape(str(Path(path))) for path in exclude]
-    return [
-        filepath
-        for filepath in filepaths
-        if all(map(lambda p: re.search(p, str(filepath)) is None, patterns))
-    ]
+    return [filepath for filepath in filepaths if not walker.matcher.match(filepath)]
@@ -1,12 +1,13 @@
 import ast
 import copy
-from collections import defaultdict
+from collections import Counter, defaultdict
 from collections.abc import Collection
 from dataclasses import dataclass, field
 from pathlib import Path
 
 from pyfactoring.settings import pyclones_settings
 from pyfactoring.utils import extract
+from pyfactoring.utils.pyclones import hasher
 from pyfactoring.utils.pyclones.templater import Templater
 
 
@@ -17,7 +18,7 @@ class CodeBlockClone:
     end_lineno: int
     colno: int
     end_colno: int
-    source: str = field(repr=False, kw_only=True)
+    source: str = field(default=None, repr=False, kw_only=True)
     class_name: str = field(default=None, kw_only=True)
     vars: list[str] = field(default_factory=list, kw_only=True)
     consts: list[str] = field(default_factory=list, kw_only=True)
@@ -31,6 +32,11 @@ class CodeBlockClone:
 class CloneFinder:
     allowed_nodes: Collection[str] = field(default=None)
     templater: Templater = field(default_factory=Templater)
+    count: int = field(default=None, kw_only=True)
+    length: int = field(default=None, kw_only=True)
+    template_mode: str = field(default=None, kw_only=True)
+    total_candidates: int = field(default=0, init=False)
+    templated_candidates: int = field(default=0, init=False)
 
     def __post_init__(self):
         if self.allowed_nodes is None:
@@ -51,58 +57,57 @@ class CloneFinder:
         else:
             self.allowed_nodes: tuple[str] = tuple(self.allowed_nodes)
 
+        if self.count is None:
+            self.count = pyclones_settings.count
+        if self.length is None:
+            self.length = pyclones_settings.length
+        if self.template_mode is None:
+            self.template_mode = pyclones_settings.template_mode
+
     def find_all(
-        self, path: Path, *, unfiltered: bool = False,
+        self,
+        path: Path,
+        *,
+        count: int = None,
+        length: int = None,
+        shapes: Collection[int] = None,
+        source: str = None,
     ) -> dict[str, list[CodeBlockClone]]:
-        clones: dict[str, list[CodeBlockClone]] = defaultdict(list)
-        module = extract.module(path)
-        self.templater.update_globals(module)
-
-        for node in ast.walk(module):
-            if not self._is_allowed_node(node):
-                continue
-
-            if isinstance(node, ast.ClassDef):
-                for stmt in node.body:
-                    stmt.class_name = node.name
-                continue
-
-            if node.end_lineno - node.lineno < pyclones_settings.length:
-                continue
-
-            to_template = copy.deepcopy(node)
-            to_template = self.templater.visit(to_template)
-
-            class_name = to_template.class_name if hasattr(to_template, "class_name") else None
-            variables, consts = self.templater.pop_unique_operands()
+        if count is None:
+            count = self.count
 
-            template = extract.stmt_source(to_template)
-            clone = CodeBlockClone(
-                path, node.lineno, node.end_lineno, node.col_offset, node.end_col_offset,
-                source=extract.stmt_source(node),
-                class_name=class_name,
-                vars=variables,
-                consts=consts,
-            )
-            clones[template].append(clone)
+        module = extract.module(path, source)
+        self.templater.update_globals(module)
+        candidates = self._candidates(module, length)
 
-            del to_template
+        if shapes is None:
+            shapes = self._colliding_shapes(Counter(h for h, _ in candidates), count)
 
-        if unfiltered:
-            return clones
+        clones = self._templatize_candidates(path, candidates, shapes)
 
         return {
             t: cs
             for t, cs in clones.items()
-            if len(cs) >= pyclones_settings.count
+            if len(cs) >= count
         }
 
+    def find_shapes(self, path: Path, source: str = None) -> Counter[int]:
+        module = extract.module(path, source)
+        return Counter(h for h, _ in self._candidates(module))
+
     def chained_find_all(
         self, paths: Collection[Path],
     ) -> dict[str, list[CodeBlockClone]]:
+        modules = {path: extract.module(path) for path in paths}
+        candidates = {path: self._candidates(module) for path, module in modules.items()}
+
+        buckets = Counter(h for path_candidates in candidates.values() for h, _ in path_candidates)
+        shapes = self._colliding_shapes(buckets, self.count)
+
         clones: dict[str, list[CodeBlockClone]] = {}
-        for path in paths:
-            current_clones = self.find_all(path, unfiltered=True)
+        for path, module in modules.items():
+            self.templater.update_globals(module)
+            current_clones = self._templatize_candidates(path, candidates[path], shapes)
             for template, blocks in current_clones.items():
                 if template not in clones.keys():
                     clones[template] = blocks
@@ -112,8 +117,69 @@ class CloneFinder:
         return {
             t: cs
             for t, cs in clones.items()
-            if len(cs) >= pyclones_settings.count
+            if len(cs) >= self.count
         }
 
+    @staticmethod
+    def _colliding_shapes(buckets: Counter[int], min_count: int) -> set[int]:
+        # the template can only be shared with nodes of the same shape
+        return {h for h, count in buckets.items() if count >= min_count}
+
+    def _templatize_candidates(
+        self, path: Path, candidates: list[tuple[int, ast.AST]], shapes: Collection[int],
+    ) -> dict[str, list[CodeBlockClone]]:
+        clones: dict[str, list[CodeBlockClone]] = defaultdict(list)
+        self.total_candidates += len(candidates)
+
+        for node_hash, node in candidates:
+            if node_hash not in shapes:
+                continue
+
+            template, clone = self._templatize(path, node)
+            clones[template].append(clone)
+            self.templated_candidates += 1
+
+        return clones
+
+    def _candidates(self, module: ast.Module, length: int = None) -> list[tuple[int, ast.AST]]:
+        if length is None:
+            length = self.length
+
+        nodes, hashes = hasher.hash_tree(module)
+        candidates: list[tuple[int, ast.AST]] = []
+
+        for node in nodes:
+            if not self._is_allowed_node(node):
+                continue
+
+            if isinstance(node, ast.ClassDef):
+                for stmt in node.body:
+                    stmt.class_name = node.name
+                continue
+
+            if node.end_lineno - node.lineno < length:
+                continue
+
+            candidates.append((hashes[id(node)], node))
+
+        return candidates
+
+    def _templatize(self, path: Path, node: ast.AST) -> tuple[str, CodeBlockClone]:
+        to_template = copy.deepcopy(node)
+        to_template = self.templater.visit(to_template)
+
+        class_name = to_template.class_name if hasattr(to_template, "class_name") else None
+        variables, consts = self.templater.pop_unique_operands()
+
+        template = extract.stmt_source(to_template, self.template_mode)
+        clone = CodeBlockClone(
+            path, node.lineno, node.end_lineno, node.col_offset, node.end_col_offset,
+            source=extract.stmt_source(node, self.template_mode),
+            class_name=class_name,
+            vars=variables,
+            consts=consts,
+        )
+        return template, clone
+
     def _is_allowed_node(self, node: ast.AST):
         return type(node).__name__ in self.allowed_nodes
@@ -0,0 +1,92 @@
+import ast
+import functools
+import hashlib
+import zlib
+
+
+# Leaf fields rewritten by the Templater: their values never take part in the hash,
+# so two nodes that differ only in names or constants end up with the same hash.
+_TEMPLATED_FIELDS: frozenset[tuple[str, str]] = frozenset({
+    ("Name", "id"),
+    ("arg", "arg"),
+    ("Constant", "value"),
+    ("FunctionDef", "name"),
+    ("AsyncFunctionDef", "name"),
+    ("ExceptHandler", "name"),
+    ("Global", "names"),
+    ("Nonlocal", "names"),
+    ("MatchSingleton", "value"),
+    ("MatchStar", "name"),
+    ("MatchAs", "name"),
+    ("MatchMapping", "rest"),
+})
+
+# Templated fields that always hold a constant, None there is a value and not a missing field
+_CONSTANT_FIELDS: frozenset[tuple[str, str]] = frozenset({
+    ("Constant", "value"),
+    ("MatchSingleton", "value"),
+})
+
+_NONE = 0
+_OPERAND = 1
+
+
+def hash_tree(root: ast.AST) -> tuple[list[ast.AST], dict[int, int]]:
+    """Computes a normalized structural hash for every node of the tree in one pass
+
+    Nodes are hashed in reverse `ast.walk` order, so the hash of each child is ready
+    before its parent and is reused instead of walking the subtree again.
+    Equal templates always give equal hashes, the opposite is not guaranteed.
+    Hashes are built from integers only, so they are the same in every process.
+
+    :param root: tree to hash
+    :return: nodes in `ast.walk` order and their hashes by `id(node)`
+    """
+
+    nodes = list(ast.walk(root))
+    hashes: dict[int, int] = {}
+    for node in reversed(nodes):
+        hashes[id(node)] = _hash_node(node, hashes)
+    return nodes, hashes
+
+
+def template_digest(template: str) -> bytes:
+    return hashlib.blake2b(template.encode("utf-8"), digest_size=16).digest()
+
+
+def _hash_node(node: ast.AST, hashes: dict[int, int]) -> int:
+    node_type = type(node).__name__
+    parts: list = [_stable_hash(node_type)]
+
+    for name, value in ast.iter_fields(node):
+        templated = (node_type, name) in _TEMPLATED_FIELDS
+        if (node_type, name) in _CONSTANT_FIELDS:
+            parts.append(_OPERAND)
+        elif isinstance(value, list):
+            parts.append(tuple(_hash_value(v, hashes, templated) for v in value))
+        else:
+            parts.append(_hash_value(value, hashes, templated))
+
+    # the Templater keeps the names of directly called functions as is
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        parts.append(_stable_hash(node.func.id))
+
+    return hash(tuple(parts))
+
+
+def _hash_value(value, hashes: dict[int, int], templated: bool) -> int:
+    if isinstance(value, ast.AST):
+        return hashes[id(value)]
+    if value is None:
+        return _NONE
+    if templated:
+        return _OPERAND
+    if isinstance(value, int):
+        return value
+    return _stable_hash(value)
+
+
+@functools.lru_cache(maxsize=4096)
+def _stable_hash(value) -> int:
+    data = value.encode("utf-8") if isinstance(value, str) else repr(value).encode("utf-8")
+    return zlib.crc32(data)
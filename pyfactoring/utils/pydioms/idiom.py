@@ -1,4 +1,5 @@
 import ast
+import copy
 from dataclasses import dataclass, field
 from pathlib import Path
 
@@ -82,6 +83,14 @@ class Idiom:
     def efficiency(self) -> float:
         return self.state.efficiency
 
+    def compact(self) -> "Idiom":
+        possible_idiom = copy.copy(self.state.possible_idiom)
+        possible_idiom.variant = None
+
+        idiom = Idiom(IdiomState(possible_idiom, []), self.id)
+        idiom.primary_ids = self.primary_ids.copy()
+        return idiom
+
 
 @dataclass
 class CodeBlockIdiom:
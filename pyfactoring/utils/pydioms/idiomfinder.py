@@ -1,3 +1,4 @@
+import dataclasses
 import math
 from collections import defaultdict
 
@@ -12,16 +13,28 @@ from pyfactoring.utils.pydioms.prefixtree import (
 )
 
 
+@dataclasses.dataclass
 class IdiomFinder:
-    min_idiom_count = pydioms_settings.count
-    min_idiom_length = pydioms_settings.length
+    min_idiom_length: int = None
+    verbose: bool = None
+    min_idiom_count: float = dataclasses.field(default=0, init=False)
 
-    @classmethod
-    def find_all(cls, tree: PrefixTree) -> dict[Idiom, list[CodeBlockIdiom]]:  # noqa: PLR0912
+    def __post_init__(self):
+        if self.min_idiom_length is None:
+            self.min_idiom_length = pydioms_settings.length
+        if self.verbose is None:
+            self.verbose = pydioms_settings.verbose
+
+    def find_all(self, tree: PrefixTree) -> dict[Idiom, list[CodeBlockIdiom]]:
         if not tree.id_to_freq:
             return {}
 
-        cls.min_idiom_count = math.log2(sum(freq for i, freq in tree.id_to_freq.items()))
+        # every search runs on its own copy, so a finder can be shared between threads
+        search = dataclasses.replace(self)
+        search.min_idiom_count = math.log2(sum(freq for i, freq in tree.id_to_freq.items()))
+        return search._search(tree)
+
+    def _search(self, tree: PrefixTree) -> dict[Idiom, list[CodeBlockIdiom]]:  # noqa: PLR0912
 
         idioms: dict[frozenset[int], Idiom] = {}
         rejected_idioms: set[frozenset[int]] = set()
@@ -34,7 +47,7 @@ class IdiomFinder:
         ids = {i for i, _ in enumerate(tree.id_to_freq)}
         total_trees = tree.trees_by_ids(ids)
         efficiency = (
-            cls._information_from_tree(tree)
+            self._information_from_tree(tree)
             - (tree.total_operators + total_trees + 1) * math.log2(AST_TOTAL_UNIQUE_OPERATORS)
             - (tree.total_operands + total_trees + 1) * math.log2(len(tree.operand_names) + 1)
         )
@@ -44,33 +57,33 @@ class IdiomFinder:
             if processed_variants[variant_id]:
                 continue
 
-            possible_idiom, _ = cls._expand_tree(tree, static_state, 0, variant_id)
+            possible_idiom, _ = self._expand_tree(tree, static_state, 0, variant_id)
             state = IdiomState(possible_idiom, tree.root.variant_by_id(variant_id).children.copy())
             states.append(state)
 
             while True:
-                unprocessed_idiom_id, state = cls._find_unprocessed_state(
+                unprocessed_idiom_id, state = self._find_unprocessed_state(
                     state, states, processed_variants,
                 )
 
                 if not states:
                     break
 
-                idiom_id = cls._find_idiom_in_tree(
+                idiom_id = self._find_idiom_in_tree(
                     tree, unprocessed_idiom_id, state, states, processed_variants,
                 )
                 processed_variants[idiom_id] = True
                 state = max(states, key=lambda st: st.efficiency)
 
-                if not (state.idiom_length < cls.min_idiom_length or state.efficiency < 0):
-                    cls._process_idiom(idiom_id, idioms, state, states, rejected_idioms, efficiencies)
+                if not (state.idiom_length < self.min_idiom_length or state.efficiency < 0):
+                    self._process_idiom(idiom_id, idioms, state, states, rejected_idioms, efficiencies)
 
         filtered_idioms: dict[frozenset[int], Idiom] = {}
         for _, idiom_state in efficiencies:
             if idiom_state in idioms:
                 filtered_idioms[idiom_state] = idioms[idiom_state]
 
-        if pydioms_settings.verbose:
+        if self.verbose:
             print(f"Rejected: {len(rejected_idioms)}")
             print(f"Unfiltered: {len(idioms)}")
             print(f"Filtered: {len(filtered_idioms)}")
@@ -107,15 +120,13 @@ class IdiomFinder:
 
         return idioms
 
-    @classmethod
-    def _information_from_tree(cls, tree: PrefixTree) -> float:
+    def _information_from_tree(self, tree: PrefixTree) -> float:
         return (
             tree.total_operators * math.log2(AST_TOTAL_UNIQUE_OPERATORS)
             + tree.total_operands * math.log2(len(tree.operand_names))
         )
 
-    @classmethod
-    def _efficiency_from_tree(cls, tree: PrefixTree, idiom: PossibleIdiom) -> float:
+    def _efficiency_from_tree(self, tree: PrefixTree, idiom: PossibleIdiom) -> float:
         total_operators = (
             tree.total_operators
             - idiom.total_trees * idiom.total_operators
@@ -132,14 +143,13 @@ class IdiomFinder:
             + 1
         )
 
-        return cls._information_from_tree(tree) - (
+        return self._information_from_tree(tree) - (
             total_operators * math.log2(AST_TOTAL_UNIQUE_OPERATORS)
             + total_operands * math.log2(len(tree.operand_names) + 1)
         )
 
-    @classmethod
     def _expand_tree(
-        cls,
+        self,
         tree: PrefixTree,
         state: IdiomState,
         selected_id: int,
@@ -160,20 +170,19 @@ class IdiomFinder:
         possible.total_operators = state.total_operators + int(count_as == CountingType.OPERATOR)
         possible.total_trees = tree.trees_by_ids(possible.ids)
 
-        possible.efficiency = cls._efficiency_from_tree(tree, possible)
+        possible.efficiency = self._efficiency_from_tree(tree, possible)
         possible.information = state.information - math.log2(possible.total_trees / state.total_trees)
 
         return possible, count_as
 
-    @classmethod
-    def _process_state(cls, tree: PrefixTree, state: IdiomState, idiom_id: int) -> PossibleIdiom:
+    def _process_state(self, tree: PrefixTree, state: IdiomState, idiom_id: int) -> PossibleIdiom:
         selected = PossibleIdiom()
         selected_no_len = PossibleIdiom()
 
         for i, _ in enumerate(state.edges):
-            possible, count_as = cls._expand_tree(tree, state, i, idiom_id)
+            possible, count_as = self._expand_tree(tree, state, i, idiom_id)
 
-            if possible.total_trees < cls.min_idiom_count or possible.total_trees == 1:
+            if possible.total_trees < self.min_idiom_count or possible.total_trees == 1:
                 continue
 
             if possible.total_trees == state.total_trees:
@@ -201,9 +210,8 @@ class IdiomFinder:
 
         return PossibleIdiom()
 
-    @classmethod
     def _find_unprocessed_state(
-        cls, state: IdiomState, states: list[IdiomState], processed_variants: list[bool],
+        self, state: IdiomState, states: list[IdiomState], processed_variants: list[bool],
     ) -> tuple[int, IdiomState]:
         while True:
             idiom_id = next(state)
@@ -216,9 +224,8 @@ class IdiomFinder:
                     return idiom_id, state
                 state = states[-1]
 
-    @classmethod
     def _find_idiom_in_tree(
-        cls,
+        self,
         tree: PrefixTree,
         idiom_id: int,
         state: IdiomState,
@@ -226,7 +233,7 @@ class IdiomFinder:
         processed_variants: list[bool],
     ) -> int:
         while True:
-            hypothesis = cls._process_state(tree, state, idiom_id)
+            hypothesis = self._process_state(tree, state, idiom_id)
             if hypothesis.selected is None:
                 return idiom_id
 
@@ -242,9 +249,8 @@ class IdiomFinder:
             while processed_variants[idiom_id]:
                 idiom_id = next(state)
 
-    @classmethod
     def _process_idiom(
-        cls,
+        self,
         idiom_id: int,
         idioms: dict[frozenset[int], Idiom],
         state: IdiomState,
@@ -259,11 +265,11 @@ class IdiomFinder:
 
         if idiom_state in idioms:
             idioms[idiom_state].primary_ids.add(idiom_id)
-            rejected_idioms.update(cls._reject(state, states, idioms, efficiencies))
+            rejected_idioms.update(self._reject(state, states, idioms, efficiencies))
             return
 
-        if state.total_trees < cls.min_idiom_count:
-            rejected_idioms.update(cls._reject(state, states, idioms, efficiencies))
+        if state.total_trees < self.min_idiom_count:
+            rejected_idioms.update(self._reject(state, states, idioms, efficiencies))
             return
 
         idioms[idiom_state] = Idiom(state, idiom_id)
@@ -274,9 +280,8 @@ class IdiomFinder:
             if efficiency is None or efficiency < state.efficiency:
                 efficiencies[i] = (state.efficiency, idiom_state)
 
-    @classmethod
     def _reject(
-        cls,
+        self,
         state: IdiomState,
         states: list[IdiomState],
         idioms: dict[frozenset[int], Idiom],
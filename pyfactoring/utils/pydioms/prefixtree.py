@@ -127,8 +127,8 @@ class PrefixTree:
         for filepath in self.filepaths:
             self.add_tree(filepath)
 
-    def add_tree(self, filepath: str | Path):
-        module = extract.module(filepath)
+    def add_tree(self, filepath: str | Path, source: str = None):
+        module = extract.module(filepath, source)
         if isinstance(filepath, str):
             self.add_ast_obj(module, Path(filepath))
         else:
@@ -1,4 +0,0 @@
-import os
-
-
-os.environ["PYTEST"] = "run"
@@ -0,0 +1,40 @@
+import shutil
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+
+_SAMPLES = Path("test/samples")
+
+
+@pytest.fixture
+def locations() -> Callable[[dict], list[tuple]]:
+    """Templates with the locations of their blocks, in the order of the groups"""
+
+    def _locations(clones: dict) -> list[tuple]:
+        return [
+            (
+                template,
+                [(b.file, b.lineno, b.end_lineno, b.vars, b.consts, b.class_name) for b in blocks],
+            )
+            for template, blocks in clones.items()
+        ]
+
+    return _locations
+
+
+@pytest.fixture
+def copy_samples() -> Callable[..., list[Path]]:
+    """Copies the samples matching the patterns into a dir, so the tests can change them"""
+
+    def _copy_samples(directory: Path, *patterns: str) -> list[Path]:
+        paths = []
+        for pattern in patterns:
+            for sample in sorted(_SAMPLES.glob(pattern)):
+                path = directory / sample.name
+                shutil.copyfile(sample, path)
+                paths.append(path)
+        return paths
+
+    return _copy_samples
@@ -150,3 +150,51 @@ def test_find_clones_in_chained_files_success(
             t += 1
 
     assert t == total
+
+
+_UNIQUE_SOURCE = """
+for item in items:
+    if item:
+        print(item)
+    total += 1
+    print(total)
+"""
+
+_CLONE_SOURCE = """
+while a > b:
+    if a:
+        a -= 1
+    else:
+        b += 1
+    print(a, b)
+"""
+
+
+def test_templatize_only_colliding_shapes_success(tmp_path: Path):
+    single = tmp_path / "single.py"
+    single.write_text(_CLONE_SOURCE + _UNIQUE_SOURCE + _CLONE_SOURCE.replace("a", "x"))
+    chained = tmp_path / "chained.py"
+    chained.write_text(_CLONE_SOURCE.replace("b", "y"))
+
+    finder = CloneFinder()
+    clones = finder.find_all(single)
+
+    assert len(clones) == 1
+    assert finder.total_candidates == 3
+    assert finder.templated_candidates == 2
+
+    finder = CloneFinder()
+    clones = finder.chained_find_all((single, chained))
+
+    assert len(clones) == 1
+    assert sum(len(blocks) for blocks in clones.values()) == 3
+    assert finder.total_candidates == 4
+    assert finder.templated_candidates == 3
+
+
+def test_find_all_skips_undecodable_file_success(tmp_path: Path, capsys: pytest.CaptureFixture):
+    path = tmp_path / "latin.py"
+    path.write_bytes((_CLONE_SOURCE * 2).replace("print", "# é\nprint").encode("latin-1"))
+
+    assert CloneFinder(count=2, length=1).find_all(path) == {}
+    assert f"{path}:0: " in capsys.readouterr().out
@@ -0,0 +1,88 @@
+import ast
+from pathlib import Path
+
+import pytest
+
+from pyfactoring import CloneFinder
+from pyfactoring.utils.pyclones import hasher
+
+
+def _root_hash(source: str) -> int:
+    module = ast.parse(source)
+    _, hashes = hasher.hash_tree(module)
+    return hashes[id(module.body[0])]
+
+
+@pytest.mark.parametrize(
+    ("first", "second"),
+    (
+        (
+            "if a > b:\n    x = 10\n    print(x)",
+            "if c > d:\n    y = 500\n    print(y)",
+        ),
+        (
+            "for i in range(10):\n    total += i",
+            "for j in range(20):\n    acc += j",
+        ),
+        (
+            "def f(a, b):\n    return a.value + b",
+            "def g(x, y):\n    return x.value + y",
+        ),
+        (
+            "if a:\n    x = None\n    print(x)",
+            "if b:\n    y = 500\n    print(y)",
+        ),
+        (
+            "match a:\n    case True:\n        print(a)",
+            "match b:\n    case None:\n        print(b)",
+        ),
+    ),
+)
+def test_equal_hash_for_renamed_nodes_success(first: str, second: str):
+    assert _root_hash(first) == _root_hash(second)
+
+
+@pytest.mark.parametrize(
+    ("first", "second"),
+    (
+        (
+            "if a > b:\n    print(a)",
+            "if a < b:\n    print(a)",
+        ),
+        (
+            "if a > b:\n    print(a)",
+            "if a > b:\n    log(a)",
+        ),
+        (
+            "def f(a):\n    return a.value",
+            "def f(a):\n    return a.other",
+        ),
+        (
+            "for i in data:\n    print(i)",
+            "for i in data:\n    print(i)\nelse:\n    print(i)",
+        ),
+    ),
+)
+def test_different_hash_for_other_structure_success(first: str, second: str):
+    assert _root_hash(first) != _root_hash(second)
+
+
+def test_hash_tree_covers_all_nodes_success():
+    module = ast.parse("while x:\n    if y:\n        break")
+    nodes, hashes = hasher.hash_tree(module)
+
+    assert nodes == list(ast.walk(module))
+    assert set(hashes) == {id(node) for node in nodes}
+
+
+def test_match_singletons_are_clones_success(tmp_path: Path):
+    path = tmp_path / "singletons.py"
+    path.write_text(
+        "def first(a):\n    match a:\n        case True:\n            print(a)\n\n\n"
+        "def second(b):\n    match b:\n        case None:\n            print(b)\n",
+        encoding="utf-8",
+    )
+
+    # the functions and the matches inside them are reported
+    clones = CloneFinder(count=2, length=2).find_all(path)
+    assert sorted(block.lineno for blocks in clones.values() for block in blocks) == [1, 2, 7, 8]
@@ -0,0 +1,147 @@
+import shutil
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from pyfactoring import CloneFinder
+from pyfactoring.core import analysis
+
+
+_PATHS = [
+    Path("test/samples/chained/chained_1.py"),
+    Path("test/samples/chained/chained_2.py"),
+    Path("test/samples/chained/chained_3.py"),
+    Path("test/samples/file_containing_clone.py"),
+    Path("test/samples/class.py"),
+]
+
+
+@pytest.mark.parametrize("jobs", (1, 2))
+def test_single_clone_analysis_success(jobs: int, locations: Callable):
+    finder = CloneFinder()
+    expected = [locations(clones) for path in _PATHS if (clones := finder.find_all(path))]
+
+    with analysis.process_pool(jobs) as executor:
+        single = analysis.clone_analysis(_PATHS, executor=executor)
+
+    assert [locations(clones) for clones in single] == expected
+
+
+@pytest.mark.parametrize("jobs", (1, 2))
+def test_chained_clone_analysis_success(jobs: int, locations: Callable):
+    expected = locations(CloneFinder().chained_find_all(_PATHS))
+
+    with analysis.process_pool(jobs) as executor:
+        chained = analysis.clone_analysis(_PATHS, is_chained=True, executor=executor)
+
+    assert locations(chained) == expected
+
+
+@pytest.mark.parametrize(("count", "length"), ((2, 5), (3, 5), (2, 10), (4, 2)))
+def test_filter_clone_spans_success(
+        count: int, length: int, locations: Callable, monkeypatch: pytest.MonkeyPatch,
+):
+    spans = dict(zip(_PATHS, analysis.clone_spans(_PATHS)))
+    monkeypatch.setattr(analysis.pyclones_settings, "count", count)
+    monkeypatch.setattr(analysis.pyclones_settings, "length", length)
+
+    single = analysis.clone_analysis(_PATHS)
+
+    assert [locations(clones) for clones in analysis.filter_clones(spans)] == [
+        locations(clones) for clones in single
+    ]
+
+
+@pytest.mark.parametrize("is_chained", (False, True))
+def test_clone_index_updates_changed_files_success(
+        is_chained: bool, tmp_path: Path, locations: Callable,
+):
+    def _all_locations(clones: list | dict) -> list:
+        return [locations(clones)] if is_chained else [locations(c) for c in clones]
+
+    paths = []
+    for sample in _PATHS:
+        path = tmp_path / sample.name
+        shutil.copyfile(sample, path)
+        paths.append(path)
+
+    clone_index = analysis.CloneIndex(is_chained=is_chained)
+    clone_index.update(paths)
+
+    expected = analysis.clone_analysis(paths, is_chained=is_chained)
+    assert _all_locations(clone_index.clones()) == _all_locations(expected)
+
+    source = paths[1].read_text(encoding="utf-8")
+    clone_index.update(paths[:4], changed={paths[0]: source})
+    paths[0].write_text(source, encoding="utf-8")
+
+    expected = analysis.clone_analysis(paths[:4], is_chained=is_chained)
+    assert _all_locations(clone_index.clones()) == _all_locations(expected)
+
+
+def test_cancelled_clone_index_update_is_completed_by_next_success(locations: Callable):
+    clone_index = analysis.CloneIndex(is_chained=True)
+    assert not clone_index.update(_PATHS, is_cancelled=lambda: True)
+    assert clone_index.update(_PATHS, is_cancelled=lambda: False)
+
+    expected = analysis.clone_analysis(_PATHS, is_chained=True)
+    assert locations(clone_index.clones()) == locations(expected)
+
+
+@pytest.mark.parametrize("is_chained", (False, True))
+def test_analysis_sessions_with_own_settings_success(
+        is_chained: bool, locations: Callable, monkeypatch: pytest.MonkeyPatch,
+):
+    def _all_locations(clones: list | dict) -> list:
+        return [locations(clones)] if is_chained else [locations(c) for c in clones]
+
+    short = analysis.AnalysisSession(analysis.PyclonesSettings(count=2, length=2))
+    long = analysis.AnalysisSession(analysis.PyclonesSettings(count=2, length=8))
+
+    expected = {}
+    for length in (2, 8):
+        monkeypatch.setattr(analysis.pyclones_settings, "length", length)
+        expected[length] = _all_locations(analysis.clone_analysis(_PATHS, is_chained=is_chained))
+    assert expected[2] != expected[8]
+
+    # the global settings do not take part in the analysis of a session
+    for _ in range(2):
+        assert _all_locations(short.clones(_PATHS, is_chained=is_chained)) == expected[2]
+        assert _all_locations(long.clones(_PATHS, is_chained=is_chained)) == expected[8]
+
+
+def test_analysis_session_shared_between_threads_success(locations: Callable):
+    session = analysis.AnalysisSession()
+    expected = [locations(clones) for clones in session.clones(_PATHS)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: session.clones(_PATHS[::-1]), range(8)))
+
+    assert all([locations(clones) for clones in result[::-1]] == expected for result in results)
+
+
+def test_analysis_session_analyzes_given_sources_success():
+    session = analysis.AnalysisSession()
+    source = _PATHS[3].read_text(encoding="utf-8")
+
+    assert session.clones([_PATHS[0]], sources={_PATHS[0]: source})
+    assert session.clones([_PATHS[0]], sources={_PATHS[0]: "pass\n"}) == []
+
+
+def test_analysis_session_forgets_files_success(tmp_path: Path):
+    session = analysis.AnalysisSession()
+    removed = tmp_path / "removed.py"
+    shutil.copyfile(_PATHS[3], removed)
+    session.clones([*_PATHS, removed])
+    session.clones([*_PATHS, removed], is_chained=True)
+
+    session.forget([_PATHS[0]])
+    assert _PATHS[0] not in session._clones
+    assert "clones" not in session._chains
+
+    removed.unlink()
+    session.forget()
+    assert set(session._clones) == set(_PATHS[1:])
+    assert set(session._shapes) == set(_PATHS[1:])
@@ -0,0 +1,94 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from benchmarks import __main__ as cli
+from benchmarks import history, phases, stdlib
+from benchmarks.timing import Timing, measure
+
+
+def test_timing_statistics_success():
+    timing = Timing((0.5, 0.1, 0.3, 0.2, 0.4))
+    assert timing.median == 0.3
+    assert timing.p95 == 0.5
+    assert Timing.from_dict(timing.to_dict()) == timing
+
+
+def test_measure_runs_setup_before_every_run_success():
+    states = []
+    timing = measure(states.append, lambda: len(states), warmup=2, repeat=3)
+
+    assert len(timing.runs) == 3
+    assert states == [0, 1, 2, 3, 4]
+
+    with pytest.raises(ValueError):
+        measure(states.append, repeat=0)
+
+
+def test_compare_flags_regressions_success():
+    base = {"phases": {"parse": Timing((1.0, 1.0)).to_dict(), "hash": Timing((0.0001,)).to_dict()}}
+    head = {"phases": {"parse": Timing((1.5, 1.5)).to_dict(), "hash": Timing((0.0002,)).to_dict()}}
+
+    changes = {change.phase: change for change in history.compare(base, head)}
+    assert changes["parse"].is_regression()
+    assert not changes["parse"].is_regression(threshold=0.6)
+    # twice as slow, but by less than a millisecond
+    assert not changes["hash"].is_regression()
+
+
+def test_find_run_by_index_or_label_success():
+    records = [{"label": "base"}, {"label": None}, {"label": "base", "last": True}]
+    assert history.find(records, "-2") is records[1]
+    assert history.find(records, "base") is records[2]
+
+    with pytest.raises(LookupError):
+        history.find(records, "3")
+    with pytest.raises(LookupError):
+        history.find(records, "head")
+
+
+def test_corpus_skips_unreadable_files_success(tmp_path: Path):
+    (tmp_path / "module.py").write_text("x = 1\n", encoding="utf-8")
+    (tmp_path / "broken.py").write_text("def broken(:\n", encoding="utf-8")
+    (tmp_path / "latin.py").write_bytes("x = 'é'\n".encode("latin-1"))
+
+    corpus = phases.Corpus([str(tmp_path)])
+    assert [path.name for path in corpus.paths] == ["module.py"]
+
+
+def test_run_and_compare_success(tmp_path: Path, capsys: pytest.CaptureFixture):
+    history_path = tmp_path / "history.json"
+    argv = ["run", "test/samples/function", "--phase", "parse", "templatize", "format"]
+    argv += ["--repeat", "1", "--warmup", "0", "--history", str(history_path)]
+
+    assert cli.main([*argv, "--label", "base"]) == 0
+    assert cli.main(argv) == 0
+
+    records = json.loads(history_path.read_text(encoding="utf-8"))
+    assert [record["label"] for record in records] == ["base", None]
+    assert set(records[0]["phases"]) == {"parse", "templatize", "format"}
+    assert records[0]["corpus"]["files"] == 3
+
+    capsys.readouterr()
+    assert cli.main(["compare", "base", "-1", "--threshold", "100", "--history", str(history_path)]) == 0
+    assert "Regressions: 0" in capsys.readouterr().out
+
+
+def test_stdlib_runs_cold_and_warm_checks_success(tmp_path: Path, capsys: pytest.CaptureFixture):
+    history_path = tmp_path / "history.json"
+    argv = ["stdlib", "test/samples/function", "--scenario", "single", "chained+idioms"]
+    assert cli.main([*argv, "--history", str(history_path)]) == 0
+    assert "Corpus: 3 files" in capsys.readouterr().out
+
+    record = history.load(history_path)[-1]
+    assert set(record["stdlib"]) == {"single", "chained+idioms"}
+    assert set(record["phases"]) == {
+        "stdlib-single-cold", "stdlib-single-warm", "stdlib-chained+idioms-cold", "stdlib-chained+idioms-warm",
+    }
+    assert all(len(result["cold"]["runs"]) == 1 for result in record["stdlib"].values())
+
+
+def test_stdlib_fails_on_check_errors_success(tmp_path: Path):
+    with pytest.raises(RuntimeError, match="could not be read"):
+        stdlib.run_scenario([str(tmp_path / "missing")], "single")
@@ -0,0 +1,120 @@
+import hashlib
+import pickle
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from pyfactoring import CloneFinder
+from pyfactoring.core import analysis, cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    return tmp_path
+
+
+_SAMPLES = ("file_containing_clone.py", "class.py", "empty.py")
+
+
+def _md5(path: Path) -> bytes:
+    # hash of the files in the caches of the previous versions
+    return hashlib.md5(path.read_bytes()).digest()
+
+
+def test_check_cache_retrieve_success(cache_dir: Path, copy_samples: Callable):
+    paths = copy_samples(cache_dir, *_SAMPLES)
+    clones = [clones for path in paths if (clones := CloneFinder().find_all(path))]
+
+    assert cache.check_retrieve(paths) == ([], paths)
+
+    cache.check_cache(paths, clones)
+    cached, uncached = cache.check_retrieve(paths)
+
+    assert uncached == []
+    assert [list(c) for c in cached] == [list(c) for c in clones]
+
+    paths[1].write_text("# Nothing\n", encoding="utf-8")
+    cached, uncached = cache.check_retrieve(paths)
+
+    assert uncached == [paths[1]]
+    assert [list(c) for c in cached] == [list(clones[0])]
+
+
+def test_check_retrieve_drops_legacy_pickles_success(cache_dir: Path, copy_samples: Callable):
+    paths = copy_samples(cache_dir, *_SAMPLES)
+    for kind in ("clones", "idioms"):
+        with open(cache_dir / f".check.{kind}", "wb") as cache_file:
+            pickle.dump([(str(paths[0]), _md5(paths[0]), {})], cache_file)
+
+    # their results were filtered under unknown settings, so the files are analyzed again
+    assert cache.check_retrieve(paths) == ([], paths)
+    assert not (cache_dir / ".check.clones").exists()
+    assert not (cache_dir / ".check.idioms").exists()
+
+
+def test_is_modified_by_stamp_success(cache_dir: Path, copy_samples: Callable):
+    path = copy_samples(cache_dir, *_SAMPLES)[0]
+    stamp, filehash = cache.stamp_file(path), cache.hash_file(path)
+
+    assert not cache.is_modified(path, stamp, filehash)
+    assert not cache.is_modified(path, stamp._replace(mtime_ns=0), filehash)
+    assert cache.is_modified(path, None, b"")
+
+    path.write_text("# Nothing\n", encoding="utf-8")
+
+    assert cache.is_modified(path, stamp._replace(mtime_ns=0), filehash)
+
+
+def test_hash_file_keeps_last_stamp_success(cache_dir: Path, copy_samples: Callable):
+    path = copy_samples(cache_dir, *_SAMPLES)[0]
+    filehash = cache.hash_file(path)
+
+    path.write_text("# Nothing\n", encoding="utf-8")
+
+    assert cache.hash_file(path) != filehash
+    assert cache._file_hashes[str(path)] == (cache.stamp_file(path), cache.hash_file(path))
+
+
+def test_format_retrieve_success(cache_dir: Path, copy_samples: Callable):
+    paths = copy_samples(cache_dir, *_SAMPLES)
+    cache.format_cache(paths)
+
+    assert cache.format_retrieve(paths) == []
+
+    # hashes of the previous versions without stamps are still valid
+    with open(cache_dir / ".format.single", "wb") as cache_file:
+        pickle.dump({path: _md5(path) for path in paths}, cache_file)
+
+    assert cache.format_retrieve(paths) == []
+
+    paths[2].write_text("# Nothing\n", encoding="utf-8")
+
+    assert cache.format_retrieve(paths) == [paths[2]]
+    assert cache.format_retrieve(paths, is_chained=True) == paths
+
+
+def test_clone_retrieve_invalidated_by_fingerprint_success(
+        cache_dir: Path, copy_samples: Callable, monkeypatch: pytest.MonkeyPatch,
+):
+    paths = copy_samples(cache_dir, *_SAMPLES)
+    cache.clone_cache({path: ({}, [], (0, 0)) for path in paths})
+
+    monkeypatch.setattr(cache.pyclones_settings, "count", 5)
+    cached, uncached = cache.clone_retrieve(paths)
+
+    assert list(cached) == paths
+    assert uncached == []
+
+    monkeypatch.setattr(cache.pyclones_settings, "template_mode", "tree")
+
+    assert cache.clone_retrieve(paths) == ({}, paths)
+
+
+def test_settings_fingerprint_follows_analysis_nodes_success(monkeypatch: pytest.MonkeyPatch):
+    fingerprint = cache.settings_fingerprint()
+    template_mode, nodes = analysis.normalization()
+    monkeypatch.setattr(analysis, "normalization", lambda config=None: (template_mode, nodes[:1]))
+
+    assert cache.settings_fingerprint() != fingerprint
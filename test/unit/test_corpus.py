@@ -0,0 +1,48 @@
+from pathlib import Path
+
+from benchmarks import corpus
+from pyfactoring.utils.pyclones import CloneFinder
+
+
+def _read_all(directory: Path) -> dict[str, str]:
+    return {path.name: path.read_text(encoding="utf-8") for path in sorted(directory.iterdir())}
+
+
+def test_generate_is_deterministic_success(tmp_path: Path):
+    spec = corpus.CorpusSpec(modules=4, fragments=5, seed=7)
+    groups = corpus.generate(tmp_path / "first", spec)
+    corpus.generate(tmp_path / "second", spec)
+
+    assert _read_all(tmp_path / "first") == _read_all(tmp_path / "second")
+    assert corpus.load_ground_truth(tmp_path / "first") == groups
+
+
+def test_planted_groups_are_found_exactly_success(tmp_path: Path):
+    spec = corpus.CorpusSpec(modules=6, fragments=8, depth=3, clone_density=0.5, seed=3)
+    groups = corpus.generate(tmp_path, spec)
+    assert {group.clone_type for group in groups} == {1, 2}
+
+    paths = sorted(tmp_path.glob("*.py"))
+    clones = CloneFinder(count=2, length=corpus.MAX_LENGTH).chained_find_all(paths)
+
+    verification = corpus.verify(tmp_path, groups, clones)
+    assert verification.is_exact, verification
+
+
+def test_verify_reports_missed_groups_success(tmp_path: Path):
+    groups = corpus.generate(tmp_path, corpus.CorpusSpec(modules=3, fragments=4, seed=1))
+
+    verification = corpus.verify(tmp_path, groups, {})
+    assert verification.missed == groups
+    assert not verification.unexpected
+
+
+def test_shallow_fragments_are_padded_success(tmp_path: Path):
+    groups = corpus.generate(tmp_path, corpus.CorpusSpec(modules=4, fragments=6, depth=0, seed=3))
+    assert all(
+        block.end_lineno - block.lineno >= corpus.MAX_LENGTH for group in groups for block in group.blocks
+    )
+
+    paths = sorted(tmp_path.glob("*.py"))
+    clones = CloneFinder(count=2, length=corpus.MAX_LENGTH).chained_find_all(paths)
+    assert corpus.verify(tmp_path, groups, clones).is_exact
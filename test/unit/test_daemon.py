@@ -0,0 +1,108 @@
+import contextlib
+import io
+import json
+import shutil
+import socket
+import threading
+from pathlib import Path
+
+import pytest
+
+from pyfactoring import settings
+from pyfactoring.arguments import parse_args
+from pyfactoring.core import client, daemon
+from pyfactoring.core.action_check import action_check
+
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets are not supported")
+
+
+@pytest.fixture
+def socket_path(tmp_path: Path):
+    sections = settings.sections()
+    path = tmp_path / "daemon.sock"
+    server = threading.Thread(target=daemon.serve, args=(path,))
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.start()
+        while client.request({"command": "ping"}, path) is None:
+            server.join(0.01)
+
+    yield path
+
+    client.request({"command": "stop"}, path)
+    server.join()
+    settings.install(sections)
+
+
+def _local_check(argv: list[str]) -> str:
+    output = io.StringIO()
+    settings.build(parse_args(argv))
+    with contextlib.redirect_stdout(output):
+        action_check()
+    return output.getvalue()
+
+
+def test_daemon_answers_check_success(socket_path: Path, tmp_path: Path):
+    project = tmp_path / "project"
+    shutil.copytree("test/samples/chained", project)
+    argv = ["--pc-length", "3", "check", str(project)]
+
+    first, _ = client.request_check(argv, socket_path)
+    assert first == _local_check([*argv, "--no-cache"])
+    assert "clone found" in first
+
+    # the warm state is refreshed for the changed files only
+    (project / "chained_2.py").write_text("pass\n", encoding="utf-8")
+    assert client.request_check(argv, socket_path)[0] == _local_check([*argv, "--no-cache"])
+
+
+def test_daemon_reports_invalid_settings_success(socket_path: Path):
+    output, _ = client.request_check(["--pc-count", "0", "check"], socket_path)
+    assert "greater than or equal to 1" in output
+    assert client.request({"command": "ping"}, socket_path) == {"output": ""}
+
+
+def test_client_without_daemon_success(tmp_path: Path):
+    assert client.request_check(["check"], tmp_path / "daemon.sock") is None
+
+
+def test_daemon_survives_invalid_requests_success(socket_path: Path):
+    def _send(line: bytes, *, wait: bool = True) -> dict | None:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(str(socket_path))
+            connection.sendall(line)
+            if not wait:
+                return None
+            with connection.makefile("rb") as stream:
+                return client.receive(stream)
+
+    assert "Invalid request" in _send(b"not json\n")["errors"]
+    assert "Invalid request" in _send(b"[1, 2]\n")["errors"]
+    # the client is gone before the response
+    _send(json.dumps({"command": "check", "argv": ["check", "test/samples"]}).encode() + b"\n", wait=False)
+
+    assert client.request({"command": "ping"}, socket_path) == {"output": ""}
+
+
+def test_daemon_separates_stdout_and_stderr_success(socket_path: Path):
+    argv = ["check", "test/samples/chained", "--verbose", "--output-format", "jsonl"]
+    output, errors = client.request_check(argv, socket_path)
+
+    assert [json.loads(line) for line in output.splitlines()]
+    assert "Files: 3" in errors
+
+
+def test_daemon_forgets_deleted_files_success(tmp_path: Path):
+    sections = settings.sections()
+    project = tmp_path / "project"
+    shutil.copytree("test/samples/chained", project)
+    argv = ["--pc-length", "3", "check", str(project), "--no-cache"]
+
+    server = daemon.Daemon()
+    server.handle({"command": "check", "argv": argv})
+    (project / "chained_2.py").unlink()
+    server.handle({"command": "check", "argv": argv})
+    settings.install(sections)
+
+    (session,) = server._sessions.values()
+    assert sorted(path.name for path in session._clones) == ["chained_1.py", "chained_3.py"]
@@ -0,0 +1,89 @@
+import ast
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pyfactoring import CloneFinder
+from pyfactoring.core import cache
+from pyfactoring.core.action_format import action_format, format_files
+from pyfactoring.settings import common_settings
+
+
+_ROOT = Path(__file__).parents[2]
+
+
+@pytest.mark.parametrize("sample", ("file_containing_clone.py", "class.py", "chained/chained_2.py"))
+def test_format_files_removes_clones_success(sample: str, tmp_path: Path):
+    path = tmp_path / Path(sample).name
+    shutil.copyfile(Path("test/samples") / sample, path)
+
+    original = path.read_text(encoding="utf-8")
+    source = "".join(format_files([path])[path])
+
+    assert path.read_text(encoding="utf-8") == original
+    assert not CloneFinder().find_all(path, source=source)
+    ast.parse(source)
+
+
+def test_format_diff_writes_nothing_success(
+        tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture,
+):
+    path = tmp_path / "file_containing_clone.py"
+    shutil.copyfile(Path("test/samples/file_containing_clone.py"), path)
+    original = path.read_text(encoding="utf-8")
+
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(common_settings, "paths", [str(path)])
+    monkeypatch.setattr(common_settings, "chain", [])
+    monkeypatch.setattr(common_settings, "no_cache", True)
+    monkeypatch.setattr(common_settings, "diff", True)
+    action_format()
+
+    output = capsys.readouterr().out
+    assert output.startswith(f"--- {path}\n+++ {path}\n")
+    assert "+def file_containing_clone_func_0(" in output
+    assert path.read_text(encoding="utf-8") == original
+    assert not (tmp_path / "cache").exists()
+
+
+def test_format_diff_marks_missing_newline_success(
+        tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture,
+):
+    path = tmp_path / "file_containing_clone.py"
+    source = Path("test/samples/file_containing_clone.py").read_text(encoding="utf-8")
+    path.write_text(source.rstrip("\n"), encoding="utf-8")
+    (tmp_path / "broken.py").write_text("def broken(:\n", encoding="utf-8")
+
+    monkeypatch.setattr(common_settings, "paths", [str(tmp_path)])
+    monkeypatch.setattr(common_settings, "chain", [])
+    monkeypatch.setattr(common_settings, "no_cache", True)
+    monkeypatch.setattr(common_settings, "diff", True)
+    action_format()
+
+    captured = capsys.readouterr()
+    assert captured.out.endswith("\n ...\n\\ No newline at end of file\n")
+    assert "broken.py" not in captured.out
+    assert "broken.py:0: " in captured.err
+
+
+def test_format_diff_leaves_working_dir_unchanged_success(tmp_path: Path):
+    shutil.copyfile(Path("test/samples/file_containing_clone.py"), tmp_path / "module.py")
+    before = {path: path.read_bytes() for path in tmp_path.rglob("*")}
+
+    python_path = os.pathsep.join(filter(None, (str(_ROOT), os.environ.get("PYTHONPATH"))))
+    env = dict(os.environ, PYTHONPATH=python_path)
+    result = subprocess.run(
+        [sys.executable, "-m", "pyfactoring.main", "format", "--diff", "."],
+        capture_output=True,
+        text=True,
+        cwd=tmp_path,
+        env=env,
+        check=True,
+    )
+
+    assert "+def module_func_0(" in result.stdout
+    assert {path: path.read_bytes() for path in tmp_path.rglob("*")} == before
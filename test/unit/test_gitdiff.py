@@ -0,0 +1,102 @@
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pyfactoring import settings
+from pyfactoring.core import cache
+from pyfactoring.core.action_check import action_check
+from pyfactoring.exceptions import GitError
+from pyfactoring.utils.gitdiff import changed_lines, is_changed
+
+
+_SAMPLE = Path("test/samples/file_containing_clone.py").absolute()
+
+
+def _git(repo: Path, *args: str):
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "module.py").write_text("a = 1\nb = 2\nc = 3\nd = 4\ne = 5\n", encoding="utf-8")
+    (tmp_path / "removed.py").write_text("pass\n", encoding="utf-8")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "initial")
+    return tmp_path
+
+
+def test_changed_lines_success(repo: Path):
+    assert changed_lines("HEAD", str(repo)) == {}
+
+    (repo / "module.py").write_text("a = 1\nb = 20\nc = 3\ne = 5\nf = 6\n", encoding="utf-8")
+    (repo / "removed.py").unlink()
+    (repo / "added.py").write_text("pass\n", encoding="utf-8")
+
+    changes = changed_lines("HEAD", str(repo))
+    assert changes == {
+        repo / "module.py": [(2, 2), (4, 3), (5, 5)],
+        repo / "added.py": [(1, sys.maxsize)],
+    }
+
+    ranges = changes[repo / "module.py"]
+    assert is_changed(ranges, 1, 2)
+    assert is_changed(ranges, 3, 4)
+    assert not is_changed(ranges, 3, 3)
+    assert not is_changed(ranges, 4, 4)
+
+
+@pytest.mark.parametrize("name", ("my module.py", 'say "hi".py', "tab\tname.py"))
+def test_changed_lines_of_unusual_names_success(repo: Path, name: str):
+    (repo / name).write_text("a = 1\nb = 2\n", encoding="utf-8")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "unusual name")
+
+    (repo / name).write_text("a = 1\nb = 20\n", encoding="utf-8")
+    (repo / "module.py").write_text("a = 10\nb = 2\nc = 3\nd = 4\ne = 5\n", encoding="utf-8")
+    assert changed_lines("HEAD", str(repo)) == {repo / name: [(2, 2)], repo / "module.py": [(1, 1)]}
+
+
+def test_changed_lines_unknown_revision_failure(repo: Path):
+    with pytest.raises(GitError):
+        changed_lines("unknown-revision", str(repo))
+
+
+def test_check_reports_only_changed_groups_success(
+        repo: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture,
+):
+    shutil.copyfile(_SAMPLE, repo / "module.py")
+    _git(repo, "commit", "-q", "-am", "clones")
+
+    monkeypatch.chdir(repo)
+    cache.create_dir()
+    monkeypatch.setattr(settings.common_settings, "paths", ["."])
+    monkeypatch.setattr(settings.common_settings, "chain", ["."])
+    monkeypatch.setattr(settings.common_settings, "no_cache", False)
+    monkeypatch.setattr(settings.common_settings, "changed_since", "HEAD")
+
+    action_check()
+    assert "clone found" not in capsys.readouterr().out
+
+    # the unchanged file is reported along with the new copy of its code
+    shutil.copyfile(_SAMPLE, repo / "copy.py")
+    action_check()
+    output = capsys.readouterr().out
+    assert "copy.py" in output
+    assert "module.py" in output
+
+    _git(repo, "add", "copy.py")
+    _git(repo, "commit", "-q", "-m", "copy")
+    action_check()
+    assert "clone found" not in capsys.readouterr().out
+
+    monkeypatch.setattr(settings.common_settings, "changed_since", "unknown-revision")
+    action_check()
+    assert "Changes cannot be read from git" in capsys.readouterr().out
@@ -0,0 +1,76 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from pyfactoring.utils import gitignore
+from pyfactoring.utils.path import collect_filepaths
+
+
+_FILES = (
+    "main.py",
+    "service_pb2.py",
+    "build_tools/setup.py",
+    "generated/code.py",
+    "pkg/module.py",
+    "pkg/keep_pb2.py",
+    "pkg/local.py",
+    "pkg/sub/local.py",
+)
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    for file in _FILES:
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).write_text("pass\n", encoding="utf-8")
+
+    (tmp_path / ".gitignore").write_text("# generated\n*_pb2.py\ngenerated/\n", encoding="utf-8")
+    (tmp_path / "pkg" / ".gitignore").write_text("!keep_pb2.py\n/local.py\n", encoding="utf-8")
+    return tmp_path
+
+
+def _relative(paths: list[Path], root: Path) -> set[str]:
+    return {path.relative_to(root).as_posix() for path in paths}
+
+
+_EXPECTED = {"main.py", "build_tools/setup.py", "pkg/module.py", "pkg/keep_pb2.py", "pkg/sub/local.py"}
+
+
+@pytest.mark.parametrize(
+    ("line", "path", "is_dir", "expected"),
+    (
+        ("*.py", "a/b.py", False, True),
+        ("build/", "build", False, None),
+        ("build/", "src/build", True, True),
+        ("/build", "src/build", True, None),
+        ("docs/*.py", "docs/conf.py", False, True),
+        ("docs/*.py", "docs/api/conf.py", False, None),
+        ("**/fixtures", "test/unit/fixtures", True, True),
+        ("!keep.py", "keep.py", False, False),
+        ("\\#file.py", "#file.py", False, True),
+    ),
+)
+def test_ignore_rules_match_success(line: str, path: str, is_dir: bool, expected: bool | None):
+    rules = gitignore.IgnoreRules("/base", [line])
+    assert rules.match(f"{rules.base}/{path}", is_dir) is expected
+
+
+def test_collect_filepaths_respects_gitignore_success(tree: Path):
+    collected = collect_filepaths(str(tree), respect_gitignore=True)
+
+    assert _relative(collected, tree) == _EXPECTED
+    assert len(collect_filepaths(str(tree))) == len(_FILES)
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_collect_filepaths_from_git_index_success(tree: Path):
+    subprocess.run(["git", "init", "-q", str(tree)], check=True)
+    (tree / "untracked.py").write_text("pass\n", encoding="utf-8")
+
+    assert gitignore.git_files(str(tree)) is not None
+
+    collected = collect_filepaths(str(tree), respect_gitignore=True)
+
+    assert _relative(collected, tree) == _EXPECTED | {"untracked.py"}
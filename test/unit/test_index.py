@@ -0,0 +1,59 @@
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+from pyfactoring import CloneFinder
+from pyfactoring.core.index import TemplateIndex
+
+
+def test_index_matches_chained_find_all_success(
+        tmp_path: Path, copy_samples: Callable, locations: Callable,
+):
+    paths = copy_samples(tmp_path, "chained/*.py")
+
+    with TemplateIndex(tmp_path / "index.db") as index:
+        assert index.update(paths) == paths
+        assert index.update(paths) == []
+
+        expected = CloneFinder().chained_find_all(paths)
+        assert locations(index.clones(paths)) == locations(expected)
+
+        expected = CloneFinder().chained_find_all(paths[:2])
+        assert locations(index.clones(paths[:2])) == locations(expected)
+
+
+def test_index_updates_only_changed_files_success(
+        tmp_path: Path, copy_samples: Callable, locations: Callable,
+):
+    paths = copy_samples(tmp_path, "chained/*.py")
+
+    with TemplateIndex(tmp_path / "index.db") as index:
+        index.update(paths)
+
+        paths[0].write_text("# Nothing\n", encoding="utf-8")
+        assert index.update(paths) == [paths[0]]
+
+        expected = CloneFinder().chained_find_all(paths)
+        assert locations(index.clones(paths)) == locations(expected)
+
+    with TemplateIndex(tmp_path / "index.db") as index:
+        assert index.update(paths) == []
+        index.remove(paths[1:])
+        assert index.update(paths) == paths[1:]
+
+
+def test_index_drops_deleted_files_success(tmp_path: Path, copy_samples: Callable):
+    paths = copy_samples(tmp_path, "chained/*.py")
+
+    with TemplateIndex(tmp_path / "index.db") as index:
+        index.update(paths)
+        renamed = paths[0].rename(tmp_path / "renamed.py")
+
+        assert index.update([renamed, *paths[1:]]) == [renamed]
+        indexed = index._connection.execute("SELECT DISTINCT path FROM blocks").fetchall()
+        assert sorted(path for path, in indexed) == sorted(str(path) for path in (renamed, *paths[1:]))
+
+    # a file touched without changes is only restamped
+    os.utime(renamed, ns=(0, 0))
+    with TemplateIndex(tmp_path / "index.db") as index:
+        assert index.update([renamed, *paths[1:]]) == []
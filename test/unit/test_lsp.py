@@ -0,0 +1,113 @@
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pyfactoring.core.lsp import read_message, uri_to_path, write_message
+
+
+_ROOT = Path(__file__).parents[2]
+
+
+class _Client:
+    def __init__(self, process: subprocess.Popen):
+        self.process = process
+        self._id = 0
+
+    def request(self, method: str, params: dict) -> dict:
+        self._id += 1
+        message = {"jsonrpc": "2.0", "id": self._id, "method": method, "params": params}
+        write_message(self.process.stdin, message)
+        while "id" not in (message := read_message(self.process.stdout)):
+            pass
+        return message
+
+    def notify(self, method: str, params: dict):
+        write_message(self.process.stdin, {"jsonrpc": "2.0", "method": method, "params": params})
+
+    def diagnostics(self, uri: str) -> list[dict]:
+        while True:
+            message = read_message(self.process.stdout)
+            if message["method"] != "textDocument/publishDiagnostics":
+                continue
+            if message["params"]["uri"] == uri:
+                return message["params"]["diagnostics"]
+
+
+@pytest.fixture
+def client():
+    process = subprocess.Popen(
+        [sys.executable, "-m", "pyfactoring.main", "lsp"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        cwd=_ROOT,
+    )
+    yield _Client(process)
+
+    process.kill()
+    process.wait()
+
+
+def test_lsp_publishes_clones_of_unsaved_buffers_success(client: _Client, tmp_path: Path):
+    shutil.copyfile(_ROOT / "test/samples/file_containing_clone.py", tmp_path / "module.py")
+    (tmp_path / "draft.py").write_text("pass\n", encoding="utf-8")
+    draft = (tmp_path / "draft.py").as_uri()
+
+    response = client.request("initialize", {"rootUri": tmp_path.as_uri(), "capabilities": {}})
+    assert response["result"]["capabilities"]["textDocumentSync"]["change"] == 1
+    client.notify("initialized", {})
+
+    client.notify(
+        "textDocument/didOpen",
+        {"textDocument": {"uri": draft, "languageId": "python", "version": 1, "text": "pass\n"}},
+    )
+    assert client.diagnostics(draft) == []
+
+    # the clone of the unsaved buffer is shared with the other file of the workspace
+    source = (tmp_path / "module.py").read_text(encoding="utf-8")
+    client.notify(
+        "textDocument/didChange",
+        {"textDocument": {"uri": draft, "version": 2}, "contentChanges": [{"text": source}]},
+    )
+    diagnostics = client.diagnostics(draft)
+    assert diagnostics
+    assert all(d["source"] == "pyfactoring" for d in diagnostics)
+    assert any(
+        info["location"]["uri"] == (tmp_path / "module.py").as_uri()
+        for d in diagnostics
+        for info in d["relatedInformation"]
+    )
+
+    client.notify("textDocument/didClose", {"textDocument": {"uri": draft}})
+    assert client.diagnostics(draft) == []
+
+    assert client.request("shutdown", {})["result"] is None
+    client.notify("exit", {})
+    assert client.process.wait(timeout=10) == 0
+
+
+def test_lsp_survives_new_buffer_that_does_not_parse_success(client: _Client, tmp_path: Path):
+    shutil.copyfile(_ROOT / "test/samples/file_containing_clone.py", tmp_path / "module.py")
+    # the buffer has never been saved, so there is nothing on disk to fall back to
+    draft = (tmp_path / "new.py").as_uri()
+
+    client.request("initialize", {"rootUri": tmp_path.as_uri(), "capabilities": {}})
+    client.notify(
+        "textDocument/didOpen",
+        {"textDocument": {"uri": draft, "languageId": "python", "version": 1, "text": "def f(:\n"}},
+    )
+    assert client.diagnostics(draft) == []
+
+    source = (tmp_path / "module.py").read_text(encoding="utf-8")
+    client.notify(
+        "textDocument/didChange",
+        {"textDocument": {"uri": draft, "version": 2}, "contentChanges": [{"text": source}]},
+    )
+    assert client.diagnostics(draft)
+
+
+def test_uri_to_path_unquotes_once_success():
+    assert uri_to_path("file:///tmp/a%2520b.py") == Path("/tmp/a%20b.py")
+    assert uri_to_path("file:///tmp/a%20b.py") == Path("/tmp/a b.py")
@@ -1,6 +1,16 @@
+import os
+import sys
+from pathlib import Path
+
 import pytest
 
-from pyfactoring.utils.path import collect_filepaths, separate_filepaths
+from pyfactoring.utils.path import (
+    DirSnapshot,
+    PathMatcher,
+    WalkStats,
+    collect_filepaths,
+    separate_filepaths,
+)
 
 
 @pytest.mark.parametrize(
@@ -252,3 +262,96 @@ def test_separate_filepaths_success(
 
     assert len(chained) == c_count, chained
     assert chained == expected_chained, chained
+
+
+def test_collect_filepaths_prunes_nested_dirs_success(tmp_path: Path):
+    for file in (
+        "main.py",
+        "pkg/module.py",
+        "pkg/notes.txt",
+        "pkg/venv/lib/dependency.py",
+        "pkg/.git/hook.py",
+        "pkg/node_modules/tool.py",
+        "pkg/sub/generated/code.py",
+        "pkg/sub/util.py",
+    ):
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).write_text("pass\n", encoding="utf-8")
+
+    stats = WalkStats()
+    collected = collect_filepaths(str(tmp_path), exclude=("generated",), stats=stats)
+
+    assert {path.relative_to(tmp_path).as_posix() for path in collected} == {
+        "main.py", "pkg/module.py", "pkg/sub/util.py",
+    }
+    assert stats == WalkStats(found=3, skipped=4)
+
+
+def test_collect_filepaths_follows_symlinked_top_dirs_success(tmp_path: Path):
+    for file in ("outside/pkg/module.py", "outside/nested/util.py"):
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).write_text("pass\n", encoding="utf-8")
+    (tmp_path / "root").mkdir()
+    (tmp_path / "root" / "pkg").symlink_to(tmp_path / "outside" / "pkg", target_is_directory=True)
+    (tmp_path / "outside" / "pkg" / "nested").symlink_to(
+        tmp_path / "outside" / "nested", target_is_directory=True
+    )
+
+    collected = collect_filepaths(str(tmp_path / "root"))
+
+    # only the symlinks given at the top level are followed, as `os.walk` does
+    assert {path.relative_to(tmp_path / "root").as_posix() for path in collected} == {"pkg/module.py"}
+
+
+def test_collect_filepaths_excludes_venv_name_only_for_venvs_success(tmp_path: Path):
+    venv_name = os.path.basename(os.path.dirname(os.path.dirname(sys.executable)))
+    for file in (f"env/{venv_name}/lib.py", f"pkg/{venv_name}/module.py"):
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).write_text("pass\n", encoding="utf-8")
+    (tmp_path / "env" / venv_name / "pyvenv.cfg").write_text("", encoding="utf-8")
+
+    collected = collect_filepaths(str(tmp_path))
+
+    assert {path.relative_to(tmp_path).as_posix() for path in collected} == {f"pkg/{venv_name}/module.py"}
+
+
+def test_collect_filepaths_reuses_dir_snapshot_success(tmp_path: Path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "module.py").write_text("pass\n", encoding="utf-8")
+    for path in (tmp_path / "pkg", tmp_path):
+        os.utime(path, ns=(0, 0))
+
+    snapshot = DirSnapshot()
+    assert len(collect_filepaths(str(tmp_path), snapshot=snapshot)) == 1
+    assert snapshot.changed
+
+    # a listing is taken from the snapshot while the mtime of its dir stays the same
+    (tmp_path / "pkg" / "new.py").write_text("pass\n", encoding="utf-8")
+    os.utime(tmp_path / "pkg", ns=(0, 0))
+    assert len(collect_filepaths(str(tmp_path), snapshot=snapshot)) == 1
+
+    os.utime(tmp_path / "pkg", ns=(1, 1))
+    assert len(collect_filepaths(str(tmp_path), snapshot=snapshot)) == 2
+
+
+@pytest.mark.parametrize(
+    ("rules", "path", "expected"),
+    (
+        (("chained",), "test/samples/chained/chained_1.py", True),
+        (("samples/class.py",), "test/samples/class.py", True),
+        (("class.py",), "test/samples/subclass.py", True),
+        (("*_pb2.py",), "proto/service_pb2.py", True),
+        (("*_pb2.py",), "proto/service_pb2.pyi", False),
+        (("test_?.py",), "test/test_1.py", True),
+        (("test_?.py",), "test/test_10.py", False),
+        (("migrations/*",), "app/migrations/0001.py", True),
+        (("app/*.py",), "app/models/user.py", False),
+        (("app/**/user.py",), "app/models/user.py", True),
+        (("**/generated",), "generated/code.py", True),
+        (("file_[0-9].py",), "file_3.py", True),
+        (("file_[!0-9].py",), "file_3.py", False),
+        ((), "test/samples/class.py", False),
+    ),
+)
+def test_path_matcher_success(rules: tuple[str, ...], path: str, expected: bool):
+    assert PathMatcher(rules).match(Path(path)) is expected
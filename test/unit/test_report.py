@@ -0,0 +1,97 @@
+import io
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pyfactoring.core.report import create_report
+from pyfactoring.utils.pyclones import CodeBlockClone
+
+
+_ROOT = Path(__file__).parents[2]
+
+_BLOCKS = [
+    CodeBlockClone(Path("a.py"), 1, 4, 0, 10),
+    CodeBlockClone(Path("b.py"), 6, 7, 4, 12),
+]
+
+
+def test_text_report_without_terminal_success():
+    stream = io.StringIO()
+    with create_report("text", stream) as report:
+        report.section("FINDING CLONES IN CHAINED FILES", {"template": _BLOCKS})
+        report.section("FINDING CLONES IN SINGLE FILES", [])
+
+    output = stream.getvalue()
+    assert "\x1b[" not in output
+    assert "a.py:1:0: clone found [lines: 4]\n" in output
+    assert "b.py:6:4: clone found [lines: 2]\n" in output
+    assert "Total clones: 2\nTotal lines: 6\n" in output
+    assert "SINGLE FILES" not in output
+
+
+def test_text_report_with_color_success():
+    stream = io.StringIO()
+    with create_report("text", stream, color=True) as report:
+        report.section("FINDING CLONES IN CHAINED FILES", {"template": _BLOCKS})
+
+    assert "\x1b[" in stream.getvalue()
+
+
+def test_jsonl_report_success():
+    stream = io.StringIO()
+    with create_report("jsonl", stream) as report:
+        single = [{"first": _BLOCKS[:1]}, {"second": _BLOCKS[1:]}]
+        report.section("FINDING CLONES IN SINGLE FILES", single)
+        report.section("FINDING IDIOMS IN CHAINED FILES", {"idiom": _BLOCKS}, is_idiom=True)
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(r["kind"], r["chained"], r["template"]) for r in records] == [
+        ("clone", False, "first"),
+        ("clone", False, "second"),
+        ("idiom", True, "idiom"),
+    ]
+    assert records[2]["total_lines"] == 6
+    assert records[2]["blocks"][1] == {
+        "file": "b.py", "lineno": 6, "end_lineno": 7, "colno": 4, "end_colno": 12,
+    }
+
+
+def test_sarif_report_success():
+    stream = io.StringIO()
+    with create_report("sarif", stream) as report:
+        report.section("FINDING CLONES IN CHAINED FILES", {"template": _BLOCKS})
+
+    log = json.loads(stream.getvalue())
+    assert log["version"] == "2.1.0"
+
+    results = log["runs"][0]["results"]
+    assert [result["ruleId"] for result in results] == ["clone", "clone"]
+    assert results[0]["locations"][0]["physicalLocation"] == {
+        "artifactLocation": {"uri": "a.py"},
+        "region": {"startLine": 1, "startColumn": 1, "endLine": 4, "endColumn": 11},
+    }
+    related = results[0]["relatedLocations"]
+    assert [location["physicalLocation"]["artifactLocation"]["uri"] for location in related] == ["b.py"]
+
+
+@pytest.mark.parametrize("jobs", ("1", "2"))
+def test_sarif_report_owns_stdout_success(jobs: str, tmp_path: Path):
+    shutil.copyfile(_ROOT / "test/samples/file_containing_clone.py", tmp_path / "module.py")
+    (tmp_path / "broken.py").write_text("def f(:\n", encoding="utf-8")
+
+    result = subprocess.run(
+        [sys.executable, "-m", "pyfactoring.main", "check", str(tmp_path), "--no-cache", "--verbose",
+         "--output-format", "sarif", "--jobs", jobs],
+        capture_output=True,
+        text=True,
+        cwd=_ROOT,
+        check=True,
+    )
+
+    assert json.loads(result.stdout)["runs"][0]["results"]
+    assert "broken.py:0:" in result.stderr
+    assert "Skipped:" in result.stderr
@@ -0,0 +1,35 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+
+# cumulative import time of the CLI entry point, in microseconds
+_IMPORT_BUDGET_US = 60_000
+_ROOT = Path(__file__).parents[2]
+_HEAVY_MODULES = ("pydantic", "pydantic_settings", "colorama", "pyfactoring.core.analysis")
+
+
+def _run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, "-c", code], capture_output=True, text=True, check=True, cwd=_ROOT,
+    )
+
+
+def test_import_main_has_no_heavy_imports_success():
+    result = _run_python("import json, sys, pyfactoring.main; print(json.dumps(list(sys.modules)))")
+    modules = set(json.loads(result.stdout))
+
+    assert not modules.intersection(_HEAVY_MODULES)
+
+
+def test_import_main_within_budget_success():
+    result = _run_python("import pyfactoring.main", "-X", "importtime")
+    cumulative = [
+        int(line.split("|")[1])
+        for line in result.stderr.splitlines()
+        if line.rstrip().endswith("| pyfactoring.main")
+    ]
+
+    assert cumulative
+    assert cumulative[0] < _IMPORT_BUDGET_US, f"import took {cumulative[0]} us"
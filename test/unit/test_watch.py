@@ -0,0 +1,64 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from pyfactoring import settings
+from pyfactoring.core.watch import Watcher
+
+
+@pytest.fixture
+def project(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    shutil.copyfile("test/samples/file_containing_clone.py", tmp_path / "module.py")
+    shutil.copyfile("test/samples/class.py", tmp_path / "class.py")
+    monkeypatch.setattr(settings.common_settings, "paths", [str(tmp_path)])
+    monkeypatch.setattr(settings.common_settings, "chain", [])
+    return tmp_path
+
+
+def test_watcher_prints_only_changed_groups_success(project: Path, capsys: pytest.CaptureFixture):
+    watcher = Watcher()
+
+    assert watcher.poll()
+    assert capsys.readouterr().out.count("Total clones") == 3
+    assert not watcher.poll()
+
+    source = Path("test/samples/function/function_2.py").read_text(encoding="utf-8")
+    (project / "added.py").write_text(source, encoding="utf-8")
+    assert watcher.poll()
+
+    output = capsys.readouterr().out
+    assert output.count("Total clones") == 1
+    assert "added.py" in output
+    assert "module.py" not in output
+
+    (project / "added.py").write_text("pass\n", encoding="utf-8")
+    assert watcher.poll()
+    output = capsys.readouterr().out
+    assert "Resolved groups:" in output
+    assert "clone found" not in output
+
+
+def test_watcher_forgets_removed_files_success(project: Path, capsys: pytest.CaptureFixture):
+    watcher = Watcher()
+    assert watcher.poll()
+
+    (project / "class.py").unlink()
+    assert watcher.poll()
+    assert capsys.readouterr().out.count("Changed files:") == 1
+    assert [path.name for path in watcher.session._clones] == ["module.py"]
+
+
+def test_watcher_ignores_moved_groups_success(project: Path, capsys: pytest.CaptureFixture):
+    watcher = Watcher()
+    assert watcher.poll()
+    capsys.readouterr()
+
+    source = (project / "module.py").read_text(encoding="utf-8")
+    (project / "module.py").write_text(f"import os\n{source}", encoding="utf-8")
+    assert watcher.poll()
+
+    output = capsys.readouterr().out
+    assert "Changed files:" in output
+    assert "Total clones" not in output
+    assert "Resolved groups:" not in output